@@ -0,0 +1,367 @@
+"""
+Yönetim Sayfaları Modülü
+Metrikler, istek profilleri, kullanıcı yönetimi, hata ayıklama sayfaları ve
+zamanlayıcı / giden değişiklik günlüğü durum uçları (admin blueprint'i).
+Paylaşılan yardımcılar app modülünden alınır; blueprint app.py'nin sonunda
+kaydedilir.
+"""
+
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request, jsonify, session, redirect, url_for, flash, Response
+from markupsafe import escape
+from werkzeug.security import generate_password_hash
+
+from change_journal import change_journal
+import metrics
+import profiling
+import scheduler
+from app import (
+    METRICS_TOKEN, PRODUCTS_CACHE_FILE,
+    admin_required, login_required,
+    _get_users_cached, load_users, save_users, add_user,
+    load_products_cache, iter_products_cache, read_products_cache_meta,
+    replay_change_journal
+)
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metin formatında metrikler"""
+    if METRICS_TOKEN:
+        auth_header = request.headers.get('Authorization', '')
+        if request.args.get('token') != METRICS_TOKEN and auth_header != f"Bearer {METRICS_TOKEN}":
+            return Response('unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@admin_bp.route('/metrics/dashboard')
+@admin_required
+def metrics_dashboard():
+    """Metrik özeti: en yavaş aşamalar ve sayaçlar"""
+    timing_rows = ""
+    for item in metrics.get_timing_summary():
+        labels = ", ".join(f"{k}={v}" for k, v in item['labels'].items())
+        timing_rows += (
+            f"<tr><td>{escape(item['name'])}</td><td>{escape(labels)}</td><td>{item['count']}</td>"
+            f"<td>{item['total']:.3f}</td><td>{item['avg'] * 1000:.1f}</td>"
+            f"<td>{item['p95'] * 1000:.1f}</td><td>{item['max'] * 1000:.1f}</td></tr>"
+        )
+    
+    counter_rows = ""
+    for item in metrics.get_counters():
+        labels = ", ".join(f"{k}={v}" for k, v in item['labels'].items())
+        counter_rows += f"<tr><td>{escape(item['name'])}</td><td>{escape(labels)}</td><td>{item['value']}</td></tr>"
+    
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head><title>Metrikler</title></head>
+    <body style="font-family: Arial; margin: 40px;">
+        <h1>📈 Metrikler</h1>
+        <p>Süreler bu işlem başladığından beri toplanır. Ham veri: <a href="{url_for('admin.metrics_endpoint')}">/metrics</a></p>
+        
+        <h3>⏱️ Süreler (toplam süreye göre)</h3>
+        <table border="1" cellpadding="6" style="border-collapse: collapse; font-size: 13px;">
+            <tr><th>Metrik</th><th>Etiketler</th><th>Adet</th><th>Toplam (s)</th><th>Ort. (ms)</th><th>p95 (ms)</th><th>Maks. (ms)</th></tr>
+            {timing_rows or '<tr><td colspan="7">Henüz ölçüm yok</td></tr>'}
+        </table>
+        
+        <h3>🔢 Sayaçlar</h3>
+        <table border="1" cellpadding="6" style="border-collapse: collapse; font-size: 13px;">
+            <tr><th>Metrik</th><th>Etiketler</th><th>Değer</th></tr>
+            {counter_rows or '<tr><td colspan="3">Henüz sayaç yok</td></tr>'}
+        </table>
+        
+        <br><a href="{url_for('index')}">← Ana Sayfaya Dön</a>
+    </body>
+    </html>
+    """
+    return html
+
+@admin_bp.route('/admin/profiles')
+@admin_required
+def profiles_page():
+    """Son profillenen istekler"""
+    rows = ""
+    for record in profiling.list_profiles():
+        rows += (
+            f"<tr><td>{record['id']}</td><td>{record['started_at']}</td>"
+            f"<td>{escape(record['method'])} {escape(record['route'])}</td><td>{record['status']}</td>"
+            f"<td>{record['duration_ms']}</td><td>{record['trigger']}</td><td>{record['samples']}</td>"
+            f"<td><a href=\"{url_for('admin.profile_detail', profile_id=record['id'])}\">Detay</a> | "
+            f"<a href=\"{url_for('admin.profile_collapsed', profile_id=record['id'])}\">collapsed</a></td></tr>"
+        )
+    
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head><title>Profiller</title></head>
+    <body style="font-family: Arial; margin: 40px;">
+        <h1>🔥 İstek Profilleri</h1>
+        <p>Bir isteği profillemek için <code>{profiling.PROFILE_HEADER}: 1</code> header'ı ya da
+        <code>?{profiling.PROFILE_QUERY_PARAM}=1</code> parametresi ekleyin (sadece admin).
+        Otomatik eşik: {profiling.PROFILE_SLOW_MS or 'kapalı'} ms. Son {profiling.PROFILE_KEEP_LAST} profil saklanır.</p>
+        <p><em>collapsed</em> çıktısı flamegraph.pl veya speedscope.app ile açılabilir.</p>
+        <table border="1" cellpadding="6" style="border-collapse: collapse; font-size: 13px;">
+            <tr><th>#</th><th>Zaman</th><th>Route</th><th>Durum</th><th>Süre (ms)</th><th>Tetik</th><th>Örnek</th><th></th></tr>
+            {rows or '<tr><td colspan="8">Henüz profil yok</td></tr>'}
+        </table>
+        <br><a href="{url_for('index')}">← Ana Sayfaya Dön</a>
+    </body>
+    </html>
+    """
+    return html
+
+@admin_bp.route('/admin/profiles/<int:profile_id>')
+@admin_required
+def profile_detail(profile_id):
+    """Tek profilin cProfile özeti ve yığın örnekleri"""
+    record = profiling.get_profile(profile_id)
+    if not record:
+        return "Profil bulunamadı", 404
+    
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head><title>Profil #{record['id']}</title></head>
+    <body style="font-family: Arial; margin: 40px;">
+        <h1>🔥 Profil #{record['id']}: {escape(record['method'])} {escape(record['path'])}</h1>
+        <p>{record['started_at']} | {record['duration_ms']} ms | durum {record['status']} | tetik: {record['trigger']} | {record['samples']} örnek</p>
+        <p><a href="{url_for('admin.profile_collapsed', profile_id=record['id'])}">Collapsed yığınları indir</a></p>
+        <h3>cProfile (kümülatif)</h3>
+        <pre style="font-size: 12px;">{escape(record['cprofile']) or 'cProfile çalışmadı (otomatik örnekleme ya da aynı anda başka bir cProfile etkindi).'}</pre>
+        <h3>Yığın örnekleri</h3>
+        <pre style="font-size: 12px;">{escape(record['collapsed'][:20000])}</pre>
+        <a href="{url_for('admin.profiles_page')}">← Profillere Dön</a>
+    </body>
+    </html>
+    """
+    return html
+
+@admin_bp.route('/admin/profiles/<int:profile_id>.collapsed')
+@admin_required
+def profile_collapsed(profile_id):
+    """Flamegraph araçları için collapsed yığın çıktısı"""
+    record = profiling.get_profile(profile_id)
+    if not record:
+        return "Profil bulunamadı", 404
+    return Response(record['collapsed'] + '\n', mimetype='text/plain',
+                    headers={'Content-Disposition': f"attachment; filename=profile_{profile_id}.collapsed"})
+
+@admin_bp.route('/debug-session')
+@login_required
+def debug_session():
+    """SECRET_KEY test sayfası"""
+    import hashlib
+    
+    session_data = dict(session)
+    secret_key = current_app.secret_key
+    secret_hash = hashlib.md5(secret_key.encode()).hexdigest()[:10] if secret_key else "YOK"
+    cookie_info = request.cookies.get('session', 'Cookie bulunamadı')
+    
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head><title>SECRET_KEY Test</title></head>
+    <body style="font-family: Arial; margin: 40px;">
+        <h1>🔐 SECRET_KEY Test Sayfası</h1>
+        
+        <h3>✅ SECRET_KEY Durumu:</h3>
+        <p><strong>SECRET_KEY Hash:</strong> {secret_hash}</p>
+        <p><strong>Durum:</strong> {'✅ ÇALIŞIYOR' if secret_key else '❌ YOK'}</p>
+        
+        <h3>📱 Session Verileri:</h3>
+        <pre>{session_data}</pre>
+        
+        <h3>🍪 Session Cookie:</h3>
+        <p style="word-break: break-all; font-size: 12px;">{cookie_info}</p>
+        
+        <h3>🧪 Test Sonucu:</h3>
+        <p style="color: green; font-weight: bold;">
+            Eğer bu sayfayı görüyorsanız SECRET_KEY çalışıyor! 🎉
+        </p>
+        
+        <a href="{url_for('index')}">← Ana Sayfaya Dön</a>
+    </body>
+    </html>
+    """
+    return html 
+
+@admin_bp.route('/users')
+@admin_required
+def users():
+    users_data = _get_users_cached()
+    return render_template('users.html', users=users_data)
+
+@admin_bp.route('/add_user', methods=['POST'])
+@admin_required
+def add_user_route():
+    try:
+        username = request.form.get('username', '').strip()
+        password = request.form.get('password', '').strip()
+        role = request.form.get('role', 'user').strip()
+        
+        if not username:
+            flash('Kullanıcı adı boş olamaz!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        if not password:
+            flash('Şifre boş olamaz!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        if len(password) < 4:
+            flash('Şifre en az 4 karakter olmalıdır!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        if role not in ['admin', 'user']:
+            flash('Geçersiz rol seçimi!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        success, message = add_user(username, password, role)
+        if success:
+            flash(message, 'success')
+        else:
+            flash(message, 'error')
+        
+        return redirect(url_for('admin.users'))
+        
+    except Exception as e:
+        flash(f'Kullanıcı eklenirken hata oluştu: {str(e)}', 'error')
+        return redirect(url_for('admin.users'))
+
+@admin_bp.route('/reset_password/<username>', methods=['POST'])
+@admin_required
+def reset_password(username):
+    try:
+        if not username or len(username) > 50 or not username.isalnum():
+            flash('Geçersiz kullanıcı adı!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        new_password = request.form.get('new_password', '').strip()
+        
+        if not new_password:
+            flash('Yeni şifre boş olamaz!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        if len(new_password) < 4:
+            flash('Şifre en az 4 karakter olmalıdır!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        users = load_users()
+        if username in users:
+            users[username]['password_hash'] = generate_password_hash(new_password)
+            users[username]['password_reset_at'] = datetime.now().isoformat()
+            users[username]['reset_by'] = session['username']
+            save_users(users)
+            flash(f'{username} kullanıcısının şifresi başarıyla sıfırlandı! Yeni şifre: {new_password}', 'success')
+        else:
+            flash('Kullanıcı bulunamadı!', 'error')
+        
+        return redirect(url_for('admin.users'))
+        
+    except Exception as e:
+        flash('Şifre sıfırlanırken hata oluştu!', 'error')
+        return redirect(url_for('admin.users'))
+
+@admin_bp.route('/delete_user/<username>')
+@admin_required
+def delete_user(username):
+    try:
+        if not username or len(username) > 50 or not username.isalnum():
+            flash('Geçersiz kullanıcı adı!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        if username == session['username']:
+            flash('Kendi hesabınızı silemezsiniz!', 'error')
+            return redirect(url_for('admin.users'))
+        
+        users = load_users()
+        if username in users:
+            del users[username]
+            save_users(users)
+            flash(f'{username} kullanıcısı başarıyla silindi!', 'success')
+        else:
+            flash('Kullanıcı bulunamadı!', 'error')
+        
+        return redirect(url_for('admin.users'))
+        
+    except Exception as e:
+        flash('Kullanıcı silinirken hata oluştu!', 'error')
+        return redirect(url_for('admin.users'))
+
+@admin_bp.route('/debug-cache')
+@login_required
+def debug_cache():
+    """Cache debug sayfası"""
+    try:
+        # Dosya varlığı kontrol
+        cache_exists = os.path.exists(PRODUCTS_CACHE_FILE)
+        
+        if not cache_exists:
+            return f"❌ Cache dosyası bulunamadı: {PRODUCTS_CACHE_FILE}"
+        
+        # Dosya boyutu
+        file_size = os.path.getsize(PRODUCTS_CACHE_FILE)
+        
+        # Manuel okuma (satır satır)
+        cache_meta = read_products_cache_meta()
+        products = list(iter_products_cache())
+        last_updated = cache_meta.get('last_updated_turkey', 'Bilinmiyor')
+        
+        # load_products_cache fonksiyonu test
+        test_products, test_updated = load_products_cache()
+        
+        html = f"""
+        <h1>🔧 Cache Debug</h1>
+        <p><strong>Dosya:</strong> {PRODUCTS_CACHE_FILE}</p>
+        <p><strong>Dosya var mı:</strong> {'✅ Evet' if cache_exists else '❌ Hayır'}</p>
+        <p><strong>Dosya boyutu:</strong> {file_size} bytes</p>
+        <p><strong>Şema:</strong> {cache_meta.get('schema', 'eski format')}</p>
+        
+        <h3>Manuel Okuma:</h3>
+        <p><strong>Ürün sayısı:</strong> {len(products)}</p>
+        <p><strong>Son güncelleme:</strong> {last_updated}</p>
+        
+        <h3>load_products_cache() Fonksiyonu:</h3>
+        <p><strong>Ürün sayısı:</strong> {len(test_products) if test_products else 0}</p>
+        <p><strong>Son güncelleme:</strong> {test_updated}</p>
+        
+        <h3>İlk 3 Ürün:</h3>
+        """
+        
+        for i, product in enumerate(products[:3]):
+            barcode = product.get('barcode', 'Yok')
+            title = product.get('title', 'Yok')[:50]
+            price = product.get('ty_price', 0)
+            html += f"<p>{i+1}. Barkod: {barcode}, Fiyat: {price}₺, Başlık: {title}...</p>"
+        
+        html += f'<br><a href="/costs">Costs Sayfasını Dene</a>'
+        
+        return html
+        
+    except Exception as e:
+        return f"❌ Debug hatası: {str(e)}"
+
+@admin_bp.route('/admin/scheduler')
+@admin_required
+def scheduler_status():
+    return jsonify(scheduler.status())
+
+@admin_bp.route('/admin/change_journal')
+@admin_required
+def change_journal_status():
+    """Giden değişiklik günlüğü: durum sayıları, açık ve son kalemler"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({
+        'summary': change_journal.summary(),
+        'open': change_journal.open_items()[:limit],
+        'recent': change_journal.recent(limit)
+    })
+
+@admin_bp.route('/admin/change_journal/replay', methods=['POST'])
+@admin_required
+def change_journal_replay():
+    return jsonify(replay_change_journal())
@@ -1,4 +1,8 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+import time
+# Açılış süresi ölçümü (modülün en sonunda IMPORT_BUDGET_MS ile karşılaştırılır)
+_import_started = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g, Response
 import requests
 from requests.auth import HTTPBasicAuth
 from dotenv import load_dotenv
@@ -8,15 +12,35 @@ import json
 import base64
 from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
-import pandas as pd
-from openpyxl import load_workbook, Workbook
 import shutil
 import logging
-import pytz
 import traceback
+import threading
+import itertools
+import copy
+import re
+import sys
 
-
-from cost_tracking import log_cost_data_change
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+import cache_backend
+import circuit_breaker
+from change_journal import change_journal
+import dashboard_summary
+import jobs
+from match_index import match_index, files_signature
+import metrics
+import profiling
+import rate_limit
+import retention
+import response_cache
+import scheduler
+import singleflight
+import storage
 
 # cost_management import'unu try-catch ile yap
 try:
@@ -25,13 +49,20 @@ try:
         get_product_cost_data, 
         save_product_cost_data, 
         calculate_profit_analysis,
-        get_default_cost_structure
+        get_profit_analysis,
+        get_all_profit_analyses,
+        get_all_costs,
+        get_default_cost_structure,
+        COSTS_FILE,
+        COSTS_JOURNAL_FILE
     )
     COST_MANAGEMENT_AVAILABLE = True
     logging.info("✅ cost_management modülü başarıyla import edildi")
 except ImportError as e:
     logging.error(f"❌ cost_management import hatası: {e}")
     COST_MANAGEMENT_AVAILABLE = False
+    COSTS_FILE = 'costs.json'
+    COSTS_JOURNAL_FILE = 'costs.journal.jsonl'
     
     # Dummy fonksiyonlar tanımla
     def get_all_products_with_costs(products):
@@ -42,6 +73,12 @@ except ImportError as e:
         return True
     def calculate_profit_analysis(barcode, price, data):
         return None
+    def get_profit_analysis(barcode, price):
+        return None
+    def get_all_profit_analyses(products):
+        return {}
+    def get_all_costs():
+        return {}
     def get_default_cost_structure():
         return {}
 
@@ -52,16 +89,38 @@ logging.basicConfig(level=logging.INFO)
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "your-secret-key-here")
+profiling.init_app(app)
 
 MATCHES_FILE = 'match.json'
 USERS_FILE = 'users.json'
 PRODUCTS_CACHE_FILE = 'products_cache.json'
+PRODUCTS_CACHE_SCHEMA_VERSION = 2
 PRODUCT_LINKS_FILE = 'product_links.json'
+HB_PRODUCTS_CACHE_FILE = 'hb_products_cache.json'
+
+# HB listeleme snapshot'ı bu süreden eskiyse arka planda yenilenir
+HB_CACHE_MAX_AGE_MINUTES = int(os.getenv("HB_CACHE_MAX_AGE_MINUTES", 30))
+
+# cached() süreleri (saniye). Yazmalar ilgili önbelleği ayrıca temizler.
+# Aynı HB kataloğu bu süre içinde tekrar çekilmez (snapshot + tam yenileme)
+HB_PRODUCTS_FETCH_CACHE_SECONDS = int(os.getenv("HB_PRODUCTS_FETCH_CACHE_SECONDS", 60))
+EXCEL_STATS_CACHE_SECONDS = int(os.getenv("EXCEL_STATS_CACHE_SECONDS", 300))
+# Sonuçlanmış batch'ler değişmez; işlemdeki batch'ler kısa süre tutulur
+BATCH_STATUS_FINAL_CACHE_SECONDS = 3600
+BATCH_STATUS_POLL_CACHE_SECONDS = int(os.getenv("BATCH_STATUS_POLL_CACHE_SECONDS", 5))
+BATCH_FINAL_STATUSES = ('completed', 'done', 'success', 'failed', 'error')
 
 # Excel yönetimi için sabitler
-MAX_ROWS_PER_FILE = 500000
+# Haftalık rapor bu satır/boyut sınırına gelince yeni parçaya (_partN) geçilir
+MAX_ROWS_PER_FILE = int(os.getenv("MAX_ROWS_PER_FILE", 500000))
+MAX_FILE_SIZE_MB = float(os.getenv("MAX_FILE_SIZE_MB", 50))
 MAX_FILE_AGE_DAYS = 60
+# Haftalık parçaların satır sayısı/boyutu (dosyaları taramadan istatistik için)
+EXCEL_MANIFEST_FILE = "stok_raporu_manifest.json"
+EXCEL_HISTORY_LOCK = "stok_raporu_history"
 ARCHIVE_FOLDER = "archives"
+# Biten haftaların arşivlenmesi ve saklama süresi kontrolü (arka planda)
+RETENTION_INTERVAL_MINUTES = int(os.getenv("RETENTION_INTERVAL_MINUTES", 60))
 
 # API bilgileri
 seller_id = os.getenv("SELLER_ID")
@@ -73,41 +132,149 @@ hb_password = os.getenv("HB_PASSWORD")
 hb_merchant_id = os.getenv("HB_MERCHANT_ID")
 hb_user_agent = os.getenv("HB_USER_AGENT")
 
+# API adresleri (benchmark/test için yerel mock sunucuya yönlendirilebilir)
+TRENDYOL_API_BASE = os.getenv("TRENDYOL_API_BASE", "https://apigw.trendyol.com").rstrip('/')
+HB_API_BASE = os.getenv("HB_API_BASE", "https://listing-external.hepsiburada.com").rstrip('/')
+
+# Giden değişiklik günlüğü: yarım kalan gönderimler bu aralıkla tamamlanır
+CHANGE_JOURNAL_REPLAY_SECONDS = int(os.getenv("CHANGE_JOURNAL_REPLAY_SECONDS", 60))
+# Bu kadar saniyedir gönderilmemiş/yarıda kalmış kalemler yeniden gönderilir
+CHANGE_JOURNAL_STALE_SECONDS = int(os.getenv("CHANGE_JOURNAL_STALE_SECONDS", 120))
+# Sonucu bu kadar saat alınamayan batch kalemleri 'expired' olur
+CHANGE_JOURNAL_SENT_EXPIRE_HOURS = 24
+
 MASTER_PASSWORD = os.getenv("MASTER_PASSWORD", "emergency123")
 
+# users.json en fazla bu aralıkla (saniye) değişiklik için kontrol edilir
+USERS_CACHE_CHECK_SECONDS = float(os.getenv("USERS_CACHE_CHECK_SECONDS", 2))
 
+# /metrics için opsiyonel erişim anahtarı (boşsa açık)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
-def load_users():
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    else:
-        default_users = {
-            "admin": {
-                "password_hash": generate_password_hash("123456"),
-                "role": "admin",
-                "created_at": datetime.now().isoformat()
-            },
-            "user": {
-                "password_hash": generate_password_hash("password"),
-                "role": "user",
-                "created_at": datetime.now().isoformat()
+# 429 (rate limit) yanıtında en fazla kaç kez tekrar denensin
+MARKETPLACE_MAX_RETRIES = 2
+# Zaman aşımı verilmeyen pazaryeri çağrıları için (bağlantı, okuma) süresi
+MARKETPLACE_TIMEOUT = (float(os.getenv("MARKETPLACE_CONNECT_TIMEOUT", 5)),
+                       float(os.getenv("MARKETPLACE_READ_TIMEOUT", 30)))
+
+
+
+def marketplace_request(method, url, marketplace, endpoint, **kwargs):
+    """Pazaryeri API çağrısı; süre/durum metriği tutar, 429'da bekleyip tekrar dener
+
+    Pazaryerinin devre kesicisi açıksa istek gönderilmeden
+    circuit_breaker.CircuitOpenError fırlatılır; zaman aşımı verilmemişse
+    MARKETPLACE_TIMEOUT kullanılır.
+    """
+    kwargs.setdefault('timeout', MARKETPLACE_TIMEOUT)
+    breaker = circuit_breaker.get_breaker(marketplace)
+    for attempt in range(MARKETPLACE_MAX_RETRIES + 1):
+        if not breaker.allow():
+            metrics.inc('marketplace_request_rejected_total', marketplace=marketplace, endpoint=endpoint)
+            raise circuit_breaker.CircuitOpenError(marketplace, breaker.retry_in())
+        start = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except Exception as e:
+            breaker.record_failure(e)
+            metrics.observe('marketplace_request_seconds', time.perf_counter() - start,
+                            marketplace=marketplace, endpoint=endpoint, status='error')
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure(f"{endpoint}: HTTP {response.status_code}")
+        else:
+            breaker.record_success()
+        metrics.observe('marketplace_request_seconds', time.perf_counter() - start,
+                        marketplace=marketplace, endpoint=endpoint, status=response.status_code)
+        
+        if response.status_code != 429 or attempt == MARKETPLACE_MAX_RETRIES:
+            return response
+        
+        metrics.inc('marketplace_request_retries_total', marketplace=marketplace, endpoint=endpoint)
+        retry_after = response.headers.get('Retry-After', '')
+        wait_seconds = float(retry_after) if retry_after.isdigit() else attempt + 1
+        logging.warning(f"{marketplace} {endpoint} rate limit (429), {wait_seconds}s sonra tekrar denenecek")
+        time.sleep(min(wait_seconds, 10))
+
+# Kullanıcı dizini önbelleği: dosya en fazla USERS_CACHE_CHECK_SECONDS'de bir
+# stat'lanır, mtime/boyut değişmişse yeniden okunur
+_users_cache = {'data': None, 'signature': None, 'checked_at': 0.0}
+_users_lock = threading.RLock()
+
+def _users_file_signature():
+    stat = os.stat(USERS_FILE)
+    return stat.st_mtime_ns, stat.st_size
+
+@metrics.timed('json_io_seconds', file='users', op='load')
+def _read_users_file():
+    with open(USERS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _get_users_cached():
+    """Önbellekteki kullanıcı dict'ini döndür (değiştirilmemeli)"""
+    with _users_lock:
+        now = time.monotonic()
+        if _users_cache['data'] is not None and now - _users_cache['checked_at'] < USERS_CACHE_CHECK_SECONDS:
+            return _users_cache['data']
+        
+        if not os.path.exists(USERS_FILE):
+            default_users = {
+                "admin": {
+                    "password_hash": generate_password_hash("123456"),
+                    "role": "admin",
+                    "created_at": datetime.now().isoformat()
+                },
+                "user": {
+                    "password_hash": generate_password_hash("password"),
+                    "role": "user",
+                    "created_at": datetime.now().isoformat()
+                }
             }
-        }
-        save_users(default_users)
-        return default_users
+            save_users(default_users)
+            return _users_cache['data']
+        
+        signature = _users_file_signature()
+        if _users_cache['data'] is None or signature != _users_cache['signature']:
+            _users_cache['data'] = _read_users_file()
+            _users_cache['signature'] = signature
+        _users_cache['checked_at'] = now
+        return _users_cache['data']
 
+def load_users():
+    """Kullanıcıların düzenlenebilir kopyasını döndür"""
+    return copy.deepcopy(_get_users_cached())
+
+def get_user(username):
+    """Tek kullanıcı kaydı (salt okunur, disk erişimi olmadan önbellekten)"""
+    return _get_users_cached().get(username)
+
+@metrics.timed('json_io_seconds', file='users', op='save')
 def save_users(users_data):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users_data, f, ensure_ascii=False, indent=2)
+    """Kullanıcıları atomik yaz (geçici dosya + fsync + rename) ve önbelleği güncelle"""
+    with _users_lock:
+        storage.write_json(USERS_FILE, users_data)
+        _users_cache['data'] = copy.deepcopy(users_data)
+        _users_cache['signature'] = _users_file_signature()
+        _users_cache['checked_at'] = time.monotonic()
 
 def get_current_turkey_time():
+    import pytz
     turkey_tz = pytz.timezone('Europe/Istanbul')
     now = datetime.now(turkey_tz)
     return now.strftime("%d.%m.%Y %H:%M:%S")
 
-def check_hb_batch_status(batch_id):
-    """Hepsiburada batch durumunu sorgula"""
+def batch_status_cache_seconds(batch_status):
+    """Batch sonucu önbellekte ne kadar kalsın? (hata yanıtları tutulmaz)"""
+    if 'error' in batch_status:
+        return 0
+    if str(batch_status.get('status', '')).lower() in BATCH_FINAL_STATUSES:
+        return BATCH_STATUS_FINAL_CACHE_SECONDS
+    return BATCH_STATUS_POLL_CACHE_SECONDS
+
+@cache_backend.cached('hb_batch_status', batch_status_cache_seconds, backend='sqlite')
+@singleflight.single_flight('hb_batch_status')
+def check_hb_batch_status(batch_id, upload_type='stock'):
+    """Hepsiburada batch durumunu sorgula (upload_type: stock | price)"""
     try:
         token = base64.b64encode(f"{hb_username}:{hb_password}".encode()).decode()
         
@@ -117,8 +284,8 @@ def check_hb_batch_status(batch_id):
             "User-Agent": hb_user_agent
         }
         
-        url = f"https://listing-external.hepsiburada.com/listings/merchantid/{hb_merchant_id}/stock-uploads/id/{batch_id}"
-        response = requests.get(url, headers=headers, timeout=15)
+        url = f"{HB_API_BASE}/listings/merchantid/{hb_merchant_id}/{upload_type}-uploads/id/{batch_id}"
+        response = marketplace_request('GET', url, 'hepsiburada', f'{upload_type}_upload_status', headers=headers, timeout=15)
         
         if response.status_code == 200:
             return response.json()
@@ -128,13 +295,15 @@ def check_hb_batch_status(batch_id):
     except Exception as e:
         return {"error": str(e)}
 
+@cache_backend.cached('ty_batch_status', batch_status_cache_seconds, backend='sqlite')
+@singleflight.single_flight('ty_batch_status')
 def check_batch_status(batch_id):
     """Trendyol batch durumunu sorgula"""
     try:
-        url = f"https://apigw.trendyol.com/integration/product/sellers/{seller_id}/products/batch-requests/{batch_id}"
+        url = f"{TRENDYOL_API_BASE}/integration/product/sellers/{seller_id}/products/batch-requests/{batch_id}"
         
-        response = requests.get(
-            url,
+        response = marketplace_request(
+            'GET', url, 'trendyol', 'batch_status',
             auth=HTTPBasicAuth(api_key, api_secret),
             headers={'Accept': 'application/json'},
             timeout=15
@@ -166,43 +335,243 @@ def add_user(username, password, role="user"):
 
 def verify_user(username, password):
     """Kullanıcı doğrulama fonksiyonu"""
-    users = load_users()
-    
     if password == MASTER_PASSWORD:
         return True
     
-    if username in users:
-        return check_password_hash(users[username]["password_hash"], password)
+    user = get_user(username)
+    if user:
+        return check_password_hash(user["password_hash"], password)
     return False
 
+def json_dumps_compact(obj):
+    """Boşluksuz JSON üret (orjson varsa onu kullan)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+def json_loads(text):
+    """JSON çöz (orjson varsa onu kullan)"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def slim_product(product):
+    """Trendyol ürününden sadece uygulamanın kullandığı alanları al"""
+    images = product.get('images') or []
+    return {
+        'barcode': product.get('barcode', ''),
+        'title': product.get('title', ''),
+        'category': product.get('category') or product.get('categoryName', ''),
+        'images': [{'url': images[0].get('url', '')}] if images else [],
+        'quantity': product.get('quantity', 0),
+        'ty_price': product.get('ty_price', 0.0),
+        'hb_sku': product.get('hb_sku', ''),
+        'hb_stock': product.get('hb_stock'),
+        'hb_price': product.get('hb_price', 0.0)
+    }
+
+def _read_products_cache_header(f):
+    """İlk satırı oku; slim şemaysa başlık dict'ini, eski formatsa None döndür"""
+    first_line = f.readline()
+    try:
+        header = json_loads(first_line)
+    except ValueError:
+        return None
+    if isinstance(header, dict) and header.get('schema') == PRODUCTS_CACHE_SCHEMA_VERSION:
+        return header
+    return None
+
+def read_products_cache_meta():
+    """Cache'in sadece başlık bilgisini (zaman damgaları) oku"""
+    if not os.path.exists(PRODUCTS_CACHE_FILE):
+        return {}
+    try:
+        with open(PRODUCTS_CACHE_FILE, 'r', encoding='utf-8') as f:
+            header = _read_products_cache_header(f)
+            if header is not None:
+                return header
+            # Eski format: tüm dosyayı okumak gerekir
+            f.seek(0)
+            cache_data = json.load(f)
+            cache_data.pop('products', None)
+            return cache_data
+    except Exception as e:
+        logging.error(f"Cache başlık okuma hatası: {e}")
+        return {}
+
+def iter_products_cache():
+    """Cache'deki ürünleri satır satır oku (tam tarama için bellek dostu)"""
+    if not os.path.exists(PRODUCTS_CACHE_FILE):
+        return
+    with open(PRODUCTS_CACHE_FILE, 'r', encoding='utf-8') as f:
+        header = _read_products_cache_header(f)
+        if header is None:
+            # Eski (indent=2, tek parça) cache dosyası
+            f.seek(0)
+            yield from json.load(f).get('products', [])
+            return
+        for line in f:
+            if line.strip():
+                yield json_loads(line)
+
+def find_cached_product(barcode):
+    """Cache'de barkoda göre ürünü bul, bulununca okumayı bırak"""
+    try:
+        for product in iter_products_cache():
+            if product.get('barcode') == barcode:
+                return product
+    except Exception as e:
+        logging.error(f"Cache okuma hatası: {e}")
+    return None
+
+# Ürün cache'i işlem içinde tutulur; dosyanın mtime/boyutu değişince
+# (başka bir worker yenileme yaptığında da) yeniden okunur
+_products_memo = {'signature': None, 'products': None, 'turkey_time': None}
+_products_memo_lock = threading.Lock()
+
+def _products_cache_signature():
+    try:
+        stat = os.stat(PRODUCTS_CACHE_FILE)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+@metrics.timed('json_io_seconds', file='products_cache', op='load')
 def load_products_cache():
-    if os.path.exists(PRODUCTS_CACHE_FILE):
+    """Ürün listesini ve Türkiye saatiyle güncelleme zamanını döndür
+
+    Dönen liste worker'daki isteklerle paylaşılır, değiştirilmemelidir.
+    """
+    try:
+        signature = _products_cache_signature()
+        if signature is None:
+            return [], None
+        with _products_memo_lock:
+            if _products_memo['signature'] == signature:
+                metrics.inc('products_cache_memo_total', result='hit')
+                return _products_memo['products'], _products_memo['turkey_time']
+            products = list(iter_products_cache())
+            turkey_time = read_products_cache_meta().get('last_updated_turkey', None)
+            _products_memo.update(signature=signature, products=products, turkey_time=turkey_time)
+            metrics.inc('products_cache_memo_total', result='miss')
+            return products, turkey_time
+    except Exception as e:
+        logging.error(f"Cache okuma hatası: {e}")
+        return [], None
+
+@metrics.timed('json_io_seconds', file='products_cache', op='save')
+def save_products_cache(products):
+    """Ürünleri slim şemada, ürün başına bir satır olacak şekilde kaydet"""
+    try:
+        header = {
+            'schema': PRODUCTS_CACHE_SCHEMA_VERSION,
+            'last_updated': datetime.now().isoformat(),
+            'last_updated_turkey': get_current_turkey_time()
+        }
+        count = 0
+        # Akış yarıda kesilirse son sağlam cache bozulmasın
+        with storage.atomic_writer(PRODUCTS_CACHE_FILE) as f:
+            f.write(json_dumps_compact(header) + '\n')
+            for product in products:
+                f.write(json_dumps_compact(slim_product(product)) + '\n')
+                count += 1
+        logging.info(f"{count} ürün cache'e kaydedildi")
+        return True
+    except Exception as e:
+        logging.error(f"Cache kayıt hatası: {e}")
+        return False
+
+def slim_hb_listing(listing):
+    """HB listeleme kaydından sadece uygulamanın kullandığı alanları al"""
+    return {
+        'merchantSku': listing.get('merchantSku', ''),
+        'hepsiburadaSku': listing.get('hepsiburadaSku', ''),
+        'productName': listing.get('productName', ''),
+        'availableStock': listing.get('availableStock'),
+        'hb_price': listing.get('hb_price', 0.0)
+    }
+
+@metrics.timed('json_io_seconds', file='hb_products_cache', op='load')
+def load_hb_products_cache():
+    """HB listeleme snapshot'ını oku"""
+    if os.path.exists(HB_PRODUCTS_CACHE_FILE):
         try:
-            with open(PRODUCTS_CACHE_FILE, 'r', encoding='utf-8') as f:
+            with open(HB_PRODUCTS_CACHE_FILE, 'r', encoding='utf-8') as f:
                 cache_data = json.load(f)
-                products = cache_data.get('products', [])
-                turkey_time = cache_data.get('last_updated_turkey', None)
-                return products, turkey_time
+                listings = cache_data.get('listings', [])
+                last_updated = cache_data.get('last_updated', None)
+                return listings, last_updated
         except Exception as e:
-            logging.error(f"Cache okuma hatası: {e}")
+            logging.error(f"HB cache okuma hatası: {e}")
             return [], None
     return [], None
 
-def save_products_cache(products):
+@metrics.timed('json_io_seconds', file='hb_products_cache', op='save')
+def save_hb_products_cache(listings):
+    """HB listeleme snapshot'ını kaydet"""
     try:
         cache_data = {
-            'products': products,
+            'listings': [slim_hb_listing(listing) for listing in listings],
             'last_updated': datetime.now().isoformat(),
             'last_updated_turkey': get_current_turkey_time()
         }
-        with open(PRODUCTS_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        logging.info(f"{len(products)} ürün cache'e kaydedildi")
+        storage.write_json(HB_PRODUCTS_CACHE_FILE, cache_data, indent=None)
+        logging.info(f"{len(listings)} HB ürünü snapshot'a kaydedildi")
         return True
     except Exception as e:
-        logging.error(f"Cache kayıt hatası: {e}")
+        logging.error(f"HB cache kayıt hatası: {e}")
         return False
 
+def is_hb_cache_stale(last_updated):
+    """HB snapshot'ı HB_CACHE_MAX_AGE_MINUTES'tan eski mi?"""
+    if not last_updated:
+        return True
+    try:
+        age = datetime.now() - datetime.fromisoformat(last_updated)
+    except ValueError:
+        return True
+    return age > timedelta(minutes=HB_CACHE_MAX_AGE_MINUTES)
+
+# Aynı anda yalnızca bir HB snapshot yenilemesi çalışsın (worker'lar
+# arasında da: dosya kilidi alınamazsa başka bir işlem yeniliyordur)
+hb_refresh_lock = threading.Lock()
+
+def refresh_hb_products_cache():
+    """HB listelerini API'den çek ve snapshot'ı güncelle
+
+    HB devresi açıksa API denenmez; son sağlam snapshot yerinde kalır.
+    """
+    if not circuit_breaker.is_available('hepsiburada'):
+        logging.warning("HB devresi açık, snapshot yenilemesi atlandı")
+        return []
+    listings = get_hepsiburada_products()
+    if listings:
+        save_hb_products_cache(listings)
+    return listings
+
+def refresh_hb_products_cache_async():
+    """HB snapshot'ını arka planda yenile; zaten yenileniyorsa (ya da HB devresi açıksa) False döner"""
+    if not circuit_breaker.is_available('hepsiburada'):
+        return False
+    if not hb_refresh_lock.acquire(blocking=False):
+        return False
+    process_lock = storage.try_lock(HB_PRODUCTS_CACHE_FILE + '.refresh')
+    if process_lock is None:
+        hb_refresh_lock.release()
+        return False
+
+    def worker():
+        try:
+            refresh_hb_products_cache()
+        except Exception as e:
+            logging.error(f"HB arka plan yenileme hatası: {e}")
+        finally:
+            process_lock.release()
+            hb_refresh_lock.release()
+
+    threading.Thread(target=worker, daemon=True).start()
+    return True
+
 def get_week_info():
     """Haftanın yıl ve hafta numarasını döndür"""
     now = datetime.now()
@@ -210,9 +579,32 @@ def get_week_info():
     return year, week
 
 def get_excel_filename():
-    """Haftalık Excel dosya adı oluştur"""
+    """Haftalık Excel dosya adı oluştur (haftanın ilk parçası)"""
     year, week = get_week_info()
-    return f"stok_raporu_{year}_W{week:02d}.xlsx"
+    return get_excel_shard_filename(year, week, 1)
+
+def get_excel_shard_filename(year, week, part):
+    """Haftanın part. parçası; ilk parça eski dosya adını korur"""
+    base = f"stok_raporu_{year}_W{week:02d}"
+    return f"{base}.xlsx" if part == 1 else f"{base}_part{part}.xlsx"
+
+WEEKLY_EXCEL_PATTERN = re.compile(r'^stok_raporu_(\d{4})_W(\d{2})(?:_part(\d+))?\.xlsx$')
+
+def parse_weekly_excel_filename(name):
+    """Dosya adından (yıl, hafta, parça) döndür; haftalık rapor değilse None"""
+    match = WEEKLY_EXCEL_PATTERN.match(name)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2)), int(match.group(3) or 1)
+
+def list_weekly_excel_files():
+    """Haftalık stok Excel dosyalarını (parçalar dahil) eskiden yeniye sıralı döndür"""
+    return sorted((name for name in os.listdir('.') if WEEKLY_EXCEL_PATTERN.match(name)),
+                  key=parse_weekly_excel_filename)
+
+def list_week_shard_files(year, week):
+    return [name for name in list_weekly_excel_files()
+            if parse_weekly_excel_filename(name)[:2] == (year, week)]
 
 def get_week_date_range():
     """Bu haftanın başlangıç ve bitiş tarihlerini döndür"""
@@ -224,139 +616,226 @@ def get_week_date_range():
     
     return monday.strftime("%d.%m.%Y"), sunday.strftime("%d.%m.%Y")
 
+def scan_excel_history(filename):
+    """Excel'i satır satır tara: (satır sayısı, farklı güncelleme zamanı sayısı)"""
+    from openpyxl import load_workbook
+    wb = load_workbook(filename, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        date_index = list(header).index('Tarih_Saat') if 'Tarih_Saat' in header else None
+        row_count = 0
+        update_times = set()
+        for row in rows:
+            row_count += 1
+            if date_index is not None and date_index < len(row):
+                update_times.add(row[date_index])
+        return row_count, len(update_times)
+    finally:
+        wb.close()
+
 def get_current_excel_info(filename):
     """Mevcut Excel dosyasının bilgilerini al"""
     if not os.path.exists(filename):
         return 0, None
     
     try:
-        df = pd.read_excel(filename)
-        row_count = len(df)
+        row_count, _ = scan_excel_history(filename)
         creation_time = datetime.fromtimestamp(os.path.getctime(filename))
         return row_count, creation_time
     except Exception as e:
         logging.warning(f"Excel okuma hatası: {e}")
         return 0, None
 
-def cleanup_old_files():
-    """2 aydan eski dosyaları sil"""
-    cutoff_date = datetime.now() - timedelta(days=MAX_FILE_AGE_DAYS)
-    cleaned_count = 0
-    
-    for file in os.listdir('.'):
-        if file.startswith('stok_raporu_') and file.endswith('.xlsx'):
-            try:
-                file_time = datetime.fromtimestamp(os.path.getctime(file))
-                if file_time < cutoff_date:
-                    os.remove(file)
-                    cleaned_count += 1
-                    logging.info(f"Eski dosya silindi: {file}")
-            except Exception as e:
-                logging.warning(f"Dosya silme hatası {file}: {e}")
-    
-    if os.path.exists(ARCHIVE_FOLDER):
-        for file in os.listdir(ARCHIVE_FOLDER):
-            file_path = os.path.join(ARCHIVE_FOLDER, file)
-            if os.path.isfile(file_path):
-                try:
-                    file_time = datetime.fromtimestamp(os.path.getctime(file_path))
-                    if file_time < cutoff_date:
-                        os.remove(file_path)
-                        cleaned_count += 1
-                        logging.info(f"Eski arşiv silindi: {file}")
-                except Exception as e:
-                    logging.warning(f"Arşiv silme hatası {file}: {e}")
-    
-    if cleaned_count > 0:
-        logging.info(f"Toplam {cleaned_count} eski dosya temizlendi")
+EXCEL_COLUMNS = ['Hafta', 'Tarih_Saat', 'TY_Barkod', 'TY_Stok', 'TY_Fiyat', 'HB_SKU', 'HB_Stok', 'HB_Fiyat']
+
+def product_to_excel_row(product, week_label, formatted_date):
+    """Ürünü haftalık Excel satırına (EXCEL_COLUMNS sırasıyla) çevir"""
+    hb_price = product.get("hb_price", 0.0)  # Hepsiburada fiyat bilgisi
+    return [
+        week_label,
+        formatted_date,
+        product.get("barcode", "Barkod yok"),
+        product.get("quantity", 0),
+        product.get("ty_price", 0.0),  # Trendyol fiyat bilgisi
+        product.get("hb_sku", "-"),
+        product.get("hb_stock") if product.get("hb_stock") is not None else "-",
+        hb_price if hb_price > 0 else "-"
+    ]
 
+def iter_existing_excel_rows(filename):
+    """Mevcut haftalık Excel satırlarını EXCEL_COLUMNS sırasına göre akıt"""
+    from openpyxl import load_workbook
+    wb = load_workbook(filename, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = list(next(rows, None) or [])
+        
+        # ESKİ DOSYA UYUMLULUĞU: eksik kolonlar varsayılan değerle doldurulur
+        for col in EXCEL_COLUMNS:
+            if col not in header:
+                logging.info(f"Eski Excel dosyasına {col} kolonu eklendi")
+        positions = [header.index(col) if col in header else None for col in EXCEL_COLUMNS]
+        defaults = ["-" if "HB_" in col else 0.0 for col in EXCEL_COLUMNS]
+        
+        for row in rows:
+            yield [
+                row[pos] if pos is not None and pos < len(row) else default
+                for pos, default in zip(positions, defaults)
+            ]
+    finally:
+        wb.close()
 
+def load_excel_manifest():
+    """{'weeks': {'YYYY_Www': {'shards': [...], 'updates': n}}} biçimindeki manifest"""
+    return storage.read_json(EXCEL_MANIFEST_FILE, lambda: {'weeks': {}})
 
-def save_products_to_excel_weekly(products):
-    """Haftalık Excel kayıt sistemi"""
-    now = datetime.now()
-    formatted_date = now.strftime("%d.%m.%Y %H:%M:%S")
-    filename = get_excel_filename()
-    year, week = get_week_info()
-    week_start, week_end = get_week_date_range()
+def update_excel_manifest(mutate):
+    try:
+        return storage.update_json(EXCEL_MANIFEST_FILE, mutate, default=lambda: {'weeks': {}})
+    finally:
+        cache_backend.invalidate('excel_stats')
+
+def get_week_manifest(year, week):
+    """Haftanın manifest kaydı; kayıt yoksa mevcut dosyalar bir kez taranır (eski dosyalar)"""
+    week_key = f"{year}_W{week:02d}"
+    entry = load_excel_manifest()['weeks'].get(week_key)
+    if entry is not None:
+        return entry
     
-    data_rows = []
-    for product in products:
-        ty_barcode = product.get("barcode", "Barkod yok")
-        ty_quantity = product.get("quantity", 0)
-        ty_price = product.get("ty_price", 0.0)  # Trendyol fiyat bilgisi
-        hb_sku = product.get("hb_sku", "-")
-        hb_stock = product.get("hb_stock") if product.get("hb_stock") is not None else "-"
-        hb_price = product.get("hb_price", 0.0)  # Hepsiburada fiyat bilgisi
-        
-        data_rows.append({
-            'Hafta': f"{year}-W{week:02d}",
-            'Tarih_Saat': formatted_date,
-            'TY_Barkod': ty_barcode,
-            'TY_Stok': ty_quantity,
-            'TY_Fiyat': ty_price,  # Yeni kolon
-            'HB_SKU': hb_sku,
-            'HB_Stok': hb_stock,
-            'HB_Fiyat': hb_price if hb_price > 0 else "-"  # Yeni kolon
+    entry = {'shards': [], 'updates': 0, 'last_batch_rows': 0}
+    for name in list_week_shard_files(year, week):
+        row_count, update_count = scan_excel_history_shared(name)
+        entry['shards'].append({
+            'file': name,
+            'part': parse_weekly_excel_filename(name)[2],
+            'rows': row_count,
+            'size': os.path.getsize(name),
+            'created': datetime.fromtimestamp(os.path.getctime(name)).isoformat(timespec='seconds'),
+            'updated': datetime.fromtimestamp(os.path.getmtime(name)).isoformat(timespec='seconds')
         })
+        entry['updates'] = max(entry['updates'], update_count)
+    if entry['shards']:
+        update_excel_manifest(lambda manifest: manifest['weeks'].setdefault(week_key, entry))
+    return entry
+
+def write_excel_shard(filename, new_rows, max_rows):
+    """Parçayı mevcut satırları + yeni satırlarla yeniden yaz (en fazla max_rows)
+
+    Mevcut dosya read-only modda satır satır okunup write-only bir kitaba
+    akıtılır. Sığmayan satırlar new_rows iterator'ında kalır.
+    (toplam satır, eklenen satır) döner.
+    """
+    from openpyxl import Workbook
+    temp_filename = filename + '.tmp'
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+        ws.append(EXCEL_COLUMNS)
+        total_rows = 0
+        if os.path.exists(filename):
+            for row in iter_existing_excel_rows(filename):
+                ws.append(row)
+                total_rows += 1
+        added = 0
+        for row in itertools.islice(new_rows, max(max_rows - total_rows, 0)):
+            ws.append(row)
+            added += 1
+        wb.save(temp_filename)
+        os.replace(temp_filename, filename)
+        return total_rows + added, added
+    except BaseException:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        raise
+
+def record_excel_shard(week_key, part, filename, row_count, timestamp):
+    shard_info = {'file': filename, 'part': part, 'rows': row_count,
+                  'size': os.path.getsize(filename), 'updated': timestamp}
     
-    new_df = pd.DataFrame(data_rows)
+    def mutate(manifest):
+        entry = manifest['weeks'].setdefault(week_key, {'shards': [], 'updates': 0, 'last_batch_rows': 0})
+        for shard in entry['shards']:
+            if shard['part'] == part:
+                shard.update(shard_info)
+                return
+        entry['shards'].append(dict(shard_info, created=timestamp))
+    update_excel_manifest(mutate)
+
+@metrics.timed('excel_write_seconds', file='stock_weekly')
+def save_products_to_excel_weekly(products=None):
+    """Haftalık Excel kayıt sistemi (parçalı)
+
+    Sadece haftanın son parçası yeniden yazılır; parça MAX_ROWS_PER_FILE
+    satıra ya da MAX_FILE_SIZE_MB boyutuna ulaşınca yeni parçaya
+    (stok_raporu_YYYY_Www_partN.xlsx) geçilir. Böylece yazma maliyeti
+    haftanın toplam boyutundan bağımsızdır ve sınırda satır kaybolmaz.
+    products verilmezse ürünler cache dosyasından okunur.
+    """
+    now = datetime.now()
+    formatted_date = now.strftime("%d.%m.%Y %H:%M:%S")
+    timestamp = now.isoformat(timespec='seconds')
+    year, week = get_week_info()
+    week_key = f"{year}_W{week:02d}"
+    week_label = f"{year}-W{week:02d}"
     
     try:
-        if os.path.exists(filename):
-            # Mevcut dosyayı oku
-            existing_df = pd.read_excel(filename)
-            
-            # ESKİ DOSYA UYUMLULUĞU: Fiyat kolonları yoksa ekle
-            if 'TY_Fiyat' not in existing_df.columns:
-                existing_df['TY_Fiyat'] = 0.0
-                logging.info("Eski Excel dosyasına TY_Fiyat kolonu eklendi")
-            
-            if 'HB_Fiyat' not in existing_df.columns:
-                existing_df['HB_Fiyat'] = "-"
-                logging.info("Eski Excel dosyasına HB_Fiyat kolonu eklendi")
-            
-            # Kolon sırasını yeni formata göre düzenle
-            expected_columns = ['Hafta', 'Tarih_Saat', 'TY_Barkod', 'TY_Stok', 'TY_Fiyat', 'HB_SKU', 'HB_Stok', 'HB_Fiyat']
-            existing_columns = list(existing_df.columns)
+        with storage.locked(EXCEL_HISTORY_LOCK):
+            entry = get_week_manifest(year, week)
+            expected_rows = len(products) if products is not None else entry.get('last_batch_rows', 0)
             
-            # Eksik kolonları ekle
-            for col in expected_columns:
-                if col not in existing_columns:
-                    existing_df[col] = "-" if "HB_" in col else 0.0
+            part = 1
+            if entry['shards']:
+                last = max(entry['shards'], key=lambda shard: shard['part'])
+                part = last['part']
+                # Bu güncelleme son parçaya sığmıyorsa (ya da parça dolduysa) yeni parçaya geç
+                if last['rows'] and (last['rows'] + expected_rows > MAX_ROWS_PER_FILE
+                                     or last['size'] >= MAX_FILE_SIZE_MB * 1024 * 1024):
+                    part += 1
             
-            # Kolon sırasını düzenle
-            existing_df = existing_df.reindex(columns=expected_columns, fill_value="-")
+            rows = iter(product_to_excel_row(product, week_label, formatted_date)
+                        for product in (products if products is not None else iter_products_cache()))
+            batch_rows = 0
+            while True:
+                filename = get_excel_shard_filename(year, week, part)
+                action = "genişletildi ve güncellendi" if os.path.exists(filename) else "oluşturuldu"
+                total_rows, added = write_excel_shard(filename, rows, MAX_ROWS_PER_FILE)
+                batch_rows += added
+                record_excel_shard(week_key, part, filename, total_rows, timestamp)
+                file_size = os.path.getsize(filename) / (1024 * 1024)
+                logging.info(f"Haftalık Excel {action}: {filename} - {total_rows:,} satır, {file_size:.1f} MB")
+                
+                pending_row = next(rows, None)
+                if pending_row is None:
+                    break
+                # Parça doldu: kalan satırlar bir sonraki parçaya
+                rows = itertools.chain([pending_row], rows)
+                part += 1
+                logging.info(f"Haftalık rapor yeni parçaya geçti: part{part}")
             
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-            action = "genişletildi ve güncellendi"
-        else:
-            combined_df = new_df
-            action = "oluşturuldu"
-        
-        combined_df.to_excel(filename, index=False, engine='openpyxl')
-        
-        total_rows = len(combined_df)
-        file_size = os.path.getsize(filename) / (1024 * 1024)
-        
-        logging.info(f"Haftalık Excel {action}: {filename} - {total_rows:,} satır, {file_size:.1f} MB")
-        
-        if total_rows > MAX_ROWS_PER_FILE * 0.8:
-            remaining = MAX_ROWS_PER_FILE - total_rows
-            logging.warning(f"Haftalık dosya dolmak üzere! Kalan: {remaining:,} satır")
-        
-        if file_size > 50:
-            logging.warning(f"Haftalık dosya büyük: {file_size:.1f} MB")
-        
-        cleanup_old_files()
+            def finish(manifest):
+                week_entry = manifest['weeks'][week_key]
+                week_entry['updates'] = week_entry.get('updates', 0) + 1
+                week_entry['last_batch_rows'] = batch_rows
+            update_excel_manifest(finish)
         
     except Exception as e:
         logging.error(f"Haftalık Excel hatası: {str(e)}")
         save_products_to_txt_backup_weekly(products)
+    finally:
+        # Rapor yazıldı (ya da TXT yedeğe düşüldü): parça bilgisi bir sonraki okumada yeniden toplansın
+        get_excel_week_stats.invalidate_all()
 
 
-def save_products_to_txt_backup_weekly(products):
-    """Haftalık TXT backup sistemi"""
+def save_products_to_txt_backup_weekly(products=None):
+    """Haftalık TXT backup sistemi (products verilmezse cache'den okunur)"""
+    if products is None:
+        product_count = sum(1 for _ in iter_products_cache())
+        products = iter_products_cache()
+    else:
+        product_count = len(products)
     now = datetime.now()
     year, week = get_week_info()
     timestamp = now.strftime("%Y%m%d_%H%M%S")
@@ -368,7 +847,7 @@ def save_products_to_txt_backup_weekly(products):
         f.write(f"🔄 HAFTALIK BACKUP STOK RAPORU\n")
         f.write(f"📅 {year} yılı {week}. hafta\n")
         f.write(f"🕐 Oluşturulma: {formatted_date}\n")
-        f.write(f"📊 Ürün Sayısı: {len(products)}\n")
+        f.write(f"📊 Ürün Sayısı: {product_count}\n")
         f.write("=" * 100 + "\n\n")
         
         # Başlık satırı (fiyat bilgileri dahil)
@@ -388,15 +867,46 @@ def save_products_to_txt_backup_weekly(products):
     logging.info(f"Haftalık backup TXT (fiyat bilgisiyle): {filename}")
 
 
-def get_excel_stats_weekly():
-    """Haftalık Excel durumu hakkında bilgi ver"""
+def scan_excel_history_shared(filename):
+    """scan_excel_history sonucunu worker'lar arası paylaşımlı önbellekten al
+
+    Anahtar dosyanın mtime/boyutunu içerdiği için Excel yeniden yazılınca
+    sonuç kendiliğinden geçersiz olur.
+    """
+    stat = os.stat(filename)
+    key = f"excel_scan:{os.path.abspath(filename)}:{stat.st_mtime_ns}:{stat.st_size}"
+    try:
+        shared_cache = cache_backend.get_shared_cache()
+        cached = shared_cache.get(key)
+    except Exception as e:
+        logging.warning(f"Paylaşımlı önbellek okunamadı: {e}")
+        shared_cache, cached = None, None
+    if cached is not None:
+        return cached[0], cached[1]
+    row_count, updates_this_week = scan_excel_history(filename)
+    if shared_cache is not None:
+        try:
+            shared_cache.set(key, [row_count, updates_this_week], ttl=7 * 24 * 3600)
+        except Exception as e:
+            logging.warning(f"Paylaşımlı önbelleğe yazılamadı: {e}")
+    return row_count, updates_this_week
+
+# Paylaşımlı önbellek: manifest'i hangi worker yazarsa yazsın temizleme hepsine yansır
+@cache_backend.cached('excel_stats', EXCEL_STATS_CACHE_SECONDS, backend='sqlite', key=lambda: get_week_info())
+def get_excel_week_stats():
+    """Haftanın Excel parçalarının manifest'ten toplanan bilgisi (zamana bağlı alanlar hariç)"""
     filename = get_excel_filename()
     year, week = get_week_info()
     week_start, week_end = get_week_date_range()
     
-    turkey_tz = pytz.timezone('Europe/Istanbul')
+    try:
+        entry = get_week_manifest(year, week)
+    except Exception as e:
+        logging.warning(f"Excel okuma hatası: {e}")
+        entry = {'shards': [], 'updates': 0}
+    shards = sorted(entry['shards'], key=lambda shard: shard['part'])
     
-    if not os.path.exists(filename):
+    if not shards:
         return {
             "exists": False,
             "filename": filename,
@@ -404,46 +914,55 @@ def get_excel_stats_weekly():
             "message": "Bu hafta henüz Excel raporu oluşturulmamış"
         }
     
-    row_count, creation_time = get_current_excel_info(filename)
-    file_size = os.path.getsize(filename) / (1024 * 1024)
-    
-    capacity_used = (row_count / MAX_ROWS_PER_FILE) * 100
-    age_hours = (datetime.now() - creation_time).total_seconds() / 3600 if creation_time else 0
-    
-    updates_this_week = 0
-    if row_count > 0:
-        try:
-            df = pd.read_excel(filename)
-            updates_this_week = len(df['Tarih_Saat'].unique()) if 'Tarih_Saat' in df.columns else 0
-        except:
-            updates_this_week = 0
-    
-    _, cache_last_updated = load_products_cache()
-    turkey_last_updated = cache_last_updated 
+    current = shards[-1]
+    row_count = sum(shard['rows'] for shard in shards)
+    file_size = sum(shard['size'] for shard in shards) / (1024 * 1024)
+    creation_time = datetime.fromisoformat(shards[0]['created']) if shards[0].get('created') else None
     
+    # Doluluk mevcut (son) parça için hesaplanır
+    capacity_used = (current['rows'] / MAX_ROWS_PER_FILE) * 100
     
     return {
         "exists": True,
-        "filename": filename,
+        "filename": current['file'],
         "week_info": f"{year} yılı {week}. hafta ({week_start} - {week_end})",
         "row_count": row_count,
         "file_size_mb": round(file_size, 2),
         "capacity_used_percent": round(capacity_used, 1),
-        "age_hours": round(age_hours, 1),
-        "updates_this_week": updates_this_week,
-        "creation_time": creation_time.strftime("%d.%m.%Y %H:%M") if creation_time else "Bilinmiyor",
-        "last_updated_turkey": turkey_last_updated
+        "shard_count": len(shards),
+        "shards": [{"filename": shard['file'], "row_count": shard['rows'],
+                    "size_mb": round(shard['size'] / (1024 * 1024), 2)} for shard in shards],
+        "updates_this_week": entry.get('updates', 0),
+        "created_at": creation_time.isoformat() if creation_time else None,
+        "creation_time": creation_time.strftime("%d.%m.%Y %H:%M") if creation_time else "Bilinmiyor"
     }
 
+def get_excel_stats_weekly():
+    """Haftalık Excel durumu hakkında bilgi ver
 
-def get_all_products():
-    all_products = []
+    Parça bilgisi önbellekten gelir; raporun yaşı ve son güncelleme zamanı
+    her çağrıda hesaplanır, önbellek süresince eskimez.
+    """
+    stats = dict(get_excel_week_stats())
+    created_at = stats.pop('created_at', None)
+    if stats['exists']:
+        age_hours = (datetime.now() - datetime.fromisoformat(created_at)).total_seconds() / 3600 if created_at else 0
+        stats['age_hours'] = round(age_hours, 1)
+        stats['last_updated_turkey'] = read_products_cache_meta().get('last_updated_turkey', None)
+    return stats
+
+
+def iter_trendyol_product_pages(on_total=None):
+    """Trendyol ürünlerini sayfa sayfa (fiyat bilgisiyle) döndür
+
+    on_total verilirse ilk sayfada API'nin bildirdiği toplam ürün sayısıyla çağrılır.
+    """
     page = 0
     size = 100
 
     while True:
-        url = f"https://apigw.trendyol.com/integration/product/sellers/{seller_id}/products?page={page}&size={size}"
-        response = requests.get(url, auth=HTTPBasicAuth(api_key, api_secret))
+        url = f"{TRENDYOL_API_BASE}/integration/product/sellers/{seller_id}/products?page={page}&size={size}"
+        response = marketplace_request('GET', url, 'trendyol', 'products', auth=HTTPBasicAuth(api_key, api_secret))
 
         if response.status_code != 200:
             logging.error(f"Trendyol API Hatası: {response.status_code} - {response.text}")
@@ -451,6 +970,8 @@ def get_all_products():
 
         data = response.json()
         products = data.get("content", [])
+        if on_total is not None and page == 0:
+            on_total(data.get("totalElements"))
 
         if not products:
             break
@@ -470,16 +991,24 @@ def get_all_products():
             except (ValueError, TypeError):
                 product['ty_price'] = 0.0
                 
-        all_products.extend(products)
+        yield products
         page += 1
 
+
+def get_all_products():
+    all_products = []
+    for products in iter_trendyol_product_pages():
+        all_products.extend(products)
+
     logging.info(f"Toplam {len(all_products)} Trendyol ürünü fiyat bilgisiyle birlikte alındı")
     return all_products
 
 
-def get_hepsiburada_products():
-    """Hepsiburada'dan tüm ürünleri çek"""
-    all_hb_products = []
+def iter_hepsiburada_listing_pages(on_total=None):
+    """Hepsiburada listelerini sayfa sayfa (fiyat bilgisiyle) döndür
+
+    on_total verilirse ilk sayfada API'nin bildirdiği toplam liste sayısıyla çağrılır.
+    """
     offset = 0
     limit = 50
     
@@ -492,8 +1021,8 @@ def get_hepsiburada_products():
     }
     
     while True:
-        url = f"https://listing-external.hepsiburada.com/listings/merchantid/{hb_merchant_id}?offset={offset}&limit={limit}"
-        response = requests.get(url, headers=headers)
+        url = f"{HB_API_BASE}/listings/merchantid/{hb_merchant_id}?offset={offset}&limit={limit}"
+        response = marketplace_request('GET', url, 'hepsiburada', 'listings', headers=headers)
         
         if response.status_code != 200:
             logging.error(f"Hepsiburada API Hatası: {response.status_code} - {response.text}")
@@ -501,6 +1030,8 @@ def get_hepsiburada_products():
             
         data = response.json()
         listings = data.get('listings', [])
+        if on_total is not None and offset == 0:
+            on_total(data.get('totalCount'))
         
         if not listings:
             break
@@ -516,12 +1047,29 @@ def get_hepsiburada_products():
             except (ValueError, TypeError):
                 product['hb_price'] = 0.0
             
-        all_hb_products.extend(listings)
+        yield listings
         
         if len(listings) < limit:
             break
             
         offset += limit
+
+# Eşzamanlı çağrılar (tam yenileme + snapshot yenilemesi) tek bir çekimi paylaşır;
+# boş sonuç (API hatası) önbelleğe alınmaz
+@cache_backend.cached('hb_products', lambda listings: HB_PRODUCTS_FETCH_CACHE_SECONDS if listings else 0,
+                      key=lambda job=None: 'all')
+@singleflight.single_flight('hb_catalogue', key=lambda job=None: 'all')
+def get_hepsiburada_products(job=None):
+    """Hepsiburada'dan tüm ürünleri slim şemada çek
+
+    Sonuç kısa süre işlem içinde tutulur ve paylaşılır; değiştirilmemeli.
+    job verilirse sayfa ilerlemesi ona raporlanır (çekimi başlatan çağrı için).
+    """
+    job = job or jobs.NULL_JOB
+    all_hb_products = []
+    for listings in iter_hepsiburada_listing_pages(on_total=job.set_total):
+        job.advance(len(listings))
+        all_hb_products.extend(slim_hb_listing(listing) for listing in listings)
     
     logging.info(f"Toplam {len(all_hb_products)} Hepsiburada ürünü fiyat bilgisiyle birlikte alındı")
     return all_hb_products
@@ -540,8 +1088,8 @@ def get_hepsiburada_stock_by_sku(merchant_sku):
     }
     
     try:
-        url = f"https://listing-external.hepsiburada.com/listings/merchantid/{hb_merchant_id}/sku/{merchant_sku}"
-        response = requests.get(url, headers=headers)
+        url = f"{HB_API_BASE}/listings/merchantid/{hb_merchant_id}/sku/{merchant_sku}"
+        response = marketplace_request('GET', url, 'hepsiburada', 'listing_by_sku', headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -553,30 +1101,246 @@ def get_hepsiburada_stock_by_sku(merchant_sku):
         logging.error(f"HB stok çekme exception: {str(e)}")
         return None
 
-def update_hepsiburada_stock(merchant_sku, quantity):
-    """Hepsiburada'da stok güncelle"""
-    if not merchant_sku:
-        return False, "Merchant SKU bulunamadı", None
-        
+def hb_auth_headers(**extra):
     token = base64.b64encode(f"{hb_username}:{hb_password}".encode()).decode()
-    
-    headers = {
-        "Authorization": f"Basic {token}",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "User-Agent": hb_user_agent
+    return dict({"Authorization": f"Basic {token}", "User-Agent": hb_user_agent}, **extra)
+
+# --- Giden değişiklik günlüğü
+# Her gönderim önce günlüğe yazılır; kalemler gönderilmeden önce sahiplenilir
+# (pending -> sending), yanıt gelince sent/done/failed olur. Ağ hatasında kalem
+# 'sending' kalır ve CHANGE_JOURNAL_STALE_SECONDS sonra aynı değerle yeniden
+# gönderilir; stok/fiyat mutlak değer olduğu için tekrar göndermek güvenlidir.
+
+def ty_inventory_changes(items):
+    """Trendyol price-and-inventory satırlarını günlük değişikliklerine çevir"""
+    return [
+        {'marketplace': 'trendyol', 'kind': 'ty_inventory', 'sku': item['barcode'],
+         'fields': {key: value for key, value in item.items() if key != 'barcode'}}
+        for item in items
+    ]
+
+def hb_change(kind, merchant_sku, **fields):
+    return {'marketplace': 'hepsiburada', 'kind': kind, 'sku': merchant_sku, 'fields': fields}
+
+def journal_submit(changes):
+    """Değişiklikleri günlüğe yaz ve gönderilecek kalemleri sahiplen
+
+    (gönderilecek kalemler, enqueue sonuçları) döner; aynı değer zaten
+    bekliyorsa ya da SKU'nun önceki gönderimi henüz sonuçlanmadıysa
+    gönderilecek kalem listesi boş olur.
+    """
+    results = change_journal.enqueue(changes)
+    claimed = change_journal.claim(list(dict.fromkeys(item['id'] for item, _ in results)))
+    return claimed, results
+
+def journal_unsent_message(results):
+    if any(outcome == 'held' or item.get('after') for item, outcome in results):
+        return 'ℹ️ Önceki gönderim sonuçlanınca gönderilecek'
+    return 'ℹ️ Aynı değişiklik zaten gönderilmek üzere bekliyor'
+
+def journal_unsent_response(results):
+    """Hiçbir kalem şimdi gönderilmediğinde dönülecek yanıt"""
+    return {
+        'message': journal_unsent_message(results),
+        'duplicate': all(outcome == 'duplicate' for _, outcome in results),
+        'held': any(outcome == 'held' or item.get('after') for item, outcome in results),
+        'batch_ids': sorted({item['batch_id'] for item, _ in results if item.get('batch_id')}),
+        'change_ids': [item['id'] for item, _ in results]
     }
+
+def journal_add_unsent(payload, claimed, results):
+    """Kısmi gönderimde yanıta şimdi gönderilmeyen SKU'ları ekle
+
+    Aynı istekteki bazı kalemler bekletilmiş ya da zaten bekliyor olabilir;
+    mesaj ve 'unsent' alanı hangi SKU'ların sonra gönderileceğini söyler.
+    """
+    claimed_ids = {item['id'] for item in claimed}
+    unsent = [(item, outcome) for item, outcome in results if item['id'] not in claimed_ids]
+    if unsent:
+        info = journal_unsent_response(unsent)
+        info['skus'] = list(dict.fromkeys(item['sku'] for item, _ in unsent))
+        payload['message'] = f"{payload['message']} | {info['message']}: {', '.join(info['skus'])}"
+        payload['unsent'] = info
+    return payload
+
+MARKETPLACE_NAMES = {'trendyol': 'Trendyol', 'hepsiburada': 'Hepsiburada'}
+
+def circuit_open_response(error):
+    """Devre açıkken gönderim isteğine 503 (değişiklikler günlükte bekler)"""
+    retry_in = max(int(round(error.retry_in)), 1)
+    name = MARKETPLACE_NAMES.get(error.name, error.name)
+    response = jsonify({
+        'error': f"⚠️ {name} API'sine şu anda ulaşılamıyor. Değişiklik kaydedildi; "
+                 f"bağlantı düzelince otomatik gönderilecek (~{retry_in} sn).",
+        'degraded': True,
+        'marketplace': error.name,
+        'retry_in': retry_in
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_in)
+    return response
+
+def _finish_journal_send(items, response, batch_key):
+    ids = [item['id'] for item in items]
+    if response.status_code == 200:
+        try:
+            batch_id = response.json().get(batch_key) if response.text else None
+        except ValueError:
+            batch_id = None
+        if batch_id:
+            change_journal.mark_sent(ids, batch_id)
+        else:
+            change_journal.mark_done(ids)
+    else:
+        change_journal.mark_failed(ids, f"{response.status_code}: {response.text[:300]}")
+    return response
+
+def _journal_request(items, *args, **kwargs):
+    """Sahiplenilmiş kalemler için marketplace_request
+
+    Devre açıksa istek hiç gönderilmediğinden kalemler 'pending' durumuna
+    döner ve devre kapanınca yeniden oynatılır; hata çağırana iletilir.
+    """
+    try:
+        return marketplace_request(*args, **kwargs)
+    except circuit_breaker.CircuitOpenError as e:
+        change_journal.release([item['id'] for item in items], str(e))
+        raise
+
+def send_ty_inventory(items, timeout=30):
+    """Sahiplenilmiş TY kalemlerini tek price-and-inventory isteğiyle gönder"""
+    url = f"{TRENDYOL_API_BASE}/integration/inventory/sellers/{seller_id}/products/price-and-inventory"
+    response = _journal_request(
+        items, 'POST', url, 'trendyol', 'price_and_inventory',
+        auth=HTTPBasicAuth(api_key, api_secret),
+        json={'items': [dict(item['fields'], barcode=item['sku']) for item in items]},
+        headers={'Content-Type': 'application/json'},
+        timeout=timeout
+    )
+    return _finish_journal_send(items, response, 'batchRequestId')
+
+def send_hb_stock(items, timeout=30):
+    url = f"{HB_API_BASE}/listings/merchantid/{hb_merchant_id}/stock-uploads"
+    payload = [{"merchantSku": item['sku'], "availableStock": item['fields']['availableStock']} for item in items]
+    response = _journal_request(
+        items, 'POST', url, 'hepsiburada', 'stock_uploads',
+        headers=hb_auth_headers(**{"Accept": "application/json", "Content-Type": "application/json"}),
+        json=payload, timeout=timeout
+    )
+    cache_backend.invalidate('hb_products')
+    return _finish_journal_send(items, response, 'id')
+
+def send_hb_price(items, timeout=30):
+    url = f"{HB_API_BASE}/listings/merchantid/{hb_merchant_id}/price-uploads"
+    # HB API payload formatı (Dokümana göre array)
+    payload = [{"hepsiburadaSku": None, "merchantSku": item['sku'], "price": item['fields']['price']}
+               for item in items]
+    response = _journal_request(
+        items, 'POST', url, 'hepsiburada', 'price_uploads',
+        headers=hb_auth_headers(**{'accept': 'application/json', 'content-type': 'application/*+json'}),
+        json=payload, timeout=timeout
+    )
+    cache_backend.invalidate('hb_products')
+    return _finish_journal_send(items, response, 'id')
+
+JOURNAL_SENDERS = {
+    'ty_inventory': send_ty_inventory,
+    'hb_stock': send_hb_stock,
+    'hb_price': send_hb_price
+}
+HB_UPLOAD_TYPES = {'hb_stock': 'stock', 'hb_price': 'price'}
+
+def _sent_items(batch_id):
+    return [item for item in change_journal.open_items('sent') if item.get('batch_id') == batch_id]
+
+def resolve_ty_batch(batch_id, batch_status):
+    """TY batch sonucunu günlükteki kalemlere işle (sonuç henüz yoksa dokunmaz)"""
+    results = batch_status.get('items') or []
+    if 'error' in batch_status or not results:
+        return
+    by_barcode = {result.get('requestItem', {}).get('barcode'): result for result in results}
+    done = []
+    for item in _sent_items(batch_id):
+        result = by_barcode.get(item['sku'])
+        if result is None:
+            continue
+        if result.get('status') == 'SUCCESS':
+            done.append(item['id'])
+        else:
+            change_journal.mark_failed([item['id']], ', '.join(result.get('failureReasons', [])) or 'FAILED')
+    change_journal.mark_done(done)
+
+def resolve_hb_batch(batch_id, batch_status):
+    """HB upload sonucunu günlükteki kalemlere işle"""
+    status = str(batch_status.get('status', '')).lower()
+    if 'error' in batch_status or not status:
+        return
+    ids = [item['id'] for item in _sent_items(batch_id)]
+    errors = batch_status.get('errors') or []
+    if status in ('done', 'completed', 'success') and not errors:
+        change_journal.mark_done(ids)
+    elif status in ('done', 'completed', 'success', 'failed', 'error'):
+        change_journal.mark_failed(ids, json.dumps(errors, ensure_ascii=False)[:300] or status)
+
+def replay_change_journal():
+    """Açılışta ve periyodik: bekleyen batch'leri sonuçlandır, yarım kalanları gönder"""
+    expire_before = (datetime.now() - timedelta(hours=CHANGE_JOURNAL_SENT_EXPIRE_HOURS)).isoformat()
+    batches = {}
+    expired = []
+    for item in change_journal.open_items('sent'):
+        if item['updated'] < expire_before:
+            expired.append(item['id'])
+        else:
+            batches.setdefault((item['kind'], item['batch_id']), None)
+    change_journal.expire(expired)
+    # Bir pazaryerinin hatası diğerinin batch'lerini/gönderimlerini engellemesin
+    for kind, batch_id in batches:
+        try:
+            if kind == 'ty_inventory':
+                resolve_ty_batch(batch_id, check_batch_status(batch_id))
+            else:
+                resolve_hb_batch(batch_id, check_hb_batch_status(batch_id, HB_UPLOAD_TYPES[kind]))
+        except Exception as e:
+            logging.error(f"Değişiklik günlüğü batch kontrolü hatası ({kind} {batch_id}): {e}")
     
-    payload = [
-        {
-            "merchantSku": merchant_sku,
-            "availableStock": quantity
-        }
-    ]
+    # İstek içinde hemen gönderilen kalemlerle yarışmamak için sadece eski kalemler;
+    # önceki gönderimi bekletilen kalemler o sonuçlanınca yaşına bakılmadan gönderilir.
+    # Devresi açık pazaryerinin kalemleri sahiplenilmez, devre kapanınca gönderilir.
+    stale_before = (datetime.now() - timedelta(seconds=CHANGE_JOURNAL_STALE_SECONDS)).isoformat()
+    available = {}
+    candidates = [item['id'] for item in change_journal.open_items()
+                  if item['state'] in ('pending', 'sending')
+                  and (item['created'] <= stale_before or item.get('after'))
+                  and available.setdefault(item['marketplace'], circuit_breaker.is_available(item['marketplace']))]
+    claimed = change_journal.claim(candidates, stale_after=CHANGE_JOURNAL_STALE_SECONDS)
+    by_kind = {}
+    for item in claimed:
+        by_kind.setdefault(item['kind'], []).append(item)
+    for kind, items in by_kind.items():
+        for start in range(0, len(items), TRENDYOL_PRICE_BATCH_SIZE):
+            try:
+                JOURNAL_SENDERS[kind](items[start:start + TRENDYOL_PRICE_BATCH_SIZE], timeout=60)
+            except Exception as e:
+                logging.error(f"Değişiklik günlüğü yeniden gönderim hatası ({kind}): {e}")
+                break  # Kalan parçalar 'sending' kalır, sonraki turda yeniden denenir
+    if claimed or expired or batches:
+        logging.info(f"Değişiklik günlüğü: {len(batches)} batch kontrol edildi, "
+                     f"{len(claimed)} kalem yeniden gönderildi, {len(expired)} kalem süresi doldu")
+    return {'batches_checked': len(batches), 'resent': len(claimed), 'expired': len(expired)}
+
+def update_hepsiburada_stock(merchant_sku, quantity):
+    """Hepsiburada'da stok güncelle (değişiklik günlüğü üzerinden)
+
+    HB devresi açıksa circuit_breaker.CircuitOpenError çağırana iletilir.
+    """
+    if not merchant_sku:
+        return False, "Merchant SKU bulunamadı", None
     
     try:
-        url = f"https://listing-external.hepsiburada.com/listings/merchantid/{hb_merchant_id}/stock-uploads"
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        claimed, results = journal_submit([hb_change('hb_stock', merchant_sku, availableStock=quantity)])
+        if not claimed:
+            return True, f"HB stok: {journal_unsent_message(results)}", None
+        response = send_hb_stock(claimed)
         
         if response.status_code == 200:
             response_data = response.json()
@@ -589,41 +1353,76 @@ def update_hepsiburada_stock(merchant_sku, quantity):
         else:
             return False, f"HB stok güncelleme hatası: {response.status_code}", None
             
+    except circuit_breaker.CircuitOpenError:
+        raise
     except Exception as e:
         logging.error(f"HB Exception: {e}")
         return False, f"HB stok güncelleme hatası", None
 
+@metrics.timed('json_io_seconds', file='matches', op='load')
 def load_matches():
-    if os.path.exists(MATCHES_FILE):
-        with open(MATCHES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return storage.read_json(MATCHES_FILE, dict)
 
 # Yardımcı fonksiyonlar bölümüne eklenecek (load_matches fonksiyonundan sonra)
+@metrics.timed('json_io_seconds', file='product_links', op='load')
 def load_product_links():
     """Ürün linklerini JSON dosyasından yükle"""
-    if os.path.exists(PRODUCT_LINKS_FILE):
-        try:
-            with open(PRODUCT_LINKS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            logging.error(f"Ürün linkleri yükleme hatası: {e}")
-            return {}
-    return {}
+    try:
+        return storage.read_json(PRODUCT_LINKS_FILE, dict)
+    except Exception as e:
+        logging.error(f"Ürün linkleri yükleme hatası: {e}")
+        return {}
 
+@metrics.timed('json_io_seconds', file='product_links', op='save')
 def save_product_links(links_data):
     """Ürün linklerini JSON dosyasına kaydet"""
     try:
-        with open(PRODUCT_LINKS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(links_data, f, ensure_ascii=False, indent=2)
+        storage.write_json(PRODUCT_LINKS_FILE, links_data, coalesce=True)
         return True
     except Exception as e:
         logging.error(f"Ürün linkleri kaydetme hatası: {e}")
         return False
 
+@metrics.timed('json_io_seconds', file='product_links', op='update')
+def update_product_links(mutate):
+    """Ürün linklerini kilit altında güncelle; (başarı, mutate sonucu) döndürür"""
+    try:
+        return True, storage.update_json(PRODUCT_LINKS_FILE, mutate, coalesce=True)
+    except Exception as e:
+        logging.error(f"Ürün linkleri kaydetme hatası: {e}")
+        return False, None
+
+@metrics.timed('json_io_seconds', file='matches', op='save')
 def save_matches_to_file(data):
-    with open(MATCHES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    storage.write_json(MATCHES_FILE, data, coalesce=True)
+
+@metrics.timed('json_io_seconds', file='matches', op='update')
+def update_matches(new_matches):
+    """Yeni eşleştirmeleri mevcutlarla kilit altında birleştir"""
+    def apply(saved_matches):
+        for trendyol_barcode, matched_sku in new_matches.items():
+            saved_matches[trendyol_barcode] = matched_sku.strip()
+    def written(previous, current):
+        # Değişiklik indekse zaten uygulandı; kendi yazmamız yeniden kurulum gerektirmez
+        match_index.advance_signature(MATCH_INDEX_SOURCES.index(MATCHES_FILE), previous, current)
+    storage.update_json(MATCHES_FILE, apply, coalesce=True, on_written=written)
+    # İndeks kurulmuşsa sadece değişen eşleştirmeler işlenir
+    if match_index.built:
+        match_index.apply(new_matches)
+
+# Eşleştirme indeksi bu dosyalardan biri değişince yeniden kurulur
+MATCH_INDEX_SOURCES = (PRODUCTS_CACHE_FILE, HB_PRODUCTS_CACHE_FILE, MATCHES_FILE)
+
+def _load_match_index_sources():
+    products, _ = load_products_cache()
+    listings, _ = load_hb_products_cache()
+    return (load_matches(),
+            (product.get('barcode', '') for product in products),
+            (listing.get('merchantSku', '') for listing in listings if listing.get('merchantSku')))
+
+def get_match_index():
+    """Güncel iki yönlü eşleştirme indeksini döndür"""
+    return match_index.ensure(files_signature(MATCH_INDEX_SOURCES), _load_match_index_sources)
 
 # Decorators
 def login_required(f):
@@ -643,81 +1442,50 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-@app.route('/debug-session')
-@login_required
-def debug_session():
-    """SECRET_KEY test sayfası"""
-    import hashlib
-    
-    session_data = dict(session)
-    secret_key = app.secret_key
-    secret_hash = hashlib.md5(secret_key.encode()).hexdigest()[:10] if secret_key else "YOK"
-    cookie_info = request.cookies.get('session', 'Cookie bulunamadı')
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head><title>SECRET_KEY Test</title></head>
-    <body style="font-family: Arial; margin: 40px;">
-        <h1>🔐 SECRET_KEY Test Sayfası</h1>
-        
-        <h3>✅ SECRET_KEY Durumu:</h3>
-        <p><strong>SECRET_KEY Hash:</strong> {secret_hash}</p>
-        <p><strong>Durum:</strong> {'✅ ÇALIŞIYOR' if secret_key else '❌ YOK'}</p>
-        
-        <h3>📱 Session Verileri:</h3>
-        <pre>{session_data}</pre>
-        
-        <h3>🍪 Session Cookie:</h3>
-        <p style="word-break: break-all; font-size: 12px;">{cookie_info}</p>
-        
-        <h3>🧪 Test Sonucu:</h3>
-        <p style="color: green; font-weight: bold;">
-            Eğer bu sayfayı görüyorsanız SECRET_KEY çalışıyor! 🎉
-        </p>
-        
-        <a href="{url_for('index')}">← Ana Sayfaya Dön</a>
-    </body>
-    </html>
-    """
-    return html 
-
-# Rate limiting için basit cache
-login_attempts = {}
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_seconds', time.perf_counter() - start,
+                        route=route, method=request.method, status=response.status_code)
+    return response
+
+# Login denemeleri için kayan pencere sınırlayıcı
+# (RATE_LIMIT_BACKEND=sqlite ile worker işlemleri arasında paylaşılır)
+LOGIN_MAX_ATTEMPTS = 5
+LOGIN_WINDOW_SECONDS = 15 * 60
+login_rate_limiter = rate_limit.create_store(LOGIN_WINDOW_SECONDS)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
         
-        now = datetime.now()
-        if client_ip in login_attempts:
-            last_attempt, count = login_attempts[client_ip]
-            if now - last_attempt < timedelta(minutes=15) and count >= 5:
-                flash('Çok fazla deneme! 15 dakika bekleyin.', 'error')
-                return render_template('login.html')
+        if login_rate_limiter.count(client_ip) >= LOGIN_MAX_ATTEMPTS:
+            flash('Çok fazla deneme! 15 dakika bekleyin.', 'error')
+            return render_template('login.html')
         
         username = request.form['username']
         password = request.form['password']
         
         if verify_user(username, password):
-            if client_ip in login_attempts:
-                del login_attempts[client_ip]
+            login_rate_limiter.reset(client_ip)
                 
             session['logged_in'] = True
             session['username'] = username
             
-            users = load_users()
-            session['role'] = users[username].get('role', 'user')
+            user = get_user(username) or {}
+            session['role'] = user.get('role', 'user')
             
             flash('Başarıyla giriş yaptınız!', 'success')
             return redirect(url_for('index'))
         else:
-            if client_ip in login_attempts:
-                last_attempt, count = login_attempts[client_ip]
-                login_attempts[client_ip] = (now, count + 1)
-            else:
-                login_attempts[client_ip] = (now, 1)
+            login_rate_limiter.hit(client_ip)
                 
             flash('Kullanıcı adı veya şifre hatalı!', 'error')
     
@@ -771,242 +1539,234 @@ def profile():
 
 @app.route('/')
 @login_required
+@response_cache.cached_response(PRODUCTS_CACHE_FILE)
 def index():
-    products, last_updated = load_products_cache()
+    """Ana sayfa: başlık sayıları /dashboard/summary'den, satırlar /products/rows'tan yüklenir"""
+    return render_template('index.html',
+                         last_updated=read_products_cache_meta().get('last_updated_turkey'))
+
+@app.route('/products/rows')
+@login_required
+@response_cache.cached_response(PRODUCTS_CACHE_FILE)
+def product_rows():
+    """Ana sayfa tablosunun satırları (tablo görünür olunca istenir)"""
+    products, _ = load_products_cache()
+    return render_template('_product_rows.html', products=products)
+
+
+
+def build_hb_sku_index(job=None):
+    """HB listelerinden merchantSku -> slim listeleme indeksi kur"""
+    return {listing['merchantSku']: listing for listing in get_hepsiburada_products(job) if listing['merchantSku']}
+
+def join_hb_data(product, saved_matches, hb_index):
+    """TY ürününe eşleşen HB stok/fiyat bilgisini ekle ve slim kaydı döndür"""
+    ty_barcode = product.get('barcode', '')
+    hb_sku = saved_matches.get(ty_barcode, '')
+    
+    product['hb_sku'] = hb_sku
+    product['hb_stock'] = None
+    product['hb_price'] = 0.0  # Hepsiburada fiyat bilgisi için yeni alan
     
-    if not products:
-        products = []
-        last_updated = None
+    if hb_sku:
+        hb_listing = hb_index.get(hb_sku)
+        if hb_listing is not None:
+            product['hb_stock'] = hb_listing['availableStock']
+            product['hb_price'] = hb_listing['hb_price']
+        else:
+            product['hb_stock'] = get_hepsiburada_stock_by_sku(hb_sku)
+            product['hb_price'] = 0.0  # Tek tek çekerken fiyat bilgisi şimdilik 0
     
-    return render_template('index.html', 
-                         products=products, 
-                         last_updated=last_updated)
+    return slim_product(product)
 
+# Veri yenileme işinin aşamaları (SSE ilerlemesinde bu sırayla görünür)
+REFRESH_STAGES = ('fetch_ty', 'fetch_hb', 'join', 'persist', 'history')
 
+def perform_refresh(job=None):
+    """Verileri akış halinde yenile
 
-@app.route('/refresh_data', methods=['POST'])
-@login_required
-def refresh_data():
+    TY sayfaları geldikçe HB SKU indeksiyle birleştirilip doğrudan cache
+    dosyasına yazılır; haftalık Excel de cache'den satır satır beslenir.
+    Katalog hiçbir aşamada bellekte bütün olarak tutulmaz. Sonuç dict'i
+    döner; hata durumunda dict'te 'error' anahtarı bulunur. job verilirse
+    aşama ilerlemesi ona raporlanır.
+    """
+    job = job or jobs.NULL_JOB
     try:
         logging.info("Veri yenileme başlatılıyor...")
         
-        products = get_all_products()
-        
-        if not products:
-            return jsonify({'error': 'Trendyol ürünleri alınamadı'}), 500
-        
-        logging.info(f"{len(products)} Trendyol ürünü alındı")
-        
-        saved_matches = load_matches()
+        ty_total = None
+        
+        def set_ty_total(total):
+            nonlocal ty_total
+            ty_total = total
+            job.set_total(total)
+        
+        job.stage('fetch_ty')
+        ty_pages = iter_trendyol_product_pages(on_total=set_ty_total)
+        first_page = next(ty_pages, None)
+        
+        if not first_page:
+            metrics.inc('refresh_runs_total', status='error')
+            return {'error': 'Trendyol ürünleri alınamadı'}
+        job.advance(len(first_page))
+        
+        saved_matches = get_match_index().matches
+        
+        job.stage('fetch_hb')
+        with metrics.timed('refresh_stage_seconds', stage='hb_index'):
+            hb_index = build_hb_sku_index(job)
+        logging.info(f"{len(hb_index)} Hepsiburada ürünü alındı")
+        
+        product_count = 0
+        
+        def enriched_products():
+            nonlocal product_count
+            for page in itertools.chain([first_page], ty_pages):
+                for product in page:
+                    product_count += 1
+                    yield join_hb_data(product, saved_matches, hb_index)
+                job.advance(len(page))
+        
+        # Kalan TY sayfaları bu aşamada çekilip birleştirilerek cache'e akıtılır
+        job.stage('join', total=ty_total)
+        with metrics.timed('refresh_stage_seconds', stage='ty_fetch_join_cache'):
+            cache_saved = save_products_cache(enriched_products())
+        
+        if not cache_saved:
+            metrics.inc('refresh_runs_total', status='error')
+            return {'error': 'Veriler cache\'e kaydedilemedi'}
+        
+        job.stage('persist')
+        if hb_index:
+            save_hb_products_cache(hb_index.values())
+        # Yeni ürün ve HB listeleriyle eşleştirme indeksi ve pano özeti burada hazırlanır
+        get_match_index()
+        refresh_dashboard_summary_async()
+        
+        logging.info(f"{product_count} Trendyol ürünü alındı")
+        metrics.inc('refresh_products_total', product_count)
+        metrics.set_gauge('refresh_last_product_count', product_count)
+        metrics.inc('refresh_runs_total', status='success')
+        job.stage('history')
+        with metrics.timed('refresh_stage_seconds', stage='excel_history'):
+            save_products_to_excel_weekly()
+        excel_stats = get_excel_stats_weekly()
         
-        hb_products = get_hepsiburada_products()
-        hb_stock_dict = {}
-        hb_price_dict = {}  # Fiyat bilgisi için yeni dict
-        
-        for hb_product in hb_products:
-            merchant_sku = hb_product.get('merchantSku', '')
-            if merchant_sku:
-                stock = hb_product.get('availableStock')
-                price = hb_product.get('hb_price', 0.0)  # Yeni eklenen fiyat bilgisi
-                hb_stock_dict[merchant_sku] = stock
-                hb_price_dict[merchant_sku] = price  # Fiyat bilgisini kaydet
-        
-        logging.info(f"{len(hb_products)} Hepsiburada ürünü alındı")
-        
-        for product in products:
-            ty_barcode = product.get('barcode', '')
-            hb_sku = saved_matches.get(ty_barcode, '')
-            
-            product['hb_sku'] = hb_sku
-            product['hb_stock'] = None
-            product['hb_price'] = 0.0  # Hepsiburada fiyat bilgisi için yeni alan
-            
-            if hb_sku:
-                if hb_sku in hb_stock_dict:
-                    hb_stock = hb_stock_dict[hb_sku]
-                    hb_price = hb_price_dict.get(hb_sku, 0.0)  # Fiyat bilgisini al
-                else:
-                    hb_stock = get_hepsiburada_stock_by_sku(hb_sku)
-                    hb_price = 0.0  # Tek tek çekerken fiyat bilgisi şimdilik 0
-                    
-                product['hb_stock'] = hb_stock
-                product['hb_price'] = hb_price  # Fiyat bilgisini ürüne ekle
-        
-        if save_products_cache(products):
-            save_products_to_excel_weekly(products)
-            excel_stats = get_excel_stats_weekly()
-            
-            return jsonify({
-                'message': f'✅ Veriler başarıyla yenilendi! {len(products)} ürün işlendi.',
-                'product_count': len(products),
-                'last_updated': get_current_turkey_time(),
-                'excel_info': excel_stats
-            })
-        else:
-            return jsonify({'error': 'Veriler cache\'e kaydedilemedi'}), 500
+        return {
+            'message': f'✅ Veriler başarıyla yenilendi! {product_count} ürün işlendi.',
+            'product_count': product_count,
+            'last_updated': get_current_turkey_time(),
+            'excel_info': excel_stats
+        }
             
     except Exception as e:
+        metrics.inc('refresh_runs_total', status='error')
         logging.error(f"Veri yenileme hatası: {str(e)}")
-        return jsonify({'error': f'Veri yenileme hatası: {str(e)}'}), 500
+        return {'error': f'Veri yenileme hatası: {str(e)}'}
 
-@app.route('/match')
-@login_required
-def match():
-    cached_products, last_updated = load_products_cache()
-    
-    if not cached_products:
-        flash('Önce ana sayfadan "Verileri Yenile" butonuna tıklayarak verileri yükleyin!', 'error')
-        return render_template('match.html', 
-                             trendyol_products=[],
-                             hepsiburada_products=[],
-                             cache_empty=True,
-                             last_updated=None)
-    
-    logging.info(f"Cache'den {len(cached_products)} ürün yüklendi")
-    
-    hepsiburada_products = get_hepsiburada_products()
-    
-    trendyol_products = []
-    for product in cached_products:
-        trendyol_products.append({
-            'barcode': product.get('barcode', ''),
-            'images': product.get('images', [])[:1],
-            'title': product.get('title', ''),
-        })
-    
-    logging.info(f"{len(trendyol_products)} TY, {len(hepsiburada_products)} HB ürünü hazırlandı")
-    
-    saved_matches = load_matches()
+# Yenileme tüm worker'larda tektir: REFRESH_LOCK'u tutan iş sürerken gelen
+# istekler aynı işin id'sini alır. Kilit iş bitene kadar tutulduğu için iki
+# yenileme products_cache.json'a ve haftalık Excel'e aynı anda yazamaz.
+REFRESH_LOCK = 'refresh_data'
+REFRESH_FLIGHT_KEY = 'singleflight:refresh'
 
-    for product in trendyol_products:
-        product['matched_hb_sku'] = saved_matches.get(product['barcode'], '')
-    
-    return render_template('match.html', 
-                         trendyol_products=trendyol_products,
-                         hepsiburada_products=hepsiburada_products,
-                         cache_empty=False,
-                         last_updated=last_updated)
-
-@app.route('/users')
-@admin_required
-def users():
-    users_data = load_users()
-    return render_template('users.html', users=users_data)
-
-@app.route('/add_user', methods=['POST'])
-@admin_required
-def add_user_route():
-    try:
-        username = request.form.get('username', '').strip()
-        password = request.form.get('password', '').strip()
-        role = request.form.get('role', 'user').strip()
-        
-        if not username:
-            flash('Kullanıcı adı boş olamaz!', 'error')
-            return redirect(url_for('users'))
-        
-        if not password:
-            flash('Şifre boş olamaz!', 'error')
-            return redirect(url_for('users'))
-        
-        if len(password) < 4:
-            flash('Şifre en az 4 karakter olmalıdır!', 'error')
-            return redirect(url_for('users'))
-        
-        if role not in ['admin', 'user']:
-            flash('Geçersiz rol seçimi!', 'error')
-            return redirect(url_for('users'))
-        
-        success, message = add_user(username, password, role)
-        if success:
-            flash(message, 'success')
-        else:
-            flash(message, 'error')
-        
-        return redirect(url_for('users'))
-        
-    except Exception as e:
-        flash(f'Kullanıcı eklenirken hata oluştu: {str(e)}', 'error')
-        return redirect(url_for('users'))
+def start_refresh_job(owner=None):
+    """Veri yenilemeyi arka plan işi olarak başlat; iş id'si döner
 
-@app.route('/reset_password/<username>', methods=['POST'])
-@admin_required
-def reset_password(username):
-    try:
-        if not username or len(username) > 50 or not username.isalnum():
-            flash('Geçersiz kullanıcı adı!', 'error')
-            return redirect(url_for('users'))
-        
-        new_password = request.form.get('new_password', '').strip()
-        
-        if not new_password:
-            flash('Yeni şifre boş olamaz!', 'error')
-            return redirect(url_for('users'))
-        
-        if len(new_password) < 4:
-            flash('Şifre en az 4 karakter olmalıdır!', 'error')
-            return redirect(url_for('users'))
-        
-        users = load_users()
-        if username in users:
-            users[username]['password_hash'] = generate_password_hash(new_password)
-            users[username]['password_reset_at'] = datetime.now().isoformat()
-            users[username]['reset_by'] = session['username']
-            save_users(users)
-            flash(f'{username} kullanıcısının şifresi başarıyla sıfırlandı! Yeni şifre: {new_password}', 'success')
-        else:
-            flash('Kullanıcı bulunamadı!', 'error')
+    Başka bir yenileme (bu ya da başka bir worker'da) sürüyorsa yenisi
+    başlatılmaz, çalışanın id'si döner. O id okunamazsa None.
+    """
+    with storage.locked(REFRESH_LOCK + '.start'):
+        running = jobs.find_running('refresh')
+        if running is not None:
+            metrics.inc('singleflight_calls_total', op='refresh', role='follower')
+            return running.id
+        process_lock = storage.try_lock(REFRESH_LOCK)
+        if process_lock is None:
+            metrics.inc('singleflight_calls_total', op='refresh', role='follower')
+            try:
+                return cache_backend.get_shared_cache().get(REFRESH_FLIGHT_KEY)
+            except Exception as e:
+                logging.warning(f"Çalışan yenileme işi okunamadı: {e}")
+                return None
         
-        return redirect(url_for('users'))
+        def run(job):
+            try:
+                return perform_refresh(job)
+            finally:
+                process_lock.release()
         
-    except Exception as e:
-        flash('Şifre sıfırlanırken hata oluştu!', 'error')
-        return redirect(url_for('users'))
+        # Tekillik dosya kilidiyle sağlanıyor; exclusive=False ile start() her
+        # zaman run'ı çalıştırır, kilit de yalnızca run içinde bırakılır
+        try:
+            job = jobs.start('refresh', run, REFRESH_STAGES, owner=owner, exclusive=False)
+        except Exception:
+            process_lock.release()
+            raise
+        metrics.inc('singleflight_calls_total', op='refresh', role='leader')
+        try:
+            cache_backend.get_shared_cache().set(REFRESH_FLIGHT_KEY, job.id, ttl=jobs.JOB_SNAPSHOT_TTL)
+        except Exception as e:
+            logging.warning(f"Yenileme işi paylaşılamadı: {e}")
+        return job.id
 
-@app.route('/delete_user/<username>')
-@admin_required
-def delete_user(username):
-    try:
-        if not username or len(username) > 50 or not username.isalnum():
-            flash('Geçersiz kullanıcı adı!', 'error')
-            return redirect(url_for('users'))
-        
-        if username == session['username']:
-            flash('Kendi hesabınızı silemezsiniz!', 'error')
-            return redirect(url_for('users'))
-        
-        users = load_users()
-        if username in users:
-            del users[username]
-            save_users(users)
-            flash(f'{username} kullanıcısı başarıyla silindi!', 'success')
-        else:
-            flash('Kullanıcı bulunamadı!', 'error')
-        
-        return redirect(url_for('users'))
-        
-    except Exception as e:
-        flash('Kullanıcı silinirken hata oluştu!', 'error')
-        return redirect(url_for('users'))
+@app.route('/refresh_data', methods=['POST'])
+@login_required
+def refresh_data():
+    """Yenilemeyi arka planda başlatır; ilerleme /jobs/<id>/events üzerinden izlenir
+
+    ?wait=1 ile iş bitene kadar beklenir ve sonuç doğrudan döner (script/benchmark).
+    """
+    job_id = start_refresh_job(owner=session.get('username'))
+    if job_id is None:
+        return jsonify({'error': 'Başka bir yenileme sürüyor, lütfen biraz sonra tekrar deneyin'}), 409
+    if request.args.get('wait') == '1':
+        snapshot = jobs.wait_for(job_id) or {'status': 'error', 'error': 'Yenileme işinin durumu alınamadı'}
+        if snapshot['status'] == 'error':
+            return jsonify(snapshot.get('result') or {'error': snapshot['error']}), 500
+        return jsonify(snapshot['result'])
+    return jsonify({
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id),
+        'events_url': url_for('job_events', job_id=job_id)
+    }), 202
 
-@app.route('/save_match', methods=['POST'])
+@app.route('/jobs')
 @login_required
-def save_match():
-    try:
-        data = request.get_json()
-        if not data or 'matches' not in data:
-            return jsonify({'error': 'Geçersiz istek verisi'}), 400
+def jobs_list():
+    return jsonify({'jobs': jobs.list_jobs(request.args.get('kind'))})
 
-        new_matches = data['matches']
-        saved_matches = load_matches()
+@app.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    snapshot = jobs.get_snapshot(job_id)
+    if snapshot is None:
+        return jsonify({'error': 'İş bulunamadı'}), 404
+    return jsonify(snapshot)
 
-        for trendyol_barcode, matched_sku in new_matches.items():
-            saved_matches[trendyol_barcode] = matched_sku.strip()
+@app.route('/jobs/<job_id>/events')
+@login_required
+def job_events(job_id):
+    """İş ilerlemesini Server-Sent Events olarak yayınla
 
-        save_matches_to_file(saved_matches)
-        return jsonify({'message': 'Eşleştirme kaydedildi'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    Akış iş bitene kadar bir worker thread'ini tutar (bkz. gunicorn.conf.py threads).
+    """
+    if jobs.get_snapshot(job_id) is None:
+        return jsonify({'error': 'İş bulunamadı'}), 404
+    response = Response(jobs.stream_events(job_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def refresh_hb_snapshot_if_stale():
+    """HB snapshot dosyası eskiyse arka plan yenilemesini başlat (dosya okunmaz)"""
+    try:
+        modified = datetime.fromtimestamp(os.path.getmtime(HB_PRODUCTS_CACHE_FILE))
+    except OSError:
+        return
+    if is_hb_cache_stale(modified.isoformat()):
+        refresh_hb_products_cache_async()
 
 @app.route('/update_stock', methods=['POST'])
 @login_required
@@ -1017,16 +1777,13 @@ def update_stock():
         if not data or 'items' not in data:
             return jsonify({'error': 'Geçersiz istek verisi'}), 400
 
-        url = f"https://apigw.trendyol.com/integration/inventory/sellers/{seller_id}/products/price-and-inventory"
-        headers = {'Content-Type': 'application/json'}
+        if not all(isinstance(item, dict) and item.get('barcode') for item in data['items']):
+            return jsonify({'error': 'Her satırda barkod gerekli'}), 400
         
-        response = requests.post(
-            url,
-            auth=HTTPBasicAuth(api_key, api_secret),
-            json=data,
-            headers=headers,
-            timeout=30
-        )
+        claimed, results = journal_submit(ty_inventory_changes(data['items']))
+        if not claimed:
+            return jsonify(journal_unsent_response(results))
+        response = send_ty_inventory(claimed)
 
         if response.status_code == 200:
             response_data = response.json()
@@ -1037,6 +1794,7 @@ def update_stock():
                 time.sleep(5)
                 
                 batch_status = check_batch_status(batch_id)
+                resolve_ty_batch(batch_id, batch_status)
                 
                 item_count = batch_status.get('itemCount', 0)
                 failed_count = batch_status.get('failedItemCount', 0)
@@ -1062,7 +1820,7 @@ def update_stock():
                     else:
                         message = f"⚠️ Kısmi başarı: {len(success_items)} başarılı, {failed_count} hatalı"
                     
-                    return jsonify({
+                    return jsonify(journal_add_unsent({
                         'message': message,
                         'batch_id': batch_id,
                         'completed': True,
@@ -1070,27 +1828,29 @@ def update_stock():
                         'failed_items': failed_items,
                         'item_count': item_count,
                         'failed_count': failed_count
-                    })
+                    }, claimed, results))
                 else:
-                    return jsonify({
+                    return jsonify(journal_add_unsent({
                         'message': f"⏳ Stok güncelleme işleniyor... ({item_count} ürün)",
                         'batch_id': batch_id,
                         'completed': False,
                         'item_count': item_count,
                         'failed_count': failed_count,
                         'note': '5-15 dakika içinde tamamlanacak'
-                    })
+                    }, claimed, results))
             else:
-                return jsonify({
+                return jsonify(journal_add_unsent({
                     'message': 'Stok güncellendi',
                     'api_response': response.text
-                })
+                }, claimed, results))
         else:
             return jsonify({
                 'error': f'API hatası: {response.status_code}',
                 'details': response.text
             }), 500
 
+    except circuit_breaker.CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1107,16 +1867,13 @@ def update_ty_data():
         # Gelen veriyi logla (debug için)
         logging.info(f"TY Data Update Request: {data}")
         
-        url = f"https://apigw.trendyol.com/integration/inventory/sellers/{seller_id}/products/price-and-inventory"
-        headers = {'Content-Type': 'application/json'}
+        if not all(isinstance(item, dict) and item.get('barcode') for item in data['items']):
+            return jsonify({'error': 'Her satırda barkod gerekli'}), 400
         
-        response = requests.post(
-            url,
-            auth=HTTPBasicAuth(api_key, api_secret),
-            json=data,
-            headers=headers,
-            timeout=30
-        )
+        claimed, results = journal_submit(ty_inventory_changes(data['items']))
+        if not claimed:
+            return jsonify(journal_unsent_response(results))
+        response = send_ty_inventory(claimed)
         
         if response.status_code == 200:
             response_data = response.json()
@@ -1127,6 +1884,7 @@ def update_ty_data():
                 time.sleep(5)
                 
                 batch_status = check_batch_status(batch_id)
+                resolve_ty_batch(batch_id, batch_status)
                 
                 item_count = batch_status.get('itemCount', 0)
                 failed_count = batch_status.get('failedItemCount', 0)
@@ -1160,7 +1918,7 @@ def update_ty_data():
                     else:
                         message = f"⚠️ TY güncelleme kısmi başarı: {len(success_items)} başarılı, {failed_count} hatalı"
                     
-                    return jsonify({
+                    return jsonify(journal_add_unsent({
                         'message': message,
                         'batch_id': batch_id,
                         'completed': True,
@@ -1168,26 +1926,28 @@ def update_ty_data():
                         'failed_items': failed_items,
                         'item_count': item_count,
                         'failed_count': failed_count
-                    })
+                    }, claimed, results))
                 else:
-                    return jsonify({
+                    return jsonify(journal_add_unsent({
                         'message': f"⏳ TY güncelleme işleniyor... ({item_count} ürün)",
                         'batch_id': batch_id,
                         'completed': False,
                         'item_count': item_count,
                         'failed_count': failed_count,
                         'note': '5-15 dakika içinde tamamlanacak'
-                    })
+                    }, claimed, results))
             else:
-                return jsonify({
+                return jsonify(journal_add_unsent({
                     'message': 'TY verisi güncellendi',
                     'api_response': response.text
-                })
+                }, claimed, results))
         else:
             return jsonify({
                 'error': f'TY API hatası: {response.status_code}',
                 'details': response.text
             }), 500
+    except circuit_breaker.CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logging.error(f"TY Data Update Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1212,36 +1972,10 @@ def update_hb_price():
         # Gelen veriyi logla (debug için)
         logging.info(f"HB Price Update Request: SKU={merchant_sku}, Price={price}")
         
-        # HB için Basic Auth kullan
-        token = base64.b64encode(f"{hb_username}:{hb_password}".encode()).decode()
-        
-        # HB Fiyat güncelleme API endpoint'i
-        url = f"https://listing-external.hepsiburada.com/listings/merchantid/{hb_merchant_id}/price-uploads"
-        
-        headers = {
-            'accept': 'application/json',
-            'content-type': 'application/*+json',
-            'Authorization': f'Basic {token}',
-            'User-Agent': hb_user_agent
-        }
-        
-        # HB API payload formatı (Dokümana göre array)
-        payload = [
-            {
-                "hepsiburadaSku": None,
-                "merchantSku": merchant_sku,
-                "price": price
-            }
-        ]
-        
-        logging.info(f"HB Price Payload: {payload}")
-        
-        response = requests.post(
-            url,
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
+        claimed, results = journal_submit([hb_change('hb_price', merchant_sku, price=price)])
+        if not claimed:
+            return jsonify(journal_unsent_response(results))
+        response = send_hb_price(claimed)
         
         logging.info(f"HB API Response Status: {response.status_code}")
         logging.info(f"HB API Response Body: {response.text}")
@@ -1263,6 +1997,8 @@ def update_hb_price():
             
     except ValueError as e:
         return jsonify({'error': 'Geçersiz fiyat değeri'}), 400
+    except circuit_breaker.CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logging.error(f"HB Price Update Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1296,6 +2032,7 @@ def update_hb_stock():
             time.sleep(5)
             
             batch_status = check_hb_batch_status(batch_id)
+            resolve_hb_batch(batch_id, batch_status)
             
             return jsonify({
                 'message': f"🛒 HB stok güncelleme başlatıldı",
@@ -1310,6 +2047,8 @@ def update_hb_stock():
         else:
             return jsonify({'error': message}), 500
 
+    except circuit_breaker.CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1333,27 +2072,131 @@ def excel_status():
 @app.route('/excel_files')
 @login_required
 def excel_files():
-    """Tüm Excel dosyalarını listele"""
+    """Tüm Excel dosyalarını (parçalar dahil) ve hafta toplamlarını listele"""
+    manifest_weeks = load_excel_manifest()['weeks']
+    shard_rows = {shard['file']: shard['rows']
+                  for entry in manifest_weeks.values() for shard in entry['shards']}
     files = []
-    for file in os.listdir('.'):
-        if file.startswith('stok_raporu_') and file.endswith('.xlsx'):
-            try:
-                file_time = datetime.fromtimestamp(os.path.getctime(file))
-                file_size = os.path.getsize(file) / (1024 * 1024)
+    for file in list_weekly_excel_files():
+        try:
+            file_time = datetime.fromtimestamp(os.path.getctime(file))
+            file_size = os.path.getsize(file) / (1024 * 1024)
+            if file in shard_rows:
+                row_count = shard_rows[file]
+            else:
                 row_count, _ = get_current_excel_info(file)
-                
-                files.append({
-                    "filename": file,
-                    "creation_date": file_time.strftime("%d.%m.%Y"),
-                    "size_mb": round(file_size, 2),
-                    "row_count": row_count,
-                    "age_days": (datetime.now() - file_time).days
-                })
-            except:
-                continue
-    
+            
+            files.append({
+                "filename": file,
+                "creation_date": file_time.strftime("%d.%m.%Y"),
+                "size_mb": round(file_size, 2),
+                "row_count": row_count,
+                "age_days": (datetime.now() - file_time).days
+            })
+        except:
+            continue
+
     files.sort(key=lambda x: x["creation_date"], reverse=True)
-    return jsonify({"files": files})
+    archives = [retention.describe_archive(entry)
+                for entry in retention.load_manifest(ARCHIVE_FOLDER)['archives'].values()]
+    archives.sort(key=lambda x: x["key"], reverse=True)
+    weeks = [{
+        "week": week_key,
+        "shard_count": len(entry['shards']),
+        "row_count": sum(shard['rows'] for shard in entry['shards']),
+        "size_mb": round(sum(shard['size'] for shard in entry['shards']) / (1024 * 1024), 2),
+        "updates": entry.get('updates', 0)
+    } for week_key, entry in manifest_weeks.items()]
+    weeks.sort(key=lambda x: x["week"], reverse=True)
+    return jsonify({"files": files, "weeks": weeks, "archives": archives})
+
+def iter_stock_history_rows(sources):
+    """('excel', dosya) ve ('archive', manifest kaydı) kaynaklarını sırayla akıt"""
+    for kind, source in sources:
+        if kind == 'archive':
+            yield from retention.iter_archive_rows(ARCHIVE_FOLDER, source)
+        else:
+            yield from iter_existing_excel_rows(source)
+
+# Arşivde sayı olarak saklanan stok geçmişi kolonları
+STOCK_NUMERIC_COLUMNS = ('TY_Stok', 'TY_Fiyat', 'HB_Stok', 'HB_Fiyat')
+BACKUP_TXT_PATTERN = re.compile(r'^backup_stok_(\d{4})_W(\d{2})_\d{8}_\d{6}\.txt$')
+
+def week_period_end(year, week):
+    return datetime.fromisocalendar(year, week, 7).replace(hour=23, minute=59, second=59)
+
+def compact_finished_weeks():
+    """Bu hafta dışındaki haftalık Excel'leri (tüm parçalarıyla) arşive dönüştürüp kaynağı sil"""
+    current_week = get_week_info()
+    cutoff = datetime.now() - timedelta(days=MAX_FILE_AGE_DAYS)
+    weeks = {}
+    for filename in list_weekly_excel_files():
+        weeks.setdefault(parse_weekly_excel_filename(filename)[:2], []).append(filename)
+    
+    archived = 0
+    for (year, week), filenames in weeks.items():
+        if (year, week) == current_week:
+            continue
+        week_key = f"{year}_W{week:02d}"
+        period_end = week_period_end(year, week)
+        if period_end < cutoff:
+            # Saklama süresi zaten dolmuş: arşivlemeden sil
+            for filename in filenames:
+                os.remove(filename)
+            update_excel_manifest(lambda manifest: manifest['weeks'].pop(week_key, None))
+            logging.info(f"Süresi dolan haftalık rapor silindi: {', '.join(filenames)}")
+            continue
+        
+        key = f"stok_raporu_{week_key}"
+        rows = itertools.chain.from_iterable(iter_existing_excel_rows(filename) for filename in filenames)
+        archive_file, fmt, row_count = retention.write_archive(
+            ARCHIVE_FOLDER, key, EXCEL_COLUMNS, rows, STOCK_NUMERIC_COLUMNS)
+        entry = {
+            'key': key,
+            'file': archive_file,
+            'format': fmt,
+            'rows': row_count,
+            'size': os.path.getsize(os.path.join(ARCHIVE_FOLDER, archive_file)),
+            'columns': EXCEL_COLUMNS,
+            'numeric_columns': list(STOCK_NUMERIC_COLUMNS),
+            'sources': filenames,
+            'period_end': period_end.isoformat(),
+            'archived_at': datetime.now().isoformat(timespec='seconds')
+        }
+        retention.update_manifest(ARCHIVE_FOLDER, lambda manifest: manifest['archives'].__setitem__(key, entry))
+        # Arşiv ve manifest diske yazıldıktan sonra kaynaklar silinir
+        for filename in filenames:
+            os.remove(filename)
+        update_excel_manifest(lambda manifest: manifest['weeks'].pop(week_key, None))
+        archived += 1
+        logging.info(f"Haftalık rapor arşivlendi: {week_key} ({len(filenames)} parça) -> {archive_file} ({row_count:,} satır)")
+    return archived
+
+def cleanup_expired_backups():
+    """Saklama süresi dolan haftalık TXT yedeklerini sil (tarih dosya adından okunur)"""
+    cutoff = datetime.now() - timedelta(days=MAX_FILE_AGE_DAYS)
+    removed = 0
+    for name in os.listdir('.'):
+        match = BACKUP_TXT_PATTERN.match(name)
+        if match and week_period_end(int(match.group(1)), int(match.group(2))) < cutoff:
+            os.remove(name)
+            removed += 1
+    return removed
+
+def run_retention():
+    """Arka plan saklama işi: arşivleme + süresi dolanları silme"""
+    with metrics.timed('retention_seconds'):
+        with storage.locked(EXCEL_HISTORY_LOCK):
+            archived = compact_finished_weeks()
+        expired = retention.enforce_retention(ARCHIVE_FOLDER, MAX_FILE_AGE_DAYS)
+        backups = cleanup_expired_backups()
+    if archived or expired or backups:
+        logging.info(f"Saklama işi: {archived} hafta arşivlendi, {expired} arşiv ve {backups} yedek silindi")
+    return {'archived': archived, 'expired_archives': expired, 'expired_backups': backups}
+
+PROFIT_REPORT_COLUMNS = ['Barkod', 'Ürün Adı', 'TY_Fiyat', 'Üretim_Toplam', 'Kargo', 'Komisyon_Tutarı',
+                         'Stopaj_Tutarı', 'Diğer_Gider_Tutarı', 'Platform_Bedeli', 'Net_KDV',
+                         'Toplam_Giderler', 'Kar_Tutarı', 'Kar_Oranı']
 
 def emergency_reset_admin_password():
     """Acil durum admin şifre sıfırlama"""
@@ -1374,305 +2217,35 @@ def emergency_reset_admin_password():
 
 # Maliter routeları
 
-@app.route('/costs')
-@login_required
-def costs():
-    """Kar Takip Ana Sayfası - Güvenli Float Conversion"""
-    try:
-        # Cache'den ürünleri al
-        cached_products, last_updated = load_products_cache()
-        
-        if cached_products and len(cached_products) > 0:
-            # Ürünleri cost_data ile birleştir ve hesapla
-            products_with_costs = []
-            for product in cached_products:
-                try:
-                    barcode = product.get('barcode', '')
-                    cost_data = get_product_cost_data(barcode)
-                    
-                    # Güvenli float conversion fonksiyonu
-                    def safe_float(value, default=0):
-                        if value == '' or value is None:
-                            return default
-                        try:
-                            return float(value)
-                        except (ValueError, TypeError):
-                            return default
-                    
-                    # Üretim giderleri toplamını hesapla
-                    production_total = 0
-                    if cost_data.get('production_costs'):
-                        for cost_item in cost_data['production_costs']:
-                            amount = safe_float(cost_item.get('amount', 0))
-                            vat = amount * 0.2
-                            production_total += amount + vat
-                    
-                    # Diğer hesaplamalar - güvenli float conversion
-                    sale_price = safe_float(product.get('ty_price', 0))
-                    cargo_cost = safe_float(cost_data.get('cargo_cost', 0))
-                    commission_rate = safe_float(cost_data.get('commission_rate', 0))
-                    commission_amount = sale_price * (commission_rate / 100) if commission_rate > 0 else 0
-                    withholding_rate = safe_float(cost_data.get('withholding_rate', 0))
-                    withholding_amount = sale_price * (withholding_rate / 100) if withholding_rate > 0 else 0
-                    other_rate = safe_float(cost_data.get('other_expenses_rate', 0))
-                    other_amount = sale_price * (other_rate / 100) if other_rate > 0 else 0
-                    platform_fee = safe_float(cost_data.get('platform_fee', 6.6))
-                    
-                    # Kar analizi hesapla
-                    profit_analysis = None
-                    if sale_price > 0:
-                        try:
-                            profit_analysis = calculate_profit_analysis(barcode, sale_price, cost_data)
-                        except:
-                            profit_analysis = None
-                    
-                    # Hesaplanmış değerleri ekle
-                    calculated_values = {
-                        'production_total': production_total,
-                        'cargo_cost': cargo_cost,
-                        'commission_amount': commission_amount,
-                        'withholding_amount': withholding_amount,
-                        'other_amount': other_amount,
-                        'platform_fee': platform_fee
-                    }
-                    
-                    product_copy = product.copy()
-                    product_copy['cost_data'] = cost_data
-                    product_copy['calculated'] = calculated_values
-                    product_copy['profit_analysis'] = profit_analysis
-                    
-                    products_with_costs.append(product_copy)
-                    
-                except Exception as product_error:
-                    print(f"Ürün işleme hatası {barcode}: {product_error}")
-                    # Hatalı ürünü de ekle ama boş değerlerle
-                    product_copy = product.copy()
-                    product_copy['cost_data'] = {}
-                    product_copy['calculated'] = {
-                        'production_total': 0,
-                        'cargo_cost': 0,
-                        'commission_amount': 0,
-                        'withholding_amount': 0,
-                        'other_amount': 0,
-                        'platform_fee': 6.6
-                    }
-                    product_copy['profit_analysis'] = None
-                    products_with_costs.append(product_copy)
-            
-            return render_template('costs.html', 
-                                 products=products_with_costs,
-                                 cache_empty=False,
-                                 last_updated=last_updated)
-        else:
-            return render_template('costs.html', 
-                                 products=[], 
-                                 cache_empty=True,
-                                 last_updated=None)
-        
-    except Exception as e:
-        print(f"Costs genel hatası: {e}")
-        return render_template('costs.html', 
-                             products=[], 
-                             cache_empty=True,
-                             last_updated=None)
-
-@app.route('/cost_detail/<barcode>')
-@login_required
-def cost_detail(barcode):
-    """Ürün Maliyet Detay Sayfası"""
-    try:
-        # Cache'den ürün bilgisini al
-        cached_products, _ = load_products_cache()
-        
-        # Barkoda göre ürünü bul
-        product = None
-        for p in cached_products:
-            if p.get('barcode') == barcode:
-                product = p
-                break
-        
-        if not product:
-            flash('Ürün bulunamadı!', 'error')
-            return redirect(url_for('costs'))
-        
-        # Maliyet verilerini al
-        cost_data = get_product_cost_data(barcode)
-        
-        # Kar analizini hesapla
-        sale_price = float(product.get('ty_price', 0))
-        profit_analysis = calculate_profit_analysis(barcode, sale_price, cost_data)
-        
-        return render_template('cost_detail.html',
-                             product=product,
-                             cost_data=cost_data,
-                             profit_analysis=profit_analysis)
-        
-    except Exception as e:
-        logging.error(f"Maliyet detay sayfası hatası: {str(e)}")
-        flash('Ürün detay verileri yüklenirken hata oluştu!', 'error')
-        return redirect(url_for('costs'))
-
-@app.route('/save_cost_data', methods=['POST'])
-@login_required
-def save_cost_data():
-    """Maliyet Verilerini Kaydet"""
-    try:
-        data = request.get_json()
-        
-        if not data or 'barcode' not in data:
-            return jsonify({'error': 'Geçersiz istek verisi'}), 400
-        
-        barcode = data['barcode']
-        cost_data = data.get('cost_data', {})
-        
-        if not barcode:
-            return jsonify({'error': 'Barkod gerekli'}), 400
-        
-        if save_product_cost_data(barcode, cost_data):
-            sale_price = float(cost_data.get('sale_price', 0))
-            profit_analysis = calculate_profit_analysis(barcode, sale_price, cost_data)
-            
-
-            # Excel'e kayıt yap
-            try:
-                # Ürün bilgisini cache'den al
-                cached_products, _ = load_products_cache()
-                product_title = None
-                for p in cached_products:
-                    if p.get('barcode') == barcode:
-                        product_title = p.get('title', '')
-                        break
-        
-                # Excel'e kaydet
-                log_cost_data_change(barcode, product_title, session['username'], cost_data, profit_analysis)
-            except Exception as e:
-                logging.error(f"Excel kayıt hatası: {str(e)}")
-                # Excel hatası olsa bile ana fonksiyonu bozmasın
-
+# Pano özeti bu dosyaların sürümüne bağlıdır; sürüm değişmedikçe yeniden hesaplanmaz
+DASHBOARD_SUMMARY_SOURCES = (PRODUCTS_CACHE_FILE, COSTS_FILE, COSTS_JOURNAL_FILE)
 
-            return jsonify({
-                'message': 'Maliyet verileri başarıyla kaydedildi',
-                'profit_analysis': profit_analysis
-            })
-        else:
-            return jsonify({'error': 'Maliyet verileri kaydedilemedi'}), 500
-            
-    except Exception as e:
-        logging.error(f"Maliyet verisi kayıt hatası: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/update_sale_price', methods=['POST'])
-@login_required
-def update_sale_price():
-    """Yeni Satış Fiyatını Trendyol'a Gönder"""
-    try:
-        data = request.get_json()
-        
-        if not data or 'barcode' not in data or 'new_price' not in data:
-            return jsonify({'error': 'Barkod ve yeni fiyat gerekli'}), 400
-        
-        barcode = data['barcode']
-        new_price = float(data['new_price'])
-        
-        if new_price <= 0:
-            return jsonify({'error': 'Fiyat 0\'dan büyük olmalı'}), 400
-        
-        payload = {
-            'items': [
-                {
-                    'barcode': barcode,
-                    'listPrice': new_price,
-                    'salePrice': new_price
-                }
-            ]
-        }
-        
-        url = f"https://apigw.trendyol.com/integration/inventory/sellers/{seller_id}/products/price-and-inventory"
-        headers = {'Content-Type': 'application/json'}
-        
-        response = requests.post(
-            url,
-            auth=HTTPBasicAuth(api_key, api_secret),
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            return jsonify({
-                'message': f'✅ Fiyat güncellendi: {barcode} → {new_price}₺',
-                'barcode': barcode,
-                'new_price': new_price
-            })
-        else:
-            return jsonify({
-                'error': f'Trendyol API hatası: {response.status_code}',
-                'details': response.text
-            }), 500
-            
-    except Exception as e:
-        logging.error(f"Fiyat güncelleme hatası: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+def build_dashboard_summary():
+    products, _ = load_products_cache()
+    products = products or []
+    return dashboard_summary.build_summary(products, get_all_profit_analyses(products), get_all_costs())
 
+def get_dashboard_summary():
+    return dashboard_summary.get_summary(response_cache.data_version(DASHBOARD_SUMMARY_SOURCES),
+                                         build_dashboard_summary)
 
-@app.route('/debug-cache')
-@login_required
-def debug_cache():
-    """Cache debug sayfası"""
-    try:
-        # Dosya varlığı kontrol
-        cache_exists = os.path.exists(PRODUCTS_CACHE_FILE)
-        
-        if not cache_exists:
-            return f"❌ Cache dosyası bulunamadı: {PRODUCTS_CACHE_FILE}"
-        
-        # Dosya boyutu
-        file_size = os.path.getsize(PRODUCTS_CACHE_FILE)
-        
-        # Manuel okuma
-        with open(PRODUCTS_CACHE_FILE, 'r', encoding='utf-8') as f:
-            cache_content = json.load(f)
-        
-        products = cache_content.get('products', [])
-        last_updated = cache_content.get('last_updated_turkey', 'Bilinmiyor')
-        
-        # load_products_cache fonksiyonu test
-        test_products, test_updated = load_products_cache()
-        
-        html = f"""
-        <h1>🔧 Cache Debug</h1>
-        <p><strong>Dosya:</strong> {PRODUCTS_CACHE_FILE}</p>
-        <p><strong>Dosya var mı:</strong> {'✅ Evet' if cache_exists else '❌ Hayır'}</p>
-        <p><strong>Dosya boyutu:</strong> {file_size} bytes</p>
-        
-        <h3>Manuel Okuma:</h3>
-        <p><strong>Ürün sayısı:</strong> {len(products)}</p>
-        <p><strong>Son güncelleme:</strong> {last_updated}</p>
-        
-        <h3>load_products_cache() Fonksiyonu:</h3>
-        <p><strong>Ürün sayısı:</strong> {len(test_products) if test_products else 0}</p>
-        <p><strong>Son güncelleme:</strong> {test_updated}</p>
-        
-        <h3>İlk 3 Ürün:</h3>
-        """
-        
-        for i, product in enumerate(products[:3]):
-            barcode = product.get('barcode', 'Yok')
-            title = product.get('title', 'Yok')[:50]
-            price = product.get('ty_price', 0)
-            html += f"<p>{i+1}. Barkod: {barcode}, Fiyat: {price}₺, Başlık: {title}...</p>"
-        
-        html += f'<br><a href="/costs">Costs Sayfasını Dene</a>'
-        
-        return html
-        
-    except Exception as e:
-        return f"❌ Debug hatası: {str(e)}"
+def refresh_dashboard_summary_async():
+    """Yazma sonrası özeti arka planda önceden hesapla (ilk pano isteği beklemesin)"""
+    def worker():
+        try:
+            get_dashboard_summary()
+        except Exception as e:
+            logging.error(f"Pano özeti hesaplama hatası: {e}")
+    
+    threading.Thread(target=worker, name='dashboard-summary', daemon=True).start()
 
+# Trendyol price-and-inventory isteği başına en fazla ürün sayısı
+TRENDYOL_PRICE_BATCH_SIZE = 1000
 
 # Flask route'ları bölümüne eklenecek (diğer route'ların sonuna)
 @app.route('/get_product_links')
 @login_required
+@response_cache.cached_response(PRODUCT_LINKS_FILE)
 def get_product_links():
     """Tüm ürün linklerini döndür"""
     try:
@@ -1702,23 +2275,21 @@ def save_product_link():
         if link and not (link.startswith('http://') or link.startswith('https://')):
             return jsonify({'error': 'Geçerli bir URL giriniz (http:// veya https:// ile başlamalı)'}), 400
         
-        # Mevcut linkleri yükle
-        links = load_product_links()
-        
-        if link:
-            # Link ekle veya güncelle
-            links[barcode] = link
-            message = f'✅ {barcode} için link kaydedildi'
-        else:
+        def apply(links):
+            if link:
+                # Link ekle veya güncelle
+                links[barcode] = link
+                return f'✅ {barcode} için link kaydedildi'
             # Link sil (boş link gönderilirse)
-            if barcode in links:
-                del links[barcode]
-                message = f'🗑️ {barcode} için link silindi'
-            else:
-                return jsonify({'error': 'Silinecek link bulunamadı'}), 404
+            if links.pop(barcode, None) is not None:
+                return f'🗑️ {barcode} için link silindi'
+            return None
         
-        # Dosyaya kaydet
-        if save_product_links(links):
+        # Kilit altında güncelle ve kaydet
+        saved, message = update_product_links(apply)
+        if saved and message is None:
+            return jsonify({'error': 'Silinecek link bulunamadı'}), 404
+        if saved:
             logging.info(f"Ürün linki işlemi: {message} - Kullanıcı: {session.get('username', 'Bilinmiyor')}")
             return jsonify({'message': message})
         else:
@@ -1743,17 +2314,11 @@ def delete_product_link():
         if not barcode:
             return jsonify({'error': 'Barkod boş olamaz'}), 400
         
-        # Mevcut linkleri yükle
-        links = load_product_links()
-        
-        if barcode not in links:
+        # Linki kilit altında sil ve kaydet
+        saved, removed = update_product_links(lambda links: links.pop(barcode, None) is not None)
+        if saved and not removed:
             return jsonify({'error': 'Silinecek link bulunamadı'}), 404
-        
-        # Linki sil
-        del links[barcode]
-        
-        # Dosyaya kaydet
-        if save_product_links(links):
+        if saved:
             message = f'🗑️ {barcode} için link silindi'
             logging.info(f"Ürün linki silindi: {message} - Kullanıcı: {session.get('username', 'Bilinmiyor')}")
             return jsonify({'message': message})
@@ -1765,8 +2330,119 @@ def delete_product_link():
         return jsonify({'error': str(e)}), 500
 
 
+# Zamanlayıcı işleri: periyodik tam yenileme (0 = kapalı)
+AUTO_REFRESH_MINUTES = int(os.getenv("AUTO_REFRESH_MINUTES", 0))
+# Isıtma ve ağır modüllerin yüklenmesi port açıldıktan sonra arka planda yapılır
+PREWARM_IN_BACKGROUND = os.getenv("PREWARM_IN_BACKGROUND", "True").lower() == "true"
+# Sadece ilk kullanımda yüklenen modüller; app import edilirken yüklenmemeli
+LAZY_HEAVY_MODULES = ('openpyxl', 'numpy', 'pandas', 'pytz', 'pyarrow')
+
+def warm_up_caches():
+    """Ürün/HB cache'lerini ve kullanıcı dizinini açılışta belleğe al"""
+    with metrics.timed('warmup_seconds'):
+        products, _ = load_products_cache()
+        hb_listings, _ = load_hb_products_cache()
+        _get_users_cached()
+    logging.info(f"Önbellek ısıtıldı: {len(products)} ürün, {len(hb_listings)} HB listesi (pid {os.getpid()})")
+
+def preload_heavy_modules():
+    """İlk Excel/simülasyon isteği beklemesin diye ağır modülleri önceden yükle"""
+    with metrics.timed('prewarm_imports_seconds'):
+        import openpyxl  # noqa: F401
+        import pytz  # noqa: F401
+        import repricing  # noqa: F401  (numpy)
+
+def prewarm():
+    try:
+        warm_up_caches()
+    except Exception as e:
+        logging.error(f"Önbellek ısıtma hatası: {e}")
+    try:
+        preload_heavy_modules()
+    except Exception as e:
+        logging.warning(f"Modül ön yükleme hatası: {e}")
+
+def start_background_services():
+    """Her worker işleminde bir kez çağrılır: cache ısıtma + zamanlayıcı
+
+    Zamanlayıcı her worker'da başlar ama işleri yalnızca dosya kilidini
+    alan lider worker çalıştırır. PREWARM_IN_BACKGROUND açıkken ısıtma
+    ayrı bir thread'de yapılır; worker istek kabul etmeye hemen başlar,
+    ısınmamış cache'ler ilk istekte her zamanki gibi diskten yüklenir.
+    """
+    if PREWARM_IN_BACKGROUND:
+        threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
+    else:
+        prewarm()
+
+    scheduler.add_job('hb_snapshot', HB_CACHE_MAX_AGE_MINUTES * 60, refresh_hb_products_cache)
+    scheduler.add_job('retention', RETENTION_INTERVAL_MINUTES * 60, run_retention)
+    # Yarım kalan gönderimler liderin ilk turunda (açılışta) yeniden oynatılır
+    scheduler.add_job('change_journal', CHANGE_JOURNAL_REPLAY_SECONDS, replay_change_journal, first_run_seconds=0)
+    if AUTO_REFRESH_MINUTES > 0:
+        scheduler.add_job('refresh_data', AUTO_REFRESH_MINUTES * 60,
+                          lambda: jobs.wait_for(start_refresh_job(owner='scheduler')))
+    scheduler.start()
+
+def snapshot_age_minutes(timestamp):
+    if not timestamp:
+        return None
+    try:
+        return round((datetime.now() - datetime.fromisoformat(timestamp)).total_seconds() / 60, 1)
+    except ValueError:
+        return None
+
+@app.route('/marketplace_status')
+@login_required
+def marketplace_status():
+    """Devre kesici durumları ve sayfaların dayandığı snapshot'ların yaşı
+
+    Sayfalardaki eskimiş veri uyarısı bu uçtan beslenir; sayfa yanıtları
+    önbellekte tutulduğu için uyarı istemci tarafında gösterilir.
+    """
+    breakers = circuit_breaker.status()
+    products_updated = read_products_cache_meta().get('last_updated')
+    try:
+        hb_updated = datetime.fromtimestamp(os.path.getmtime(HB_PRODUCTS_CACHE_FILE)).isoformat()
+    except OSError:
+        hb_updated = None
+    degraded = [name for name, breaker in breakers.items() if breaker['state'] != circuit_breaker.CLOSED]
+    return jsonify({
+        'degraded': degraded,
+        'breakers': breakers,
+        'snapshots': {
+            'products': {'last_updated': products_updated, 'age_minutes': snapshot_age_minutes(products_updated)},
+            'hepsiburada': {'last_updated': hb_updated, 'age_minutes': snapshot_age_minutes(hb_updated),
+                            'stale': is_hb_cache_stale(hb_updated)}
+        }
+    })
+
+
+# Sayfa grupları blueprint modüllerinde; bu modüldeki yardımcıları kullandıkları
+# için en sonda import edilirler. `python app.py` ile çalıştırıldığında modülün
+# '__main__' dışında 'app' adıyla ikinci kez yüklenmemesi için takma ad verilir.
+sys.modules.setdefault('app', sys.modules[__name__])
+from admin_routes import admin_bp
+from cost_routes import cost_bp
+from match_routes import match_bp
+
+app.register_blueprint(admin_bp)
+app.register_blueprint(cost_bp)
+app.register_blueprint(match_bp)
+
+
+# Import süresi bütçesi: ağır modüller ilk kullanımda yüklenmeli (benchmarks/import_budget.py)
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 1000))
+import_elapsed_ms = (time.perf_counter() - _import_started) * 1000
+metrics.set_gauge('app_import_seconds', round(import_elapsed_ms / 1000, 3))
+_eager_heavy_modules = [module for module in LAZY_HEAVY_MODULES if module in sys.modules]
+if _eager_heavy_modules:
+    logging.warning(f"app import edilirken ağır modüller yüklendi: {', '.join(_eager_heavy_modules)}")
+if import_elapsed_ms > IMPORT_BUDGET_MS:
+    logging.warning(f"app import süresi bütçeyi aştı: {import_elapsed_ms:.0f} ms > {IMPORT_BUDGET_MS:.0f} ms")
+
+
 if __name__ == "__main__":
-    import sys
     if len(sys.argv) > 1 and sys.argv[1] == "--reset-admin":
         emergency_reset_admin_password()
     else:
@@ -1777,4 +2453,11 @@ if __name__ == "__main__":
         logging.info(f"Trendyol-HB Stok Yönetimi başlatılıyor...")
         logging.info(f"Tarayıcınızda şu adresi açın: http://localhost:{port}")
         
+        # Tek işlem: ardışık JSON güncellemeleri kısa pencerede birleştirilebilir
+        storage.enable_single_process_coalescing()
+        
+        # Debug modunda reloader ana işlemi sadece izler; servisler çocuk işlemde başlar
+        if not debug_mode or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            start_background_services()
+        
         app.run(debug=debug_mode, host='0.0.0.0', port=port)
\ No newline at end of file
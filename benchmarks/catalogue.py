@@ -0,0 +1,84 @@
+"""
+Sentetik Katalog Üretici
+Benchmark senaryoları için Trendyol ürünleri, Hepsiburada listeleri,
+eşleştirmeler ve maliyet kayıtlarını deterministik olarak üretir
+"""
+
+import random
+
+
+def make_ty_product(index, rng):
+    """Trendyol ürün API'sindeki ham alanlara benzeyen bir ürün üret"""
+    barcode = f"TY{index:08d}"
+    sale_price = round(rng.uniform(50, 2500), 2)
+    return {
+        'id': f"{index:012d}",
+        'barcode': barcode,
+        'productMainId': f"PM{index // 3:07d}",
+        'stockCode': f"SC-{index:07d}",
+        'title': f"Sentetik Ürün {index} - Pamuklu Tişört Beden {rng.choice(['S', 'M', 'L', 'XL'])}",
+        'brand': rng.choice(['Neşeli', 'Marka A', 'Marka B']),
+        'categoryName': rng.choice(['Tişört', 'Elbise', 'Pantolon', 'Ayakkabı']),
+        'quantity': rng.randint(0, 250),
+        'listPrice': round(sale_price * 1.2, 2),
+        'salePrice': sale_price,
+        'vatRate': 20,
+        'description': 'Lorem ipsum dolor sit amet, ' * 8,
+        'images': [{'url': f"https://cdn.example.com/{barcode}/{i}.jpg"} for i in range(3)],
+        'attributes': [
+            {'attributeId': a, 'attributeName': f"Özellik {a}", 'attributeValue': f"Değer {rng.randint(1, 50)}"}
+            for a in range(5)
+        ],
+        'approved': True,
+        'archived': False,
+    }
+
+
+def make_catalogue(size, match_ratio=0.8, missing_hb_ratio=0.01, extra_hb_ratio=0.1,
+                   cost_ratio=0.05, seed=42):
+    """(ty_products, hb_listings, matches, costs) dörtlüsünü üret
+
+    match_ratio: HB ile eşleştirilmiş TY ürünü oranı
+    missing_hb_ratio: eşleştirilmiş ama HB listesinde olmayan (tek tek sorgulanan) oran
+    extra_hb_ratio: hiçbir TY ürünüyle eşleşmeyen ek HB listesi oranı
+    cost_ratio: maliyet verisi girilmiş ürün oranı
+    """
+    rng = random.Random(seed)
+    ty_products = [make_ty_product(i, rng) for i in range(size)]
+
+    hb_listings = []
+    matches = {}
+    costs = {}
+    for product in ty_products:
+        if rng.random() < match_ratio:
+            merchant_sku = f"HB-{product['barcode']}"
+            matches[product['barcode']] = merchant_sku
+            if rng.random() >= missing_hb_ratio:
+                hb_listings.append({
+                    'merchantSku': merchant_sku,
+                    'hepsiburadaSku': f"HBV{rng.randint(10**9, 10**10 - 1)}",
+                    'productName': product['title'],
+                    'availableStock': rng.randint(0, 250),
+                    'price': round(product['salePrice'] * rng.uniform(0.95, 1.1), 2),
+                })
+        if rng.random() < cost_ratio:
+            costs[product['barcode']] = {
+                'production_costs': [{'name': 'Kumaş', 'amount': round(rng.uniform(10, 300), 2)}],
+                'cargo_cost': 45.0,
+                'commission_rate': 21.5,
+                'withholding_rate': 1.0,
+                'other_expenses_rate': 2.0,
+                'platform_fee': 6.6,
+                'sale_price': product['salePrice'],
+            }
+
+    for i in range(int(size * extra_hb_ratio)):
+        hb_listings.append({
+            'merchantSku': f"HB-EXTRA-{i:07d}",
+            'hepsiburadaSku': f"HBV{rng.randint(10**9, 10**10 - 1)}",
+            'productName': f"Eşleşmeyen HB Ürünü {i}",
+            'availableStock': rng.randint(0, 250),
+            'price': round(rng.uniform(50, 2500), 2),
+        })
+
+    return ty_products, hb_listings, matches, costs
@@ -0,0 +1,87 @@
+"""
+Import Süresi Bütçe Kontrolü
+app modülünü her seferinde yeni bir Python işleminde import eder, medyan
+süreyi bütçe ile karşılaştırır ve import sırasında ağır modüllerin
+(openpyxl, numpy, pandas, pytz, pyarrow) yüklenip yüklenmediğini kontrol eder
+
+Kullanım:
+    python benchmarks/import_budget.py                    # varsayılan bütçe 1000 ms
+    python benchmarks/import_budget.py --budget-ms 600 --repeat 7
+    python benchmarks/import_budget.py --importtime       # en yavaş 15 modül (-X importtime)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+HEAVY_MODULES = ('openpyxl', 'numpy', 'pandas', 'pytz', 'pyarrow')
+
+PROBE = f"""
+import json, sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+started = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{'ms': elapsed, 'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def run_probe(work_dir, extra_args=()):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    return subprocess.run([sys.executable, *extra_args, '-c', PROBE], cwd=work_dir, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def slowest_imports(work_dir, top):
+    """-X importtime çıktısından kümülatif süresi en yüksek modüller"""
+    result = run_probe(work_dir, ('-X', 'importtime'))
+    rows = []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | modül"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, module = line.split('|')
+        rows.append((int(cumulative_us), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='app import süresi bütçe kontrolü')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', 1000)))
+    parser.add_argument('--repeat', type=int, default=5, help='Ölçülen yeni işlem sayısı')
+    parser.add_argument('--importtime', action='store_true', help='En yavaş modülleri listele')
+    args = parser.parse_args(argv)
+
+    # app çalışma dizinine cache/log dosyaları yazabileceği için geçici dizinde çalıştır
+    with tempfile.TemporaryDirectory(prefix='import_budget_') as work_dir:
+        run_probe(work_dir)  # Isınma: .pyc ve dosya sistemi önbelleği
+        samples = [json.loads(run_probe(work_dir).stdout.strip().splitlines()[-1]) for _ in range(args.repeat)]
+        slowest = slowest_imports(work_dir, 15) if args.importtime else []
+
+    median_ms = statistics.median(sample['ms'] for sample in samples)
+    heavy = sorted({module for sample in samples for module in sample['heavy']})
+    print(f"app import: medyan {median_ms:.0f} ms ({args.repeat} ölçüm), bütçe {args.budget_ms:.0f} ms")
+    for cumulative_us, module in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+    failed = False
+    if heavy:
+        print(f"❌ Import sırasında ağır modüller yüklendi: {', '.join(heavy)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print("❌ Import süresi bütçeyi aştı")
+        failed = True
+    if not failed:
+        print("✅ Import süresi bütçe içinde")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Yerel Trendyol/Hepsiburada Mock Sunucusu
+Sayfalı listeleme, batch-request ve stok/fiyat yükleme endpoint'lerini
+ayarlanabilir gecikme ve 429 enjeksiyonu ile taklit eder
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class MockMarketplace:
+    """Tek bir portta hem Trendyol hem Hepsiburada API'lerini sunar"""
+
+    def __init__(self, ty_products, hb_listings, latency_ms=0, rate_429=0.0, seed=0):
+        self.ty_products = ty_products
+        self.hb_listings = hb_listings
+        self.hb_by_sku = {listing['merchantSku']: listing for listing in hb_listings}
+        self.latency = latency_ms / 1000.0
+        self.rate_429 = rate_429
+        self.rng = random.Random(seed)
+        self.batches = {}
+        self.request_counts = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        marketplace = self
+
+        class Handler(MockHandler):
+            mock = marketplace
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def reset_counts(self):
+        with self.lock:
+            self.request_counts = {}
+
+    def count(self, endpoint):
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def should_throttle(self):
+        with self.lock:
+            return self.rate_429 > 0 and self.rng.random() < self.rate_429
+
+    def new_batch(self, items):
+        batch_id = str(uuid.uuid4())
+        with self.lock:
+            self.batches[batch_id] = items
+        return batch_id
+
+
+ROUTES = [
+    ('GET', re.compile(r'^/integration/product/sellers/[^/]+/products/batch-requests/(?P<batch_id>[^/]+)$'), 'ty_batch_status'),
+    ('GET', re.compile(r'^/integration/product/sellers/[^/]+/products$'), 'ty_products'),
+    ('POST', re.compile(r'^/integration/inventory/sellers/[^/]+/products/price-and-inventory$'), 'ty_price_inventory'),
+    ('GET', re.compile(r'^/listings/merchantid/[^/]+/stock-uploads/id/(?P<batch_id>[^/]+)$'), 'hb_stock_upload_status'),
+    ('GET', re.compile(r'^/listings/merchantid/[^/]+/sku/(?P<sku>.+)$'), 'hb_listing_by_sku'),
+    ('POST', re.compile(r'^/listings/merchantid/[^/]+/stock-uploads$'), 'hb_stock_uploads'),
+    ('POST', re.compile(r'^/listings/merchantid/[^/]+/price-uploads$'), 'hb_price_uploads'),
+    ('GET', re.compile(r'^/listings/merchantid/[^/]+$'), 'hb_listings'),
+]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    mock = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        body = None
+        if method == 'POST':
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'null')
+
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(parsed.path)
+            if route_method == method and match:
+                self.mock.count(name)
+                if self.mock.latency:
+                    time.sleep(self.mock.latency)
+                if self.mock.should_throttle():
+                    return self._send(429, {'error': 'Too Many Requests'}, {'Retry-After': '0'})
+                return getattr(self, name)(query, body, **match.groupdict())
+
+        self._send(404, {'error': 'not found'})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    # --- Trendyol
+    def ty_products(self, query, body):
+        page = int(query.get('page', 0))
+        size = int(query.get('size', 50))
+        content = self.mock.ty_products[page * size:(page + 1) * size]
+        self._send(200, {'page': page, 'size': size,
+                         'totalElements': len(self.mock.ty_products), 'content': content})
+
+    def ty_price_inventory(self, query, body):
+        items = (body or {}).get('items', [])
+        self._send(200, {'batchRequestId': self.mock.new_batch(items)})
+
+    def ty_batch_status(self, query, body, batch_id):
+        items = self.mock.batches.get(batch_id)
+        if items is None:
+            return self._send(404, {'error': 'batch not found'})
+        self._send(200, {
+            'batchRequestId': batch_id,
+            'status': 'COMPLETED',
+            'itemCount': len(items),
+            'failedItemCount': 0,
+            'items': [{'requestItem': item, 'status': 'SUCCESS', 'failureReasons': []} for item in items],
+        })
+
+    # --- Hepsiburada
+    def hb_listings(self, query, body):
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', 50))
+        listings = self.mock.hb_listings[offset:offset + limit]
+        self._send(200, {'totalCount': len(self.mock.hb_listings), 'listings': listings})
+
+    def hb_listing_by_sku(self, query, body, sku):
+        listing = self.mock.hb_by_sku.get(sku)
+        if listing is None:
+            return self._send(200, {'merchantSku': sku, 'availableStock': 0})
+        self._send(200, listing)
+
+    def hb_stock_uploads(self, query, body):
+        self._send(200, {'id': self.mock.new_batch(body or [])})
+
+    def hb_price_uploads(self, query, body):
+        self._send(200, {'id': self.mock.new_batch(body or [])})
+
+    def hb_stock_upload_status(self, query, body, batch_id):
+        items = self.mock.batches.get(batch_id)
+        if items is None:
+            return self._send(404, {'error': 'batch not found'})
+        self._send(200, {'id': batch_id, 'status': 'Done', 'total': len(items), 'errors': []})
@@ -0,0 +1,343 @@
+"""
+Benchmark Çalıştırıcı
+Yerel mock sunucuya karşı veri çekme, yenileme, Excel ve maliyet
+senaryolarını ölçer; sonuçları kayıtlı baseline ile karşılaştırır
+
+Kullanım:
+    python benchmarks/run.py                          # 1k ve 10k SKU
+    python benchmarks/run.py --sizes 1000,10000,100000 --latency-ms 20 --rate-429 0.02
+    python benchmarks/run.py --save-baseline          # sonuçları baseline olarak kaydet
+    python benchmarks/run.py --fail-on-regression     # gerileme varsa çıkış kodu 1
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+sys.path.insert(0, REPO_ROOT)
+
+from catalogue import make_catalogue
+from mock_server import MockMarketplace
+
+
+def configure_environment(base_url):
+    """app import edilmeden önce API adreslerini ve sahte kimlik bilgilerini ayarla"""
+    os.environ.update({
+        'TRENDYOL_API_BASE': base_url,
+        'HB_API_BASE': base_url,
+        'SELLER_ID': 'bench-seller',
+        'API_KEY': 'bench-key',
+        'API_SECRET': 'bench-secret',
+        'HB_USERNAME': 'bench-user',
+        'HB_PASSWORD': 'bench-pass',
+        'HB_MERCHANT_ID': 'bench-merchant',
+        'HB_USER_AGENT': 'bench-agent',
+        'SECRET_KEY': 'bench-secret-key',
+    })
+
+
+def logged_in_client(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['username'] = 'bench'
+        sess['role'] = 'admin'
+    return client
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+# --- Senaryolar: her biri (hazırlık, ölçülen çalışma) döndürür; çalışma işlenen öğe sayısını verir
+
+def scenario_ty_fetch(ctx):
+    return None, lambda: len(ctx.app.get_all_products())
+
+
+def scenario_hb_fetch(ctx):
+    return None, lambda: len(ctx.app.get_hepsiburada_products())
+
+
+def scenario_refresh_data(ctx):
+    client = logged_in_client(ctx.app)
+
+    def setup():
+        with open(ctx.app.MATCHES_FILE, 'w', encoding='utf-8') as f:
+            json.dump(ctx.matches, f)
+        excel_file = ctx.app.get_excel_filename()
+        if os.path.exists(excel_file):
+            os.remove(excel_file)
+
+    def run():
+        response = client.post('/refresh_data?wait=1')
+        if response.status_code != 200:
+            raise RuntimeError(f"/refresh_data {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_json()['product_count']
+
+    return setup, run
+
+
+def scenario_excel_weekly(ctx):
+    def setup():
+        ensure_products_cache(ctx)
+        excel_file = ctx.app.get_excel_filename()
+        if os.path.exists(excel_file):
+            os.remove(excel_file)
+
+    def run():
+        ctx.app.save_products_to_excel_weekly()
+        return ctx.size
+
+    return setup, run
+
+
+def scenario_costs_page(ctx):
+    client = logged_in_client(ctx.app)
+
+    def setup():
+        ensure_products_cache(ctx)
+        with open('costs.json', 'w', encoding='utf-8') as f:
+            json.dump(ctx.costs, f)
+
+    def run():
+        response = client.get('/costs')
+        if response.status_code != 200:
+            raise RuntimeError(f"/costs {response.status_code}")
+        return ctx.size
+
+    return setup, run
+
+
+def scenario_cost_change_log(ctx):
+    from cost_tracking import log_cost_data_change, get_yearly_excel_filename, get_cost_audit_log_filename
+
+    calls = 20
+    samples = list(ctx.costs.items())[:calls] or [('TY00000000', {'sale_price': 100})]
+
+    def setup():
+        for filename in (get_yearly_excel_filename(), get_cost_audit_log_filename()):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def run():
+        for barcode, cost_data in samples:
+            log_cost_data_change(barcode, 'Benchmark ürünü', 'bench', cost_data, None)
+        return len(samples)
+
+    return setup, run
+
+
+SCENARIOS = {
+    'ty_fetch': scenario_ty_fetch,
+    'hb_fetch': scenario_hb_fetch,
+    'refresh_data': scenario_refresh_data,
+    'excel_weekly': scenario_excel_weekly,
+    'costs_page': scenario_costs_page,
+    'cost_change_log': scenario_cost_change_log,
+}
+
+
+class Context:
+    def __init__(self, app_module, size, matches, costs):
+        self.app = app_module
+        self.size = size
+        self.matches = matches
+        self.costs = costs
+        self.cache_ready = False
+
+
+def ensure_products_cache(ctx):
+    """Excel/maliyet senaryoları için cache'i bir kez doldur"""
+    if ctx.cache_ready:
+        return
+    hb_index = ctx.app.build_hb_sku_index()
+    products = (
+        ctx.app.join_hb_data(product, ctx.matches, hb_index)
+        for page in ctx.app.iter_trendyol_product_pages()
+        for product in page
+    )
+    ctx.app.save_products_cache(products)
+    ctx.cache_ready = True
+
+
+def api_call_stats(metrics_module):
+    calls = 0
+    p95 = 0.0
+    for item in metrics_module.get_timing_summary():
+        if item['name'] == 'marketplace_request_seconds':
+            calls += item['count']
+            p95 = max(p95, item['p95'])
+    retries = sum(item['value'] for item in metrics_module.get_counters()
+                  if item['name'] == 'marketplace_request_retries_total')
+    return calls, p95, retries
+
+
+def run_scenario(ctx, name, repeat):
+    import metrics
+
+    setup, run = SCENARIOS[name](ctx)
+    durations = []
+    items = 0
+    for i in range(repeat):
+        if setup:
+            setup()
+        if i == 0:
+            # Hazırlık aşamasındaki API çağrıları ölçüme karışmasın
+            metrics.reset()
+        start = time.perf_counter()
+        items = run()
+        durations.append(time.perf_counter() - start)
+
+    calls, call_p95, retries = api_call_stats(metrics)
+
+    # Bellek ölçümü ayrı bir çalıştırmada: tracemalloc süreleri bozmasın
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(durations)
+    return {
+        'items': items,
+        'runs': repeat,
+        'median_s': round(median, 4),
+        'p50_ms': round(percentile(durations, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 1),
+        'throughput_per_s': round(items / median, 1) if median > 0 else None,
+        'peak_mem_mb': round(peak / (1024 * 1024), 2),
+        'api_calls_per_run': calls // repeat if repeat else 0,
+        'api_call_p95_ms': round(call_p95 * 1000, 1),
+        'api_retries': retries,
+    }
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """Süre ve bellekte eşik üzerindeki artışları gerileme olarak işaretle"""
+    regressions = []
+    print(f"\n{'Senaryo':<28} {'Süre (s)':>10} {'Baseline':>10} {'Δ%':>8} {'Bellek MB':>10} {'Baseline':>10} {'Δ%':>8}")
+    print('-' * 90)
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            print(f"{key:<28} {result['median_s']:>10.3f} {'-':>10} {'':>8} {result['peak_mem_mb']:>10.2f} {'-':>10}")
+            continue
+        deltas = []
+        for field in ('median_s', 'peak_mem_mb'):
+            old, new = base.get(field) or 0, result[field]
+            delta = (new - old) / old * 100 if old else 0.0
+            deltas.append(delta)
+            if old and new > old * (1 + threshold):
+                regressions.append(f"{key} {field}: {old} -> {new} (+{delta:.0f}%)")
+        print(f"{key:<28} {result['median_s']:>10.3f} {base['median_s']:>10.3f} {deltas[0]:>+8.1f} "
+              f"{result['peak_mem_mb']:>10.2f} {base['peak_mem_mb']:>10.2f} {deltas[1]:>+8.1f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Trendyol/HB stok yönetimi benchmark paketi')
+    parser.add_argument('--sizes', default='1000,10000', help='Virgülle ayrılmış SKU sayıları')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Çalıştırılacak senaryolar')
+    parser.add_argument('--repeat', type=int, default=3, help='Senaryo başına ölçülen tekrar')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Mock sunucu yanıt gecikmesi')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='429 döndürülecek istek oranı (0-1)')
+    parser.add_argument('--match-ratio', type=float, default=0.8)
+    parser.add_argument('--cost-ratio', type=float, default=0.05)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Gerileme eşiği (0.2 = %%20)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--output', help='Sonuçları JSON olarak bu dosyaya yaz')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    scenario_names = [name for name in args.scenarios.split(',') if name]
+    unknown = set(scenario_names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Bilinmeyen senaryo: {', '.join(sorted(unknown))}")
+
+    # Mock sunucu app import edilmeden önce ayağa kalkmalı (API adresleri import anında okunur)
+    mock = MockMarketplace([], [], latency_ms=args.latency_ms, rate_429=args.rate_429)
+    configure_environment(mock.start())
+
+    work_dir = tempfile.mkdtemp(prefix='bench_')
+    original_cwd = os.getcwd()
+    os.chdir(work_dir)
+
+    import logging
+    logging.disable(logging.WARNING)
+    import app as app_module
+
+    results = {}
+    try:
+        for size in sizes:
+            ty_products, hb_listings, matches, costs = make_catalogue(
+                size, match_ratio=args.match_ratio, cost_ratio=args.cost_ratio)
+            mock.ty_products = ty_products
+            mock.hb_listings = hb_listings
+            mock.hb_by_sku = {listing['merchantSku']: listing for listing in hb_listings}
+            ctx = Context(app_module, size, matches, costs)
+
+            for name in scenario_names:
+                key = f"{name}@{size}"
+                print(f"▶ {key} ...", flush=True)
+                results[key] = run_scenario(ctx, name, args.repeat)
+                r = results[key]
+                print(f"  {r['median_s']:.3f}s medyan, p95 {r['p95_ms']}ms, "
+                      f"{r['throughput_per_s']}/s, tepe bellek {r['peak_mem_mb']} MB, "
+                      f"{r['api_calls_per_run']} API çağrısı", flush=True)
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        mock.stop()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions:
+            print("\n⚠️ Gerilemeler:")
+            for line in regressions:
+                print(f"  - {line}")
+        else:
+            print("\n✅ Baseline'a göre gerileme yok")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline kaydedildi: {args.baseline}")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Önbellek Modülü
+Aynı arayüze (get/set/delete/delete_prefix/clear) sahip önbellek arka uçları:
+
+    memory  işlem içi LRU + TTL (değerler kopyalanmaz, çağıran değiştirmemeli)
+    sqlite  worker'lar arasında paylaşılan, diskte kalıcı SQLite önbelleği
+    shm     /dev/shm (tmpfs) üzerindeki SQLite; paylaşımlı ama disk G/Ç'siz,
+            yeniden başlatmada silinir
+
+ve fonksiyon sonuçlarını bu arka uçlarda tutan `cached(...)` dekoratörü.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import metrics
+
+SHARED_CACHE_DB = os.getenv("SHARED_CACHE_DB", "shared_cache.db")
+# shm arka ucunun dosyası; /dev/shm yoksa geçici dizin kullanılır
+SHM_CACHE_DB = os.getenv("SHM_CACHE_DB") or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    f"stok_cache_{os.path.basename(os.getcwd()) or 'app'}.db")
+# memory arka ucunda tutulacak en fazla kayıt
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", 512))
+
+_MISSING = object()
+
+
+class MemoryCache:
+    """İşlem içi LRU + TTL önbelleği"""
+
+    def __init__(self, max_entries=MEMORY_CACHE_MAX_ENTRIES, default_ttl=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.inc('cache_evictions_total', backend='memory')
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Anahtar/değer önbelleği; değerler JSON olarak saklanır"""
+
+    PRUNE_EVERY = 200
+
+    def __init__(self, path, default_ttl=None):
+        self.path = path
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._writes = 0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return default
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires_at)
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix):
+        # Aralık sorgusu: LIKE kaçışına gerek kalmadan birincil anahtar indeksini kullanır
+        self._connect().execute("DELETE FROM cache WHERE key >= ? AND key < ?", (prefix, prefix + '\uffff'))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache")
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """İşlemler arası paylaşılan önbellek (SHARED_CACHE_DB)"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            try:
+                _shared_cache = SQLiteCache(SHARED_CACHE_DB)
+            except sqlite3.Error as e:
+                logging.error(f"Paylaşımlı önbellek açılamadı: {e}")
+                raise
+        return _shared_cache
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_cache(backend):
+    """Ada göre önbellek arka ucu: memory | sqlite | shm"""
+    if backend == 'sqlite':
+        return get_shared_cache()
+    with _backends_lock:
+        cache = _backends.get(backend)
+        if cache is None:
+            if backend == 'memory':
+                cache = MemoryCache()
+            elif backend == 'shm':
+                cache = SQLiteCache(SHM_CACHE_DB)
+            else:
+                raise ValueError(f"Bilinmeyen önbellek arka ucu: {backend}")
+            _backends[backend] = cache
+        return cache
+
+
+# namespace -> arka uç adı (invalidate için)
+_namespaces = {}
+
+
+def _call_key(args, kwargs):
+    raw = json.dumps([args, kwargs], sort_keys=True, default=str, ensure_ascii=False)
+    if len(raw) <= 200:
+        return raw
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def cached(namespace, ttl, backend='memory', key=None):
+    """Fonksiyon sonucunu önbellekte tut
+
+    ttl saniye ya da sonuca göre saniye döndüren bir fonksiyondur; 0/None
+    dönerse sonuç önbelleğe alınmaz (ör. hata yanıtları). key verilirse
+    anahtar key(*args, **kwargs) ile, verilmezse argümanlardan üretilir.
+    sqlite/shm arka uçlarında değer JSON'a çevrilebilir olmalıdır.
+
+    Sarılan fonksiyona `invalidate(*args, **kwargs)` (tek çağrı) ve
+    `invalidate_all()` eklenir; yazma yapan kod bunları çağırır.
+    """
+    _namespaces[namespace] = backend
+
+    def decorator(func):
+        def cache_key(args, kwargs):
+            if key is not None:
+                return f"{namespace}:{_call_key([key(*args, **kwargs)], {})}"
+            return f"{namespace}:{_call_key(args, kwargs)}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache(backend)
+            item_key = cache_key(args, kwargs)
+            try:
+                value = cache.get(item_key, _MISSING)
+            except Exception as e:
+                logging.warning(f"Önbellek okunamadı ({namespace}): {e}")
+                value = _MISSING
+            if value is not _MISSING:
+                metrics.inc('cache_requests_total', cache=namespace, result='hit')
+                return value
+            metrics.inc('cache_requests_total', cache=namespace, result='miss')
+            value = func(*args, **kwargs)
+            seconds = ttl(value) if callable(ttl) else ttl
+            if seconds:
+                try:
+                    cache.set(item_key, value, ttl=seconds)
+                except Exception as e:
+                    logging.warning(f"Önbelleğe yazılamadı ({namespace}): {e}")
+            return value
+
+        def invalidate_call(*args, **kwargs):
+            get_cache(backend).delete(cache_key(args, kwargs))
+            metrics.inc('cache_invalidations_total', cache=namespace)
+
+        wrapper.invalidate = invalidate_call
+        wrapper.invalidate_all = lambda: invalidate(namespace)
+        return wrapper
+    return decorator
+
+
+def invalidate(namespace):
+    """namespace altındaki tüm kayıtları sil (yazma sonrası çağrılır)"""
+    try:
+        get_cache(_namespaces.get(namespace, 'memory')).delete_prefix(f"{namespace}:")
+        metrics.inc('cache_invalidations_total', cache=namespace)
+    except Exception as e:
+        logging.warning(f"Önbellek temizlenemedi ({namespace}): {e}")
+
@@ -0,0 +1,320 @@
+"""
+Giden Değişiklik Günlüğü Modülü
+Pazaryerlerine gönderilen stok/fiyat değişikliklerini yalnızca eklenen
+(append-only) bir JSONL günlüğünde tutar. Her kalem bir durum makinesidir:
+
+    pending -> sending -> sent (batch bekleniyor) -> done | failed
+    sending -> pending (gönderilemedi, ör. pazaryeri devresi açık)
+    pending -> superseded (aynı SKU için daha yeni değer geldi ya da aynı
+                           değer başarıyla gönderildi)
+    sent -> expired (batch sonucu alınamadı)
+
+Aynı SKU için bekleyen özdeş değişiklik tekrar eklenmez, farklı
+değişiklikler son değerde birleştirilir. SKU'nun yolda (sending/sent) bir
+kalemi varken gelen değişiklik bekletilir: yoldaki kalem sonuçlanana kadar
+gönderilmez, böylece gönderim sırası korunur ve başarısız olan gönderimin
+tekrarı kaybolmaz. Yarım kalan işler açılışta yeniden oynatılır.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import metrics
+import storage
+
+JOURNAL_FILE = os.getenv("CHANGE_JOURNAL_FILE", "outbound_changes.jsonl")
+# Bu kadar satırdan sonra günlük sadece açık + son bitmiş kalemlerle yeniden yazılır
+JOURNAL_COMPACT_EVERY = int(os.getenv("CHANGE_JOURNAL_COMPACT_EVERY", 2000))
+JOURNAL_KEEP_FINISHED = 500
+# Diğer işlemlerin yazdıklarını görmek için dosya kontrol aralığı (saniye)
+JOURNAL_CHECK_SECONDS = 1
+
+OPEN_STATES = ('pending', 'sending', 'sent')
+FINAL_STATES = ('done', 'failed', 'superseded', 'expired')
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _file_id(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_dev
+
+
+class ChangeJournal:
+    """Giden değişiklik kalemleri: id -> kalem, SKU anahtarı -> son açık kalem"""
+
+    def __init__(self, path):
+        self.path = path
+        self._items = {}
+        self._open = {}
+        self._inflight = {}
+        self._offset = 0
+        self._lines = 0
+        self._file_id = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    # --- Yükleme
+    def _reset(self):
+        self._items = {}
+        self._open = {}
+        self._inflight = {}
+        self._offset = 0
+        self._lines = 0
+
+    def _apply(self, event):
+        op = event['op']
+        if op in ('enqueue', 'item'):
+            item = dict(event['item'])
+            self._items[item['id']] = item
+            if item['state'] in OPEN_STATES:
+                self._open[item['key']] = item['id']
+            if item['state'] in ('sending', 'sent'):
+                self._inflight[item['key']] = item['id']
+            return
+        item = self._items.get(event['id'])
+        if item is None:
+            return
+        item['state'] = op
+        item['updated'] = event['ts']
+        for field in ('batch_id', 'error', 'superseded_by'):
+            if field in event:
+                item[field] = event[field]
+        if op == 'sending':
+            item['attempts'] = item.get('attempts', 0) + 1
+            item['claimed_at'] = event['at']
+            self._inflight[item['key']] = item['id']
+        if op == 'pending' and self._inflight.get(item['key']) == item['id']:
+            del self._inflight[item['key']]
+        if op in FINAL_STATES:
+            if self._open.get(item['key']) == item['id']:
+                del self._open[item['key']]
+            if self._inflight.get(item['key']) == item['id']:
+                del self._inflight[item['key']]
+
+    def _sync(self, force=False):
+        """Günlükte son okunan konumdan sonraki satırları uygula"""
+        now = time.monotonic()
+        if not force and self._file_id is not None and now - self._checked_at < JOURNAL_CHECK_SECONDS:
+            return
+        with self._lock:
+            file_id = _file_id(self.path)
+            if file_id is None:
+                self._reset()
+                self._file_id = ()
+                self._checked_at = now
+                return
+            if file_id != self._file_id or os.path.getsize(self.path) < self._offset:
+                # Günlük başka bir işlemde yeniden yazılmış
+                self._reset()
+                self._file_id = file_id
+            with open(self.path, 'r', encoding='utf-8') as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith('\n'):
+                        break  # Yarım yazılmış son satır
+                    self._offset += len(line.encode('utf-8'))
+                    self._lines += 1
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError):
+                        logging.warning(f"Bozuk değişiklik günlüğü satırı atlandı: {line[:80]}")
+            self._checked_at = now
+
+    def _append(self, events):
+        """Olayları (kilit altında, güncel durumun üstüne) fsync ile ekle ve uygula"""
+        if not events:
+            return
+        data = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if self._file_id in (None, ()):
+            self._file_id = _file_id(self.path)
+        self._offset += len(data.encode('utf-8'))
+        self._lines += len(events)
+        for event in events:
+            self._apply(event)
+        metrics.inc('change_journal_events_total', len(events))
+        if self._lines >= JOURNAL_COMPACT_EVERY:
+            self._compact()
+
+    def _compact(self):
+        """Açık kalemler ve son bitmiş kalemlerle günlüğü yeniden yaz"""
+        finished = sorted((item for item in self._items.values() if item['state'] in FINAL_STATES),
+                          key=lambda item: item['updated'])[-JOURNAL_KEEP_FINISHED:]
+        keep = [item for item in self._items.values() if item['state'] in OPEN_STATES] + finished
+        keep.sort(key=lambda item: item['created'])
+        with storage.atomic_writer(self.path) as f:
+            for item in keep:
+                f.write(json.dumps({'op': 'item', 'item': item}, ensure_ascii=False) + '\n')
+        self._reset()
+        self._file_id = None
+        self._sync(force=True)
+
+    def _transition_events(self, ids, state, allowed, fields):
+        return [
+            dict(fields, op=state, id=item_id, ts=_now())
+            for item_id in ids
+            if item_id in self._items and self._items[item_id]['state'] in allowed
+        ]
+
+    def _transition(self, ids, state, allowed, **fields):
+        with storage.locked(self.path), self._lock:
+            self._sync(force=True)
+            events = self._transition_events(ids, state, allowed, fields)
+            self._append(events)
+            return [self._items[event['id']] for event in events]
+
+    # --- Yazma
+    def enqueue(self, changes):
+        """Değişiklikleri günlüğe ekle; her biri için (kalem, sonuç) döner
+
+        changes: [{'marketplace', 'kind', 'sku', 'fields'}]. Sonuç:
+        'queued' (yeni), 'coalesced' (bekleyen kalemle birleşti), 'held'
+        (SKU'nun yolda bir kalemi var; o sonuçlanınca gönderilecek) ya da
+        'duplicate' (aynı değer zaten bekliyor).
+        """
+        results = []
+        with storage.locked(self.path), self._lock:
+            self._sync(force=True)
+            for change in changes:
+                key = f"{change['kind']}:{change['sku']}"
+                fields = dict(change['fields'])
+                current = self._items.get(self._open.get(key))
+                outcome = 'queued'
+                after = self._inflight.get(key)
+                if current is not None and current['state'] == 'pending':
+                    merged = dict(current['fields'], **fields)
+                    if merged == current['fields']:
+                        results.append((current, 'duplicate'))
+                        continue
+                    fields, outcome = merged, 'coalesced'
+                elif current is not None:
+                    # Yoldaki kalemin üstüne tam değer: sonucu belli olana kadar beklet
+                    fields, outcome = dict(current['fields'], **fields), 'held'
+                item = {
+                    'id': uuid.uuid4().hex,
+                    'key': key,
+                    'marketplace': change['marketplace'],
+                    'kind': change['kind'],
+                    'sku': change['sku'],
+                    'fields': fields,
+                    'state': 'pending',
+                    'attempts': 0,
+                    'created': _now(),
+                    'updated': _now()
+                }
+                if after is not None:
+                    item['after'] = after
+                events = [{'op': 'enqueue', 'item': item}]
+                if outcome == 'coalesced':
+                    events.insert(0, {'op': 'superseded', 'id': current['id'], 'ts': _now(),
+                                      'superseded_by': item['id']})
+                self._append(events)
+                results.append((self._items[item['id']], outcome))
+                metrics.inc('change_journal_enqueue_total', kind=change['kind'], result=outcome)
+        return results
+
+    def claim(self, ids, stale_after=None):
+        """Gönderilecek kalemleri 'sending' durumuna al (işlemler arası tek sahip)
+
+        Sadece 'pending' kalemler (stale_after verilirse o kadar saniyedir
+        'sending' kalmış, yani yarıda kalmış kalemler de) alınır. SKU'nun
+        yolda başka bir kalemi varsa bekleyen kalem alınmaz; ids sırayla
+        işlenir, yarıda kalmış eski kalem aynı çağrıda devredilirse SKU boşalır.
+        """
+        now = time.time()
+        with storage.locked(self.path), self._lock:
+            self._sync(force=True)
+            inflight = dict(self._inflight)
+            claimed = []
+            events = []
+            for item_id in ids:
+                item = self._items.get(item_id)
+                if item is None:
+                    continue
+                key = item['key']
+                abandoned = (stale_after is not None and item['state'] == 'sending'
+                             and now - item.get('claimed_at', 0) >= stale_after)
+                if abandoned and self._open.get(key) != item_id:
+                    # Aynı SKU için daha yeni bir değer var; eskisi tekrar gönderilmez
+                    events.append({'op': 'superseded', 'id': item_id, 'ts': _now(),
+                                   'superseded_by': self._open.get(key)})
+                    if inflight.get(key) == item_id:
+                        del inflight[key]
+                elif abandoned or (item['state'] == 'pending' and inflight.get(key) is None):
+                    claimed.append(item_id)
+                    inflight[key] = item_id
+                    events.append({'op': 'sending', 'id': item_id, 'ts': _now(), 'at': now})
+            self._append(events)
+            return [self._items[item_id] for item_id in claimed]
+
+    def mark_sent(self, ids, batch_id):
+        return self._transition(ids, 'sent', ('sending',), batch_id=batch_id)
+
+    def mark_done(self, ids):
+        """Kalemleri tamamla; aynı değerle bekletilen kalemler artık gereksiz"""
+        with storage.locked(self.path), self._lock:
+            self._sync(force=True)
+            events = self._transition_events(ids, 'done', OPEN_STATES, {})
+            for event in list(events):
+                item = self._items[event['id']]
+                waiting = self._items.get(self._open.get(item['key']))
+                if (waiting is not None and waiting['state'] == 'pending'
+                        and waiting['fields'] == item['fields']):
+                    events.append({'op': 'superseded', 'id': waiting['id'], 'ts': _now(),
+                                   'superseded_by': item['id']})
+            self._append(events)
+            return [self._items[event['id']] for event in events if event['op'] == 'done']
+
+    def release(self, ids, error):
+        """İstek hiç gönderilemeyen kalemleri tekrar 'pending' yap (yeniden oynatılır)"""
+        return self._transition(ids, 'pending', ('sending',), error=error)
+
+    def mark_failed(self, ids, error):
+        return self._transition(ids, 'failed', OPEN_STATES, error=error)
+
+    def expire(self, ids):
+        return self._transition(ids, 'expired', ('sent',))
+
+    # --- Okuma
+    def get(self, item_id):
+        self._sync()
+        return self._items.get(item_id)
+
+    def open_items(self, state=None):
+        """Açık kalemler (state verilirse sadece o durumdakiler), eskiden yeniye"""
+        self._sync()
+        with self._lock:
+            items = [item for item in self._items.values()
+                     if item['state'] in OPEN_STATES and (state is None or item['state'] == state)]
+        return sorted(items, key=lambda item: item['created'])
+
+    def summary(self):
+        self._sync()
+        with self._lock:
+            counts = {}
+            for item in self._items.values():
+                counts[item['state']] = counts.get(item['state'], 0) + 1
+            return {'states': counts, 'open': sum(counts.get(state, 0) for state in OPEN_STATES)}
+
+    def recent(self, limit=50):
+        self._sync()
+        with self._lock:
+            items = sorted(self._items.values(), key=lambda item: item['updated'], reverse=True)
+            return items[:limit]
+
+
+change_journal = ChangeJournal(JOURNAL_FILE)
@@ -0,0 +1,161 @@
+"""
+Devre Kesici Modülü
+Pazaryeri başına devre kesici: son çağrılardaki hata oranı eşiği aşınca
+devre açılır ve istekler API'ye gitmeden hemen reddedilir. Bekleme
+süresinden sonra yarı açık durumda tek bir deneme isteğine izin verilir;
+başarılı olursa devre kapanır, olmazsa tekrar açılır.
+
+Açılma bilgisi paylaşımlı önbelleğe de yazılır; böylece diğer worker'lar
+aynı API'yi denemeden bekleme süresince kendi devrelerini açar.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import cache_backend
+import metrics
+
+# Hata oranı bu son çağrılar üzerinden hesaplanır
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", 20))
+# Devrenin açılabilmesi için penceredeki en az çağrı sayısı
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 5))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", 0.5))
+# Açık devrenin yarı açığa geçmeden önce bekleyeceği süre (saniye)
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 30))
+# Diğer worker'ların açtığı devreler en fazla bu aralıkla kontrol edilir
+BREAKER_SHARED_CHECK_SECONDS = 1.0
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Devre açıkken yapılan çağrı"""
+
+    def __init__(self, name, retry_in):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"{name} API'si şu anda yanıt vermiyor (devre açık, {retry_in:.0f} sn sonra tekrar denenecek)")
+
+
+class CircuitBreaker:
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = None
+        self.open_until = 0.0
+        self.last_failure = None
+        self.last_success_at = None
+        self._outcomes = deque(maxlen=BREAKER_WINDOW)
+        self._probe_in_flight = False
+        self._shared_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Çağrı yapılabilir mi? Yarı açık durumda aynı anda tek deneme"""
+        now = time.time()
+        with self._lock:
+            if self.state == CLOSED:
+                self._check_shared(now)
+            if self.state == OPEN:
+                if now < self.open_until:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def retry_in(self):
+        return max(self.open_until - time.time(), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self.last_success_at = time.time()
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+            self._outcomes.append(True)
+
+    def record_failure(self, error):
+        with self._lock:
+            self.last_failure = str(error)[:200]
+            self._probe_in_flight = False
+            self._outcomes.append(False)
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            failures = self._outcomes.count(False)
+            if (self.state == CLOSED and len(self._outcomes) >= BREAKER_MIN_CALLS
+                    and failures / len(self._outcomes) >= BREAKER_FAILURE_RATE):
+                self._open()
+
+    def _open(self, until=None, share=True):
+        self.opened_at = time.time()
+        self.open_until = until or self.opened_at + BREAKER_OPEN_SECONDS
+        self._set_state(OPEN)
+        logging.warning(f"{self.name} devresi açıldı: {self.last_failure}")
+        if share:
+            try:
+                cache_backend.get_shared_cache().set(
+                    f"breaker:{self.name}", {'open_until': self.open_until, 'error': self.last_failure},
+                    ttl=BREAKER_OPEN_SECONDS)
+            except Exception as e:
+                logging.warning(f"Devre durumu paylaşılamadı: {e}")
+
+    def _check_shared(self, now):
+        if now - self._shared_checked_at < BREAKER_SHARED_CHECK_SECONDS:
+            return
+        self._shared_checked_at = now
+        try:
+            shared = cache_backend.get_shared_cache().get(f"breaker:{self.name}")
+        except Exception:
+            return
+        if shared and shared['open_until'] > now:
+            self.last_failure = shared.get('error')
+            self._open(until=shared['open_until'], share=False)
+
+    def _set_state(self, state):
+        if state != self.state:
+            metrics.inc('circuit_breaker_transitions_total', breaker=self.name, state=state)
+        self.state = state
+        metrics.set_gauge('circuit_breaker_open', 0 if state == CLOSED else 1, breaker=self.name)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failure_rate': round(self._outcomes.count(False) / len(self._outcomes), 2) if self._outcomes else 0.0,
+                'calls_in_window': len(self._outcomes),
+                'retry_in_seconds': round(self.retry_in(), 1) if self.state == OPEN else 0,
+                'last_failure': self.last_failure,
+                'last_success_at': self.last_success_at
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def is_available(name):
+    """Devre kapalı ya da deneme zamanı gelmiş mi? (deneme hakkı harcanmaz)"""
+    breaker = get_breaker(name)
+    return breaker.state != OPEN or breaker.retry_in() == 0
+
+
+def status():
+    with _breakers_lock:
+        names = list(_breakers)
+    return {name: get_breaker(name).snapshot() for name in names}
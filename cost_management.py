@@ -3,51 +3,309 @@ Kar Takip ve Maliyet Yönetimi Modülü
 Trendyol ürünleri için maliyet hesaplama ve kar analizi
 """
 
+import copy
+import itertools
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 import logging
 
+import metrics
+import storage
+
 # Dosya yolları
 COSTS_FILE = 'costs.json'
+# Tek ürün güncellemeleri bu dosyaya satır olarak eklenir; belirli sayıda
+# satır birikince costs.json'a katlanır (compaction) ve dosya sıfırlanır
+COSTS_JOURNAL_FILE = 'costs.journal.jsonl'
+COSTS_COMPACT_EVERY = int(os.getenv("COSTS_COMPACT_EVERY", 500))
+# Diğer worker'ların yazmaları için dosyalar en fazla bu aralıkla kontrol edilir
+COSTS_CHECK_SECONDS = float(os.getenv("COSTS_CHECK_SECONDS", 1))
+
+# Kar analizi önbelleğinde tutulacak en fazla ürün sayısı
+PROFIT_CACHE_MAX_ENTRIES = int(os.getenv("PROFIT_CACHE_MAX_ENTRIES", 50000))
+
+# Sayısal alanlar; boş değerler '' yerine None olarak saklanır
+COST_NUMERIC_FIELDS = ('cargo_cost', 'commission_rate', 'withholding_rate',
+                       'other_expenses_rate', 'platform_fee', 'sale_price')
+
+
+def _to_number(value):
+    if value == '' or value is None:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def normalize_cost_record(data):
+    """Maliyet kaydını tipli şemaya çevir (sayılar float, boşlar None)"""
+    data = data or {}
+    record = {'production_costs': []}
+    for item in data.get('production_costs') or []:
+        if not isinstance(item, dict):
+            continue
+        record['production_costs'].append({
+            'name': str(item.get('name', '')).strip(),
+            'amount': _to_number(item.get('amount')) or 0.0
+        })
+    for field in COST_NUMERIC_FIELDS:
+        record[field] = _to_number(data.get(field))
+    record['last_updated'] = data.get('last_updated') or datetime.now().isoformat()
+    return record
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CostStore:
+    """Barkod -> maliyet kaydı indeksi
+
+    Okumalar bellekteki indeksten yapılır. Tek ürün kaydı günlüğe bir
+    satır ekler; tüm dosya sadece compaction sırasında yeniden yazılır.
+    Kayıtlar yerinde değiştirilmez, her kayıtta yenisiyle değiştirilir;
+    bu yüzden okunan kayıtlar paylaşılır ve değiştirilmemelidir.
+    """
+
+    def __init__(self, path, journal_path):
+        self.path = path
+        self.journal_path = journal_path
+        self.version = 0
+        self._index = {}
+        # Barkod -> kaydın revizyonu; kayıt her değiştiğinde yeni numara alır
+        self._revisions = {}
+        self._revision_counter = itertools.count(1)
+        self._snapshot_signature = None
+        self._journal_offset = 0
+        self._journal_lines = 0
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    # --- Yükleme
+    def _load_snapshot(self):
+        index = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for barcode, record in data.items():
+                # Eski dosyalardaki üst seviye 'last_updated' gibi kayıt olmayan anahtarları atla
+                if isinstance(record, dict):
+                    index[barcode] = normalize_cost_record(record)
+        self._set_index(index)
+        self._snapshot_signature = _file_signature(self.path)
+        self._journal_offset = 0
+        self._journal_lines = 0
+
+    def _replay_journal(self):
+        """Günlükte son okunan konumdan sonraki satırları indekse uygula"""
+        if not os.path.exists(self.journal_path):
+            self._journal_offset = 0
+            return
+        if os.path.getsize(self.journal_path) < self._journal_offset:
+            # Günlük başka bir işlemde katlanıp sıfırlanmış
+            self._load_snapshot()
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # Yarım yazılmış son satır
+                self._journal_offset += len(line.encode('utf-8'))
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logging.warning(f"Bozuk maliyet günlüğü satırı atlandı: {line[:80]}")
+                    continue
+                self._set_record(entry['barcode'], normalize_cost_record(entry['record']))
+                self._journal_lines += 1
+
+    def _sync(self, force=False):
+        """Dosyalar başka bir işlemde değiştiyse indeksi güncelle"""
+        now = time.monotonic()
+        if self._loaded and not force and now - self._checked_at < COSTS_CHECK_SECONDS:
+            return
+        with self._lock:
+            before = (self._snapshot_signature, self._journal_offset)
+            if not self._loaded or _file_signature(self.path) != self._snapshot_signature:
+                self._load_snapshot()
+            self._replay_journal()
+            if not self._loaded or (self._snapshot_signature, self._journal_offset) != before:
+                self.version += 1
+            self._loaded = True
+            self._checked_at = now
+
+    def _set_index(self, index):
+        self._index = index
+        self._revisions = {barcode: next(self._revision_counter) for barcode in index}
+        profit_cache.clear()
+
+    def _set_record(self, barcode, record):
+        self._index[barcode] = record
+        self._revisions[barcode] = next(self._revision_counter)
+        profit_cache.invalidate(barcode)
+
+    # --- Okuma
+    def get(self, barcode):
+        self._sync()
+        return self._index.get(barcode)
+
+    def all(self):
+        """Tüm kayıtlar (barkod -> kayıt); dönen dict değiştirilmemeli"""
+        self._sync()
+        return self._index
+
+    def get_with_revision(self, barcode):
+        """(kayıt, revizyon); kayıt yoksa (None, 0)"""
+        self._sync()
+        with self._lock:
+            return self._index.get(barcode), self._revisions.get(barcode, 0)
+
+    def current_version(self):
+        self._sync()
+        return self.version
+
+    # --- Yazma
+    def upsert(self, barcode, data):
+        """Tek ürünün kaydını günlüğe ekle ve indeksi güncelle"""
+        record = normalize_cost_record(dict(data, last_updated=datetime.now().isoformat()))
+        line = json.dumps({'barcode': barcode, 'record': record}, ensure_ascii=False) + '\n'
+        with storage.locked(self.path):
+            with self._lock:
+                self._sync(force=True)
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._set_record(barcode, record)
+                self._journal_offset += len(line.encode('utf-8'))
+                self._journal_lines += 1
+                self.version += 1
+                if self._journal_lines >= COSTS_COMPACT_EVERY:
+                    self._compact()
+        return record
+
+    def replace_all(self, costs_data):
+        """Tüm kayıtları verilen barkod haritasıyla değiştir"""
+        index = {
+            barcode: normalize_cost_record(record)
+            for barcode, record in costs_data.items()
+            if isinstance(record, dict)
+        }
+        with storage.locked(self.path):
+            with self._lock:
+                self._set_index(index)
+                self._compact()
+                self.version += 1
+                self._loaded = True
+
+    def _compact(self):
+        """İndeksi costs.json'a yaz ve günlüğü sıfırla (kilit altında çağrılır)"""
+        with storage.atomic_writer(self.path) as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        # Yeni snapshot günlüğün tamamını içerir; burada çökülse bile
+        # günlüğün tekrar uygulanması aynı sonucu verir
+        with open(self.journal_path, 'w', encoding='utf-8'):
+            pass
+        self._snapshot_signature = _file_signature(self.path)
+        self._journal_offset = 0
+        self._journal_lines = 0
+
+
+class ProfitCache:
+    """Barkod başına son kar analizi: (satış fiyatı, kayıt revizyonu) eşleşirse geçerli
+
+    Sınırlı boyutlu LRU; maliyet kaydı değişince ilgili barkod atılır,
+    fiyat değişince anahtar tutmadığı için yeniden hesaplanır.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, barcode, sale_price, revision):
+        with self._lock:
+            entry = self._entries.get(barcode)
+            if entry is None or entry[0] != sale_price or entry[1] != revision:
+                return None
+            self._entries.move_to_end(barcode)
+            return entry[2]
+
+    def put(self, barcode, sale_price, revision, analysis):
+        with self._lock:
+            self._entries[barcode] = (sale_price, revision, analysis)
+            self._entries.move_to_end(barcode)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, barcode):
+        with self._lock:
+            self._entries.pop(barcode, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+profit_cache = ProfitCache(PROFIT_CACHE_MAX_ENTRIES)
+cost_store = CostStore(COSTS_FILE, COSTS_JOURNAL_FILE)
+
 
 def load_costs():
-    """Maliyet verilerini yükle"""
-    if os.path.exists(COSTS_FILE):
-        try:
-            with open(COSTS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            logging.error(f"Maliyet verisi okuma hatası: {e}")
-            return {}
-    return {}
+    """Maliyet verilerini yükle (barkod -> kayıt kopyası)"""
+    try:
+        return copy.deepcopy(cost_store.all())
+    except Exception as e:
+        logging.error(f"Maliyet verisi okuma hatası: {e}")
+        return {}
 
 def save_costs(costs_data):
-    """Maliyet verilerini kaydet"""
+    """Maliyet verilerini kaydet (tüm kayıtları değiştirir)"""
     try:
-        costs_data['last_updated'] = datetime.now().isoformat()
-        with open(COSTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(costs_data, f, ensure_ascii=False, indent=2)
+        cost_store.replace_all(costs_data)
         return True
     except Exception as e:
         logging.error(f"Maliyet verisi kayıt hatası: {e}")
         return False
 
+def get_all_costs():
+    """Tüm kayıtlar (barkod -> kayıt), kopyalanmadan; değiştirilmemeli"""
+    return cost_store.all()
+
+def get_costs_version():
+    """Maliyet verisi her değiştiğinde artan sayaç"""
+    return cost_store.current_version()
+
 def get_product_cost_data(barcode):
-    """Belirli bir ürünün maliyet verilerini getir"""
-    costs = load_costs()
-    return costs.get(barcode, get_default_cost_structure())
+    """Belirli bir ürünün maliyet verilerini getir (dönen kayıt değiştirilmemeli)"""
+    try:
+        record = cost_store.get(barcode)
+    except Exception as e:
+        logging.error(f"Maliyet verisi okuma hatası: {e}")
+        record = None
+    return record if record is not None else get_default_cost_structure()
 
 def get_default_cost_structure():
-    """Varsayılan maliyet yapısı"""
+    """Varsayılan maliyet yapısı (boş sayısal alanlar None)"""
     return {
         'production_costs': [],  # Üretim giderleri listesi
-        'cargo_cost': '',       # Kargo gideri (boş)
-        'commission_rate': '',  # Komisyon oranı (boş)
-        'withholding_rate': '',  # Stopaj oranı (boş)
-        'other_expenses_rate': '',  # Diğer giderler oranı (boş)
-        'platform_fee': '',     # Platform bedeli (boş)
-        'sale_price': '',       # Satış fiyatı (boş)
+        'cargo_cost': None,       # Kargo gideri (boş)
+        'commission_rate': None,  # Komisyon oranı (boş)
+        'withholding_rate': None,  # Stopaj oranı (boş)
+        'other_expenses_rate': None,  # Diğer giderler oranı (boş)
+        'platform_fee': None,     # Platform bedeli (boş)
+        'sale_price': None,       # Satış fiyatı (boş)
         'last_updated': datetime.now().isoformat()
     }
 
@@ -143,24 +401,51 @@ def calculate_profit_analysis(barcode, sale_price, cost_data):
         return None
 
 def save_product_cost_data(barcode, cost_data):
-    """Ürün maliyet verilerini kaydet"""
-    costs = load_costs()
-    costs[barcode] = cost_data
-    costs[barcode]['last_updated'] = datetime.now().isoformat()
-    return save_costs(costs)
+    """Ürün maliyet verilerini kaydet (sadece bu ürünün kaydı yazılır)"""
+    try:
+        cost_store.upsert(barcode, cost_data)
+        return True
+    except Exception as e:
+        logging.error(f"Maliyet verisi kayıt hatası: {e}")
+        return False
+
+def get_profit_analysis(barcode, sale_price):
+    """Kayıtlı maliyet verisiyle kar analizi (önbellekli; dönen dict değiştirilmemeli)"""
+    sale_price = float(sale_price or 0)
+    record, revision = cost_store.get_with_revision(barcode)
+    analysis = profit_cache.get(barcode, sale_price, revision)
+    if analysis is not None:
+        metrics.inc('profit_cache_total', result='hit')
+        return analysis
+    metrics.inc('profit_cache_total', result='miss')
+    analysis = calculate_profit_analysis(barcode, sale_price, record or get_default_cost_structure())
+    if analysis is not None:
+        profit_cache.put(barcode, sale_price, revision, analysis)
+    return analysis
+
+def get_all_profit_analyses(products_list):
+    """Ürün listesi için barkod -> kar analizi (satış fiyatı 0 olanlar None)"""
+    analyses = {}
+    for product in products_list:
+        barcode = product.get('barcode', '')
+        try:
+            sale_price = float(product.get('ty_price') or 0)
+        except (ValueError, TypeError):
+            sale_price = 0.0
+        analyses[barcode] = get_profit_analysis(barcode, sale_price) if sale_price > 0 else None
+    return analyses
 
 def get_all_products_with_costs(products_list):
     """Tüm ürünlerin maliyet analiziyle birlikte listesini getir"""
-    costs = load_costs()
     result = []
     
     for product in products_list:
         barcode = product.get('barcode', '')
-        cost_data = costs.get(barcode, get_default_cost_structure())
+        cost_data = get_product_cost_data(barcode)
         sale_price = float(product.get('ty_price', 0))
         
-        # Kar analizi hesapla
-        analysis = calculate_profit_analysis(barcode, sale_price, cost_data)
+        # Kar analizi (önbellekten)
+        analysis = get_profit_analysis(barcode, sale_price)
         
         # Ürün verisini genişlet
         product_with_costs = product.copy()
@@ -0,0 +1,452 @@
+"""
+Maliyet ve Kar Sayfaları Modülü
+Maliyet listesi/detayı ve kaydı, satış fiyatı güncelleme, yeniden
+fiyatlandırma simülasyonu, pano özeti ve dışa aktarma raporları (cost
+blueprint'i). Paylaşılan yardımcılar app modülünden alınır; blueprint
+app.py'nin sonunda kaydedilir.
+"""
+
+import csv
+import io
+import logging
+import time
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, Response, stream_with_context
+
+from change_journal import change_journal
+import circuit_breaker
+from cost_tracking import log_cost_data_change, iter_cost_change_rows, COST_AUDIT_COLUMNS
+import exports
+import metrics
+import response_cache
+import retention
+from app import (
+    PRODUCTS_CACHE_FILE, ARCHIVE_FOLDER, EXCEL_COLUMNS, PROFIT_REPORT_COLUMNS,
+    TRENDYOL_PRICE_BATCH_SIZE, DASHBOARD_SUMMARY_SOURCES,
+    COSTS_FILE, COSTS_JOURNAL_FILE,
+    get_all_costs, get_product_cost_data, save_product_cost_data,
+    get_profit_analysis, get_all_profit_analyses,
+    login_required,
+    load_products_cache, iter_products_cache, find_cached_product,
+    get_dashboard_summary, refresh_dashboard_summary_async,
+    journal_submit, journal_unsent_response, journal_add_unsent, send_ty_inventory, ty_inventory_changes,
+    circuit_open_response,
+    get_excel_filename, parse_weekly_excel_filename, list_weekly_excel_files,
+    list_week_shard_files, iter_stock_history_rows
+)
+
+cost_bp = Blueprint('cost', __name__)
+
+
+def iter_profit_report_rows():
+    """Cache'teki her ürün için kar analizi satırı (analizler önbellekten)"""
+    for product in iter_products_cache():
+        barcode = product.get('barcode', '')
+        sale_price = float(product.get('ty_price') or 0)
+        analysis = get_profit_analysis(barcode, sale_price) if sale_price > 0 else None
+        analysis = analysis or {}
+        yield [
+            barcode,
+            product.get('title', ''),
+            sale_price,
+            analysis.get('production_total'),
+            analysis.get('cargo_total'),
+            analysis.get('commission_amount'),
+            analysis.get('withholding_amount'),
+            analysis.get('other_expenses'),
+            analysis.get('platform_fee'),
+            analysis.get('net_vat'),
+            analysis.get('total_expenses'),
+            analysis.get('profit_amount'),
+            analysis.get('profit_rate')
+        ]
+
+@cost_bp.route('/export/<report>.<fmt>')
+@login_required
+def export_report(report, fmt):
+    """Raporu CSV/Excel olarak sabit bellekle, parça parça indir
+
+    stock_history: ?week=2026_W05 (varsayılan bu hafta) ya da ?week=all
+    cost_audit: ?year=2026 (varsayılan bu yıl)
+    profit: güncel ürünler ve maliyetler
+    """
+    if fmt not in exports.EXPORT_MIMETYPES:
+        return jsonify({'error': 'Format csv veya xlsx olmalı'}), 400
+    
+    if report == 'stock_history':
+        week = request.args.get('week')
+        archives = retention.load_manifest(ARCHIVE_FOLDER)['archives']
+        if week == 'all':
+            sources = [('archive', archives[key]) for key in sorted(archives)]
+            sources += [('excel', name) for name in list_weekly_excel_files()]
+        else:
+            filename = f"stok_raporu_{week}.xlsx" if week else get_excel_filename()
+            key = filename[:-len('.xlsx')]
+            parsed = parse_weekly_excel_filename(filename)
+            if parsed is None or parsed[2] != 1:
+                return jsonify({'error': 'Haftalık rapor bulunamadı'}), 404
+            shard_files = list_week_shard_files(*parsed[:2])
+            if shard_files:
+                sources = [('excel', name) for name in shard_files]
+            elif key in archives:
+                sources = [('archive', archives[key])]
+            else:
+                return jsonify({'error': 'Haftalık rapor bulunamadı'}), 404
+        columns, rows, sheet = EXCEL_COLUMNS, iter_stock_history_rows(sources), 'Stok Geçmişi'
+        download_name = f"stok_gecmisi_{week or get_excel_filename()[len('stok_raporu_'):-len('.xlsx')]}"
+    elif report == 'cost_audit':
+        year = request.args.get('year', str(datetime.now().year))
+        if not year.isdigit():
+            return jsonify({'error': 'Geçersiz yıl'}), 400
+        columns, rows, sheet = COST_AUDIT_COLUMNS, iter_cost_change_rows(int(year)), 'Maliyet Değişiklikleri'
+        download_name = f"maliyet_degisiklikleri_{year}"
+    elif report == 'profit':
+        columns, rows, sheet = PROFIT_REPORT_COLUMNS, iter_profit_report_rows(), 'Kar Raporu'
+        download_name = f"kar_raporu_{datetime.now().strftime('%Y%m%d_%H%M')}"
+    else:
+        return jsonify({'error': 'Bilinmeyen rapor'}), 404
+    
+    body = exports.iter_export(fmt, columns, rows, sheet_title=sheet, report=report)
+    return Response(
+        stream_with_context(body),
+        mimetype=exports.EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename={download_name}.{fmt}'}
+    )
+
+@cost_bp.route('/dashboard/summary')
+@login_required
+@response_cache.cached_response(*DASHBOARD_SUMMARY_SOURCES)
+def dashboard_summary_view():
+    """Stok/kar panosu toplamları (tüm ürün listesi yerine birkaç KB)
+
+    ?sections=stock,profit ile sadece istenen bölümler döner.
+    """
+    try:
+        summary = get_dashboard_summary()
+    except Exception as e:
+        logging.error(f"Pano özeti hatası: {e}")
+        return jsonify({'error': f'Özet hesaplanamadı: {str(e)}'}), 500
+    sections = [name for name in request.args.get('sections', '').split(',') if name]
+    if sections:
+        meta = ('data_version', 'generated_at', 'build_seconds')
+        summary = {key: value for key, value in summary.items() if key in sections or key in meta}
+    return jsonify(summary)
+
+@cost_bp.route('/costs')
+@login_required
+@response_cache.cached_response(PRODUCTS_CACHE_FILE, COSTS_FILE, COSTS_JOURNAL_FILE)
+def costs():
+    """Kar Takip Ana Sayfası - Güvenli Float Conversion"""
+    try:
+        # Cache'den ürünleri al
+        cached_products, last_updated = load_products_cache()
+        
+        if cached_products and len(cached_products) > 0:
+            # Kar analizleri önbellekten (sadece değişen ürünler yeniden hesaplanır)
+            profit_analyses = get_all_profit_analyses(cached_products)
+            
+            # Ürünleri cost_data ile birleştir ve hesapla
+            products_with_costs = []
+            for product in cached_products:
+                try:
+                    barcode = product.get('barcode', '')
+                    cost_data = get_product_cost_data(barcode)
+                    
+                    # Güvenli float conversion fonksiyonu
+                    def safe_float(value, default=0):
+                        if value == '' or value is None:
+                            return default
+                        try:
+                            return float(value)
+                        except (ValueError, TypeError):
+                            return default
+                    
+                    # Üretim giderleri toplamını hesapla
+                    production_total = 0
+                    if cost_data.get('production_costs'):
+                        for cost_item in cost_data['production_costs']:
+                            amount = safe_float(cost_item.get('amount', 0))
+                            vat = amount * 0.2
+                            production_total += amount + vat
+                    
+                    # Diğer hesaplamalar - güvenli float conversion
+                    sale_price = safe_float(product.get('ty_price', 0))
+                    cargo_cost = safe_float(cost_data.get('cargo_cost', 0))
+                    commission_rate = safe_float(cost_data.get('commission_rate', 0))
+                    commission_amount = sale_price * (commission_rate / 100) if commission_rate > 0 else 0
+                    withholding_rate = safe_float(cost_data.get('withholding_rate', 0))
+                    withholding_amount = sale_price * (withholding_rate / 100) if withholding_rate > 0 else 0
+                    other_rate = safe_float(cost_data.get('other_expenses_rate', 0))
+                    other_amount = sale_price * (other_rate / 100) if other_rate > 0 else 0
+                    platform_fee = safe_float(cost_data.get('platform_fee', 6.6))
+                    
+                    profit_analysis = profit_analyses.get(barcode)
+                    
+                    # Hesaplanmış değerleri ekle
+                    calculated_values = {
+                        'production_total': production_total,
+                        'cargo_cost': cargo_cost,
+                        'commission_amount': commission_amount,
+                        'withholding_amount': withholding_amount,
+                        'other_amount': other_amount,
+                        'platform_fee': platform_fee
+                    }
+                    
+                    product_copy = product.copy()
+                    product_copy['cost_data'] = cost_data
+                    product_copy['calculated'] = calculated_values
+                    product_copy['profit_analysis'] = profit_analysis
+                    
+                    products_with_costs.append(product_copy)
+                    
+                except Exception as product_error:
+                    print(f"Ürün işleme hatası {barcode}: {product_error}")
+                    # Hatalı ürünü de ekle ama boş değerlerle
+                    product_copy = product.copy()
+                    product_copy['cost_data'] = {}
+                    product_copy['calculated'] = {
+                        'production_total': 0,
+                        'cargo_cost': 0,
+                        'commission_amount': 0,
+                        'withholding_amount': 0,
+                        'other_amount': 0,
+                        'platform_fee': 6.6
+                    }
+                    product_copy['profit_analysis'] = None
+                    products_with_costs.append(product_copy)
+            
+            return render_template('costs.html', 
+                                 products=products_with_costs,
+                                 cache_empty=False,
+                                 last_updated=last_updated)
+        else:
+            return render_template('costs.html', 
+                                 products=[], 
+                                 cache_empty=True,
+                                 last_updated=None)
+        
+    except Exception as e:
+        print(f"Costs genel hatası: {e}")
+        return render_template('costs.html', 
+                             products=[], 
+                             cache_empty=True,
+                             last_updated=None)
+
+@cost_bp.route('/cost_detail/<barcode>')
+@login_required
+def cost_detail(barcode):
+    """Ürün Maliyet Detay Sayfası"""
+    try:
+        # Cache'den barkoda göre ürünü bul
+        product = find_cached_product(barcode)
+        
+        if not product:
+            flash('Ürün bulunamadı!', 'error')
+            return redirect(url_for('cost.costs'))
+        
+        # Maliyet verilerini al
+        cost_data = get_product_cost_data(barcode)
+        
+        # Kar analizi (önbellekli)
+        sale_price = float(product.get('ty_price', 0))
+        profit_analysis = get_profit_analysis(barcode, sale_price)
+        
+        return render_template('cost_detail.html',
+                             product=product,
+                             cost_data=cost_data,
+                             profit_analysis=profit_analysis)
+        
+    except Exception as e:
+        logging.error(f"Maliyet detay sayfası hatası: {str(e)}")
+        flash('Ürün detay verileri yüklenirken hata oluştu!', 'error')
+        return redirect(url_for('cost.costs'))
+
+@cost_bp.route('/save_cost_data', methods=['POST'])
+@login_required
+def save_cost_data():
+    """Maliyet Verilerini Kaydet"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'barcode' not in data:
+            return jsonify({'error': 'Geçersiz istek verisi'}), 400
+        
+        barcode = data['barcode']
+        cost_data = data.get('cost_data', {})
+        
+        if not barcode:
+            return jsonify({'error': 'Barkod gerekli'}), 400
+        
+        if save_product_cost_data(barcode, cost_data):
+            sale_price = float(cost_data.get('sale_price', 0))
+            profit_analysis = get_profit_analysis(barcode, sale_price)
+            refresh_dashboard_summary_async()
+            
+
+            # Excel'e kayıt yap
+            try:
+                # Ürün bilgisini cache'den al
+                cached_product = find_cached_product(barcode)
+                product_title = cached_product.get('title', '') if cached_product else None
+        
+                # Excel'e kaydet
+                log_cost_data_change(barcode, product_title, session['username'], cost_data, profit_analysis)
+            except Exception as e:
+                logging.error(f"Excel kayıt hatası: {str(e)}")
+                # Excel hatası olsa bile ana fonksiyonu bozmasın
+
+
+            return jsonify({
+                'message': 'Maliyet verileri başarıyla kaydedildi',
+                'profit_analysis': profit_analysis
+            })
+        else:
+            return jsonify({'error': 'Maliyet verileri kaydedilemedi'}), 500
+            
+    except Exception as e:
+        logging.error(f"Maliyet verisi kayıt hatası: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def push_sale_prices(items):
+    """Toplu fiyat listesini Trendyol'a parçalar halinde gönder
+
+    items: [{'barcode', 'listPrice', 'salePrice'}]; (batchRequestId listesi, hatalar,
+    journal_submit sonucu) döner. Değişiklik günlüğünden geçer: zaten gönderilmiş
+    aynı fiyatlar tekrar gönderilmez.
+    Trendyol devresi açılırsa kalan parçalar bekleyen duruma döner ve
+    circuit_breaker.CircuitOpenError çağırana iletilir.
+    """
+    claimed, results = journal_submit(ty_inventory_changes(items))
+    batch_ids = []
+    errors = []
+    for start in range(0, len(claimed), TRENDYOL_PRICE_BATCH_SIZE):
+        try:
+            response = send_ty_inventory(claimed[start:start + TRENDYOL_PRICE_BATCH_SIZE], timeout=60)
+        except circuit_breaker.CircuitOpenError as e:
+            change_journal.release([item['id'] for item in claimed[start:]], str(e))
+            raise
+        if response.status_code == 200:
+            batch_ids.append(response.json().get('batchRequestId'))
+        else:
+            errors.append({'offset': start, 'status': response.status_code, 'details': response.text[:500]})
+    return batch_ids, errors, (claimed, results)
+
+@cost_bp.route('/update_sale_price', methods=['POST'])
+@login_required
+def update_sale_price():
+    """Yeni Satış Fiyatını Trendyol'a Gönder
+
+    Tek ürün için {'barcode', 'new_price'}, toplu gönderim için
+    /repricing/simulate çıktısındaki {'items': price_push_items} kabul edilir.
+    """
+    try:
+        data = request.get_json()
+        
+        if data and isinstance(data.get('items'), list):
+            items = []
+            for item in data['items']:
+                try:
+                    price = float(item.get('salePrice'))
+                except (TypeError, ValueError, AttributeError):
+                    return jsonify({'error': 'Geçersiz fiyat satırı', 'item': item}), 400
+                if not item.get('barcode') or price <= 0:
+                    return jsonify({'error': 'Her satırda barkod ve 0\'dan büyük fiyat gerekli', 'item': item}), 400
+                items.append({'barcode': item['barcode'],
+                              'listPrice': float(item.get('listPrice') or price),
+                              'salePrice': price})
+            if not items:
+                return jsonify({'error': 'Gönderilecek fiyat yok'}), 400
+            batch_ids, errors, submitted = push_sale_prices(items)
+            result = journal_add_unsent({
+                'message': f'✅ {len(submitted[0])} ürünün fiyatı gönderildi',
+                'item_count': len(items),
+                'batch_request_ids': batch_ids
+            }, *submitted)
+            if errors:
+                result['error'] = f'{len(errors)} parça gönderilemedi'
+                result['errors'] = errors
+                return jsonify(result), 502
+            return jsonify(result)
+        
+        if not data or 'barcode' not in data or 'new_price' not in data:
+            return jsonify({'error': 'Barkod ve yeni fiyat gerekli'}), 400
+        
+        barcode = data['barcode']
+        new_price = float(data['new_price'])
+        
+        if new_price <= 0:
+            return jsonify({'error': 'Fiyat 0\'dan büyük olmalı'}), 400
+        
+        claimed, results = journal_submit(ty_inventory_changes(
+            [{'barcode': barcode, 'listPrice': new_price, 'salePrice': new_price}]))
+        if not claimed:
+            return jsonify(journal_unsent_response(results))
+        response = send_ty_inventory(claimed)
+        
+        if response.status_code == 200:
+            return jsonify({
+                'message': f'✅ Fiyat güncellendi: {barcode} → {new_price}₺',
+                'barcode': barcode,
+                'new_price': new_price
+            })
+        else:
+            return jsonify({
+                'error': f'Trendyol API hatası: {response.status_code}',
+                'details': response.text
+            }), 500
+            
+    except circuit_breaker.CircuitOpenError as e:
+        return circuit_open_response(e)
+    except Exception as e:
+        logging.error(f"Fiyat güncelleme hatası: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@cost_bp.route('/repricing/simulate', methods=['POST'])
+@login_required
+def repricing_simulate():
+    """Tüm katalog için başabaş/hedef marj fiyatları ve senaryo taraması
+
+    Gövde: target_margin (%), commission_deltas (yüzde puan listesi),
+    cargo_deltas (TL listesi), barcodes (opsiyonel filtre), format=csv.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        target_margin = float(data.get('target_margin', 25))
+        commission_deltas = [float(v) for v in data.get('commission_deltas') or [0]]
+        cargo_deltas = [float(v) for v in data.get('cargo_deltas') or [0]]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Geçersiz senaryo parametresi'}), 400
+    if len(commission_deltas) * len(cargo_deltas) > 100:
+        return jsonify({'error': 'En fazla 100 senaryo çalıştırılabilir'}), 400
+    
+    import repricing  # numpy ilk simülasyonda yüklenir
+    
+    started = time.perf_counter()
+    products, _ = load_products_cache()
+    if data.get('barcodes'):
+        wanted = set(data['barcodes'])
+        products = [product for product in products if product.get('barcode') in wanted]
+    
+    with metrics.timed('repricing_seconds'):
+        arrays = repricing.CostArrays(products, get_all_costs())
+        base = repricing.solve(arrays, target_margin)
+        rows = repricing.price_table(arrays, base)
+        scenarios = repricing.sweep(arrays, target_margin, commission_deltas, cargo_deltas)
+    
+    if data.get('format') == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0].keys()) if rows else ['barcode'])
+        writer.writeheader()
+        writer.writerows(rows)
+        return Response(buffer.getvalue(), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename=fiyat_simulasyonu_{target_margin:g}.csv'})
+    
+    return jsonify({
+        'target_margin': target_margin,
+        'product_count': len(arrays),
+        'scenarios': scenarios,
+        'items': rows,
+        'price_push_items': repricing.to_price_push_items(rows),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    })
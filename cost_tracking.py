@@ -1,198 +1,172 @@
 """
 Cost Tracking Module
-Maliyet verilerindeki değişiklikleri Excel'e kaydetme
+Maliyet verilerindeki değişiklikleri kaydetme
+
+Her değişiklik yıllık bir JSON Lines günlüğüne tek satır olarak eklenir
+(dosyayı açıp yeniden yazmak gerekmez). Excel raporu istenildiğinde
+exports modülüyle bu günlükten (ve eski yıllık Excel'den) akıtılarak
+üretilir.
 """
 
+import json
 import os
-import pandas as pd
 from datetime import datetime
 import logging
-import pytz
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+
+import metrics
+import storage
+
+
+COST_AUDIT_COLUMNS = [
+    # Temel bilgiler
+    "Tarih-Saat", "Kullanıcı", "Barkod", "Ürün Adı", "Satış Fiyatı",
+    
+    # Üretim giderleri (20 satır)
+    "Üretim_1_İsim", "Üretim_1_Tutar",
+    "Üretim_2_İsim", "Üretim_2_Tutar",
+    "Üretim_3_İsim", "Üretim_3_Tutar",
+    "Üretim_4_İsim", "Üretim_4_Tutar",
+    "Üretim_5_İsim", "Üretim_5_Tutar",
+    "Üretim_6_İsim", "Üretim_6_Tutar",
+    "Üretim_7_İsim", "Üretim_7_Tutar",
+    "Üretim_8_İsim", "Üretim_8_Tutar",
+    "Üretim_9_İsim", "Üretim_9_Tutar",
+    "Üretim_10_İsim", "Üretim_10_Tutar",
+    "Üretim_11_İsim", "Üretim_11_Tutar",
+    "Üretim_12_İsim", "Üretim_12_Tutar",
+    "Üretim_13_İsim", "Üretim_13_Tutar",
+    "Üretim_14_İsim", "Üretim_14_Tutar",
+    "Üretim_15_İsim", "Üretim_15_Tutar",
+    "Üretim_16_İsim", "Üretim_16_Tutar",
+    "Üretim_17_İsim", "Üretim_17_Tutar",
+    "Üretim_18_İsim", "Üretim_18_Tutar",
+    "Üretim_19_İsim", "Üretim_19_Tutar",
+    "Üretim_20_İsim", "Üretim_20_Tutar",
+    
+    # Üretim toplam KDV
+    "Üretim_Toplam_KDV",
+    
+    # Diğer giderler ve hesaplamalar
+    "Kargo_Ücreti", "Kargo_KDV", 
+    "Komisyon_Tutarı", "Komisyon_KDV",
+    "Stopaj_Tutarı", "Platform_Bedeli", "Diğer_Gider_Tutarı",
+    "Hesaplanan_KDV", "Toplam_Giderler", "Net_KDV_Yükümlülüğü", 
+    "Kar_Tutarı", "Kar_Oranı"
+]
 
 
-def get_yearly_excel_filename():
-    """Yıllık Excel dosya adını döndür"""
-    current_year = datetime.now().year
-    return f"cost_changes_{current_year}.xlsx"
+def get_yearly_excel_filename(year=None):
+    """Yıllık (eski biçim) Excel dosya adını döndür"""
+    year = year or datetime.now().year
+    return f"cost_changes_{year}.xlsx"
+
+
+def get_cost_audit_log_filename(year=None):
+    """Yıllık maliyet değişiklik günlüğü dosya adını döndür"""
+    year = year or datetime.now().year
+    return f"cost_changes_{year}.jsonl"
 
 
 def get_current_turkey_time():
     """Türkiye saatini döndür"""
+    import pytz
     turkey_tz = pytz.timezone('Europe/Istanbul')
     now = datetime.now(turkey_tz)
     return now.strftime("%d.%m.%Y %H:%M:%S")
 
 
-def create_cost_tracking_excel():
-    """Excel dosyası yoksa oluştur ve başlıkları ekle"""
-    filename = get_yearly_excel_filename()
+def _number(value, default=0.0):
+    if value == '' or value is None:
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def build_cost_change_row(barcode, product_title, username, cost_data, profit_analysis):
+    """Değişikliği COST_AUDIT_COLUMNS sırasında satıra çevir"""
+    turkey_time = get_current_turkey_time()
+    sale_price = _number(cost_data.get('sale_price'))
     
-    if os.path.exists(filename):
-        return filename
+    # Satırda yazılacak veriler
+    row_data = [
+        turkey_time,
+        username,
+        barcode,
+        product_title[:50] if product_title else '',  # Başlığı kısalt
+        sale_price
+    ]
     
-    try:
-        # Yeni workbook oluştur
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Maliyet Değişiklikleri"
-        
-        # Başlık satırı oluştur
-        headers = [
-            # Temel bilgiler
-            "Tarih-Saat", "Kullanıcı", "Barkod", "Ürün Adı", "Satış Fiyatı",
-            
-            # Üretim giderleri (20 satır)
-            "Üretim_1_İsim", "Üretim_1_Tutar",
-            "Üretim_2_İsim", "Üretim_2_Tutar",
-            "Üretim_3_İsim", "Üretim_3_Tutar",
-            "Üretim_4_İsim", "Üretim_4_Tutar",
-            "Üretim_5_İsim", "Üretim_5_Tutar",
-            "Üretim_6_İsim", "Üretim_6_Tutar",
-            "Üretim_7_İsim", "Üretim_7_Tutar",
-            "Üretim_8_İsim", "Üretim_8_Tutar",
-            "Üretim_9_İsim", "Üretim_9_Tutar",
-            "Üretim_10_İsim", "Üretim_10_Tutar",
-            "Üretim_11_İsim", "Üretim_11_Tutar",
-            "Üretim_12_İsim", "Üretim_12_Tutar",
-            "Üretim_13_İsim", "Üretim_13_Tutar",
-            "Üretim_14_İsim", "Üretim_14_Tutar",
-            "Üretim_15_İsim", "Üretim_15_Tutar",
-            "Üretim_16_İsim", "Üretim_16_Tutar",
-            "Üretim_17_İsim", "Üretim_17_Tutar",
-            "Üretim_18_İsim", "Üretim_18_Tutar",
-            "Üretim_19_İsim", "Üretim_19_Tutar",
-            "Üretim_20_İsim", "Üretim_20_Tutar",
-            
-            # Üretim toplam KDV
-            "Üretim_Toplam_KDV",
-            
-            # Diğer giderler ve hesaplamalar
-            "Kargo_Ücreti", "Kargo_KDV", 
-            "Komisyon_Tutarı", "Komisyon_KDV",
-            "Stopaj_Tutarı", "Platform_Bedeli", "Diğer_Gider_Tutarı",
-            "Hesaplanan_KDV", "Toplam_Giderler", "Net_KDV_Yükümlülüğü", 
-            "Kar_Tutarı", "Kar_Oranı"
-        ]
-        
-        # Başlıkları ekle
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Sütun genişliklerini ayarla
-        ws.column_dimensions['A'].width = 18  # Tarih-Saat
-        ws.column_dimensions['B'].width = 12  # Kullanıcı
-        ws.column_dimensions['C'].width = 15  # Barkod
-        ws.column_dimensions['D'].width = 25  # Ürün Adı
-        
-        # Diğer sütunlar için genel genişlik
-        for col in range(5, len(headers) + 1):
-            ws.column_dimensions[ws.cell(row=1, column=col).column_letter].width = 12
-        
-        # Dosyayı kaydet
-        wb.save(filename)
-        logging.info(f"Yeni maliyet takip Excel dosyası oluşturuldu: {filename}")
-        
-        return filename
-        
-    except Exception as e:
-        logging.error(f"Excel dosyası oluşturma hatası: {str(e)}")
-        return None
+    # Üretim giderleri (20 satır)
+    production_costs = cost_data.get('production_costs') or []
+    production_total_vat = 0  # Üretim toplam KDV
+    
+    for i in range(20):
+        if i < len(production_costs):
+            cost_item = production_costs[i]
+            amount = _number(cost_item.get('amount'))
+            production_total_vat += amount * 0.2  # KDV topla
+            row_data.extend([
+                cost_item.get('name', ''),
+                amount
+            ])
+        else:
+            row_data.extend(['', 0])  # Boş satırlar
+    
+    # Üretim toplam KDV'yi ekle
+    row_data.append(production_total_vat)
+    
+    # Diğer giderler ve hesaplamalar
+    cargo_cost = _number(cost_data.get('cargo_cost'))
+    cargo_vat = cargo_cost - (cargo_cost / 1.2) if cargo_cost > 0 else 0
+    
+    commission_rate = _number(cost_data.get('commission_rate'))
+    commission_amount = sale_price * (commission_rate / 100) if commission_rate > 0 else 0
+    commission_vat = commission_amount - (commission_amount / 1.2) if commission_amount > 0 else 0
+    
+    withholding_rate = _number(cost_data.get('withholding_rate'))
+    withholding_amount = sale_price * (withholding_rate / 100) if withholding_rate > 0 else 0
+    
+    other_rate = _number(cost_data.get('other_expenses_rate'))
+    other_amount = sale_price * (other_rate / 100) if other_rate > 0 else 0
+    
+    platform_fee = _number(cost_data.get('platform_fee'), 6.6)
+    calculated_vat = sale_price * 0.2
+    
+    # Profit analysis verilerini al
+    if profit_analysis:
+        total_expenses = profit_analysis.get('total_expenses', 0)
+        net_vat = profit_analysis.get('net_vat', 0)
+        profit_amount = profit_analysis.get('profit_amount', 0)
+        profit_rate = profit_analysis.get('profit_rate', 0)
+    else:
+        total_expenses = net_vat = profit_amount = profit_rate = 0
+    
+    # Diğer verileri ekle
+    row_data.extend([
+        cargo_cost, cargo_vat,
+        commission_amount, commission_vat,
+        withholding_amount, platform_fee, other_amount,
+        calculated_vat, total_expenses, net_vat,
+        profit_amount, profit_rate
+    ])
+    return row_data
 
 
+@metrics.timed('excel_write_seconds', file='cost_changes')
 def log_cost_data_change(barcode, product_title, username, cost_data, profit_analysis):
-    """Maliyet verisi değişikliğini Excel'e kaydet"""
+    """Maliyet verisi değişikliğini yıllık günlüğe ekle"""
     try:
-        filename = create_cost_tracking_excel()
-        if not filename:
-            return False
-        
-        # Mevcut Excel'i aç
-        wb = load_workbook(filename)
-        ws = wb.active
-        
-        # Yeni satır numarasını bul
-        next_row = ws.max_row + 1
-        
-        # Temel bilgiler
-        turkey_time = get_current_turkey_time()
-        sale_price = float(cost_data.get('sale_price', 0))
-        
-        # Satırda yazılacak veriler
-        row_data = [
-            turkey_time,
-            username,
-            barcode,
-            product_title[:50] if product_title else '',  # Başlığı kısalt
-            sale_price
-        ]
-        
-        # Üretim giderleri (20 satır)
-        production_costs = cost_data.get('production_costs', [])
-        production_total_vat = 0  # Üretim toplam KDV
-        
-        for i in range(20):
-            if i < len(production_costs):
-                cost_item = production_costs[i]
-                amount = float(cost_item.get('amount', 0))
-                production_total_vat += amount * 0.2  # KDV topla
-                row_data.extend([
-                    cost_item.get('name', ''),
-                    amount
-                ])
-            else:
-                row_data.extend(['', 0])  # Boş satırlar
-        
-        # Üretim toplam KDV'yi ekle
-        row_data.append(production_total_vat)
-        
-        # Diğer giderler ve hesaplamalar
-        cargo_cost = float(cost_data.get('cargo_cost', 0))
-        cargo_vat = cargo_cost - (cargo_cost / 1.2) if cargo_cost > 0 else 0
-        
-        commission_rate = float(cost_data.get('commission_rate', 0))
-        commission_amount = sale_price * (commission_rate / 100) if commission_rate > 0 else 0
-        commission_vat = commission_amount - (commission_amount / 1.2) if commission_amount > 0 else 0
-        
-        withholding_rate = float(cost_data.get('withholding_rate', 0))
-        withholding_amount = sale_price * (withholding_rate / 100) if withholding_rate > 0 else 0
-        
-        other_rate = float(cost_data.get('other_expenses_rate', 0))
-        other_amount = sale_price * (other_rate / 100) if other_rate > 0 else 0
-        
-        platform_fee = float(cost_data.get('platform_fee', 6.6))
-        calculated_vat = sale_price * 0.2
-        
-        # Profit analysis verilerini al
-        if profit_analysis:
-            total_expenses = profit_analysis.get('total_expenses', 0)
-            net_vat = profit_analysis.get('net_vat', 0)
-            profit_amount = profit_analysis.get('profit_amount', 0)
-            profit_rate = profit_analysis.get('profit_rate', 0)
-        else:
-            total_expenses = net_vat = profit_amount = profit_rate = 0
-        
-        # Diğer verileri ekle
-        row_data.extend([
-            cargo_cost, cargo_vat,
-            commission_amount, commission_vat,
-            withholding_amount, platform_fee, other_amount,
-            calculated_vat, total_expenses, net_vat,
-            profit_amount, profit_rate
-        ])
-        
-        # Satırı Excel'e yaz
-        for col, value in enumerate(row_data, 1):
-            ws.cell(row=next_row, column=col, value=value)
-        
-        # Dosyayı kaydet
-        wb.save(filename)
+        row_data = build_cost_change_row(barcode, product_title, username, cost_data, profit_analysis)
+        filename = get_cost_audit_log_filename()
+        line = json.dumps(row_data, ensure_ascii=False) + '\n'
+        with storage.locked(filename):
+            with open(filename, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
         logging.info(f"Maliyet değişikliği kaydedildi: {barcode} - {username}")
-        
         return True
         
     except Exception as e:
@@ -200,31 +174,52 @@ def log_cost_data_change(barcode, product_title, username, cost_data, profit_ana
         return False
 
 
+def iter_cost_change_rows(year=None):
+    """Yılın tüm değişiklik satırlarını akıt: önce eski Excel, sonra günlük"""
+    legacy_file = get_yearly_excel_filename(year)
+    if os.path.exists(legacy_file):
+        from openpyxl import load_workbook
+        wb = load_workbook(legacy_file, read_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            next(rows, None)  # Başlık
+            for row in rows:
+                yield list(row)
+        finally:
+            wb.close()
+    
+    log_file = get_cost_audit_log_filename(year)
+    if os.path.exists(log_file):
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
 def get_cost_tracking_stats():
     """Maliyet takip istatistiklerini getir"""
     try:
-        filename = get_yearly_excel_filename()
-        if not os.path.exists(filename):
+        log_file = get_cost_audit_log_filename()
+        legacy_file = get_yearly_excel_filename()
+        files = [name for name in (legacy_file, log_file) if os.path.exists(name)]
+        if not files:
             return {
                 'exists': False,
-                'filename': filename,
+                'filename': log_file,
                 'total_records': 0,
                 'file_size_mb': 0
             }
         
         # Dosya bilgilerini al
-        file_size = os.path.getsize(filename) / (1024 * 1024)
-        
-        # Excel'i aç ve satır sayısını al
-        df = pd.read_excel(filename)
-        total_records = len(df)
+        file_size = sum(os.path.getsize(name) for name in files) / (1024 * 1024)
+        total_records = sum(1 for _ in iter_cost_change_rows())
         
         return {
             'exists': True,
-            'filename': filename,
+            'filename': log_file,
             'total_records': total_records,
             'file_size_mb': round(file_size, 2),
-            'creation_time': datetime.fromtimestamp(os.path.getctime(filename)).strftime("%d.%m.%Y %H:%M")
+            'creation_time': datetime.fromtimestamp(os.path.getctime(files[0])).strftime("%d.%m.%Y %H:%M")
         }
         
     except Exception as e:
@@ -232,4 +227,4 @@ def get_cost_tracking_stats():
         return {
             'exists': False,
             'error': str(e)
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,197 @@
+"""
+Pano Özeti Modülü
+Ürün ve maliyet verisinden panoların kullandığı toplamları tek geçişte
+hesaplar: stok toplamları, stoksuz ürünler, TY/HB stok farkları, kar
+marjı seviyeleri, kategori ve marj histogramları ve zarar eden ürünler.
+
+Özet, hesaplandığı veri sürümüyle (kaynak dosyaların mtime/boyutu)
+birlikte işlem içinde ve paylaşımlı önbellekte tutulur; sürüm değişmedikçe
+yeniden hesaplanmaz. Yenileme ve maliyet kaydı sonrası önceden hesaplanır.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+import cache_backend
+import metrics
+import singleflight
+
+SUMMARY_CACHE_KEY = 'dashboard_summary'
+# Listelerde (stok farkı, zarar eden ürünler) döndürülecek en fazla kayıt
+SUMMARY_LIST_LIMIT = 50
+# Marj histogramı sınırları (%): <0, 0-10, 10-20, 20-30, 30-50, 50+
+MARGIN_BUCKET_EDGES = (0, 10, 20, 30, 50)
+# Maliyet sayfasındaki renk eşikleri: > 20 yüksek, > 10 orta, diğerleri düşük
+MARGIN_HIGH = 20
+MARGIN_MEDIUM = 10
+UNCATEGORIZED = 'Kategorisiz'
+
+_latest = {'summary': None}
+_lock = threading.Lock()
+_flight = singleflight.Group('dashboard_summary')
+
+
+def _margin_bucket_labels():
+    labels = [f"<{MARGIN_BUCKET_EDGES[0]}"]
+    labels += [f"{low}-{high}" for low, high in zip(MARGIN_BUCKET_EDGES, MARGIN_BUCKET_EDGES[1:])]
+    labels.append(f"{MARGIN_BUCKET_EDGES[-1]}+")
+    return labels
+
+
+def _margin_bucket(rate):
+    for i, edge in enumerate(MARGIN_BUCKET_EDGES):
+        if rate < edge:
+            return i
+    return len(MARGIN_BUCKET_EDGES)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    return value if isinstance(value, (int, float)) else None
+
+
+def build_summary(products, analyses, costs):
+    """Özeti hesapla
+
+    products: slim ürün kayıtları, analyses: barkod -> kar analizi (ya da
+    None), costs: barkod -> maliyet kaydı.
+    """
+    stock = {'products': 0, 'ty_total': 0, 'hb_total': 0, 'matched': 0, 'ty_out_of_stock': 0,
+             'hb_out_of_stock': 0, 'mismatch_count': 0, 'mismatch_units': 0}
+    profit = {'analysed': 0, 'with_costs': 0, 'profit_sum': 0.0, 'margin_sum': 0.0,
+              'negative_count': 0, 'levels': {'high': 0, 'medium': 0, 'low': 0}}
+    margin_counts = [0] * (len(MARGIN_BUCKET_EDGES) + 1)
+    categories = {}
+    mismatches = []
+    negative = []
+
+    for product in products:
+        barcode = product.get('barcode', '')
+        ty_stock = _number(product.get('quantity')) or 0
+        hb_stock = _number(product.get('hb_stock'))
+        matched = bool(product.get('hb_sku'))
+        category = categories.setdefault(product.get('category') or UNCATEGORIZED, {
+            'products': 0, 'ty_stock': 0, 'hb_stock': 0, 'out_of_stock': 0,
+            'analysed': 0, 'margin_sum': 0.0, 'negative_profit': 0})
+
+        stock['products'] += 1
+        stock['ty_total'] += ty_stock
+        category['products'] += 1
+        category['ty_stock'] += ty_stock
+        if ty_stock <= 0:
+            stock['ty_out_of_stock'] += 1
+            category['out_of_stock'] += 1
+        if hb_stock is not None:
+            stock['hb_total'] += hb_stock
+            category['hb_stock'] += hb_stock
+        if matched:
+            stock['matched'] += 1
+            if hb_stock is not None:
+                if hb_stock <= 0:
+                    stock['hb_out_of_stock'] += 1
+                if hb_stock != ty_stock:
+                    stock['mismatch_count'] += 1
+                    stock['mismatch_units'] += abs(hb_stock - ty_stock)
+                    mismatches.append({'barcode': barcode, 'hb_sku': product['hb_sku'],
+                                       'ty_stock': ty_stock, 'hb_stock': hb_stock,
+                                       'difference': hb_stock - ty_stock})
+
+        if barcode in costs:
+            profit['with_costs'] += 1
+        analysis = analyses.get(barcode)
+        if not analysis:
+            continue
+        rate = analysis.get('profit_rate') or 0.0
+        amount = analysis.get('profit_amount') or 0.0
+        profit['analysed'] += 1
+        profit['profit_sum'] += amount
+        profit['margin_sum'] += rate
+        category['analysed'] += 1
+        category['margin_sum'] += rate
+        margin_counts[_margin_bucket(rate)] += 1
+        if rate > MARGIN_HIGH:
+            profit['levels']['high'] += 1
+        elif rate > MARGIN_MEDIUM:
+            profit['levels']['medium'] += 1
+        else:
+            profit['levels']['low'] += 1
+        if amount < 0:
+            profit['negative_count'] += 1
+            category['negative_profit'] += 1
+            negative.append({'barcode': barcode, 'title': product.get('title', ''),
+                             'sale_price': product.get('ty_price', 0.0),
+                             'profit_amount': round(amount, 2), 'profit_rate': round(rate, 1)})
+
+    mismatches.sort(key=lambda item: abs(item['difference']), reverse=True)
+    negative.sort(key=lambda item: item['profit_amount'])
+    margin_sum = profit.pop('margin_sum')
+    profit['profit_sum'] = round(profit['profit_sum'], 2)
+    profit['avg_margin'] = round(margin_sum / profit['analysed'], 1) if profit['analysed'] else None
+
+    category_rows = []
+    for name, row in categories.items():
+        category_margin = row.pop('margin_sum')
+        row['avg_margin'] = round(category_margin / row['analysed'], 1) if row['analysed'] else None
+        category_rows.append(dict(row, category=name))
+    category_rows.sort(key=lambda row: row['products'], reverse=True)
+
+    return {
+        'stock': stock,
+        'profit': profit,
+        'margin_histogram': [{'range': label, 'count': count}
+                             for label, count in zip(_margin_bucket_labels(), margin_counts)],
+        'categories': category_rows,
+        'stock_mismatches': mismatches[:SUMMARY_LIST_LIMIT],
+        'negative_profit': negative[:SUMMARY_LIST_LIMIT]
+    }
+
+
+def version_key(version):
+    """response_cache.data_version çıktısından karşılaştırılabilir anahtar (None: bekleyen yazma)"""
+    return None if version is None else '|'.join(version)
+
+
+def _compute(key, build):
+    started = time.perf_counter()
+    summary = build()
+    elapsed = time.perf_counter() - started
+    metrics.observe('dashboard_summary_build_seconds', elapsed)
+    summary.update(data_version=key, generated_at=datetime.now().isoformat(timespec='seconds'),
+                   build_seconds=round(elapsed, 3))
+    if key is not None:
+        with _lock:
+            _latest['summary'] = summary
+        try:
+            cache_backend.get_shared_cache().set(SUMMARY_CACHE_KEY, summary)
+        except Exception as e:
+            logging.warning(f"Pano özeti paylaşılamadı: {e}")
+    return summary
+
+
+def get_summary(version, build):
+    """Veri sürümüne ait özeti döndür; yoksa build() ile hesapla
+
+    Aynı sürüm için eşzamanlı istekler tek bir hesaplamayı paylaşır. version
+    None ise (bekleyen yazma var) hesaplanan özet saklanmaz.
+    """
+    key = version_key(version)
+    if key is not None:
+        summary = _latest['summary']
+        if summary is not None and summary['data_version'] == key:
+            metrics.inc('dashboard_summary_total', result='hit')
+            return summary
+        try:
+            summary = cache_backend.get_shared_cache().get(SUMMARY_CACHE_KEY)
+        except Exception as e:
+            logging.warning(f"Pano özeti okunamadı: {e}")
+            summary = None
+        if summary is not None and summary.get('data_version') == key:
+            with _lock:
+                _latest['summary'] = summary
+            metrics.inc('dashboard_summary_total', result='shared')
+            return summary
+    metrics.inc('dashboard_summary_total', result='build')
+    return _flight.do(key, _compute, key, build)
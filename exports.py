@@ -0,0 +1,95 @@
+"""
+Dışa Aktarım Modülü
+Satır üreten kaynaklardan (generator) sabit bellekle CSV veya write-only
+Excel üretir ve parça parça (chunked) indirilecek şekilde akıtır
+"""
+
+import csv
+import io
+import logging
+import os
+import tempfile
+
+import metrics
+
+# İndirme sırasında gönderilecek parça boyutu
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+HEADER_FONT_COLOR = "FFFFFF"
+HEADER_FILL_COLOR = "366092"
+
+
+def iter_csv(columns, rows, report='export'):
+    """CSV baytlarını EXPORT_CHUNK_BYTES'lık parçalar halinde üret"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # Excel'in UTF-8'i tanıması için BOM
+    buffer.write('﻿')
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+    metrics.inc('export_rows_total', count, report=report, format='csv')
+
+
+def iter_xlsx(columns, rows, sheet_title='Rapor', report='export'):
+    """Write-only kitaba satırları yazıp dosyayı parça parça üret
+
+    openpyxl write-only modu hücreleri bellekte tutmaz; xlsx bir zip
+    olduğu için gövde, kitap tamamen yazıldıktan sonra akmaya başlar.
+    openpyxl ilk Excel dışa aktarımında yüklenir.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+
+    fd, temp_path = tempfile.mkstemp(prefix='export_', suffix='.xlsx')
+    os.close(fd)
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_title)
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(ws, value=column)
+            cell.font = Font(bold=True, color=HEADER_FONT_COLOR)
+            cell.fill = PatternFill(start_color=HEADER_FILL_COLOR, end_color=HEADER_FILL_COLOR, fill_type="solid")
+            header.append(cell)
+        ws.append(header)
+        count = 0
+        for row in rows:
+            ws.append(list(row))
+            count += 1
+        wb.save(temp_path)
+        metrics.inc('export_rows_total', count, report=report, format='xlsx')
+
+        with open(temp_path, 'rb') as f:
+            while True:
+                chunk = f.read(EXPORT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        try:
+            os.remove(temp_path)
+        except OSError as e:
+            logging.warning(f"Geçici dışa aktarım dosyası silinemedi {temp_path}: {e}")
+
+
+def iter_export(fmt, columns, rows, sheet_title='Rapor', report='export'):
+    """fmt'ye göre (csv | xlsx) gövde parçalarını üret"""
+    if fmt == 'csv':
+        return iter_csv(columns, rows, report=report)
+    if fmt == 'xlsx':
+        return iter_xlsx(columns, rows, sheet_title=sheet_title, report=report)
+    raise ValueError(f"Desteklenmeyen format: {fmt}")
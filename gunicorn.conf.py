@@ -0,0 +1,26 @@
+"""
+Gunicorn Ayarları
+Her worker uygulamayı fork sonrası kendisi yükler (preload yok), böylece
+arka plan thread'leri (zamanlayıcı, profil örnekleyici) her işlemde ayrı
+başlar. Paylaşılan durum dosya kilitleri ve SQLite üzerinden tutulur.
+"""
+
+import multiprocessing
+import os
+
+# Worker'lar arası paylaşılması gereken depolar
+os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5002')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+# Her açık SSE ilerleme akışı (/jobs/<id>/events) iş bitene kadar bir thread
+# tutar; birkaç sekme yenilemeyi izlerken diğer isteklere thread kalsın diye
+# sayı yüksek tutulur. Thread'ler çoğunlukla G/Ç bekler.
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+# Tam veri yenileme (TY + HB) birkaç dakika sürebilir
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 300))
+graceful_timeout = 30
+preload_app = False
+accesslog = "-"
+errorlog = "-"
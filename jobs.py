@@ -0,0 +1,309 @@
+"""
+Arka Plan İş Modülü
+Uzun süren işleri (veri yenileme, toplu güncelleme, izleme) thread'de
+çalıştırır; aşama, sayaç ve tahmini kalan süreyi tutar ve Server-Sent
+Events olarak yayınlar. Anlık görüntüler paylaşımlı önbelleğe de yazılır,
+böylece isteği başka bir worker karşılasa bile ilerleme izlenebilir.
+"""
+
+import json
+import logging
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import cache_backend
+import metrics
+
+# Hafızada tutulacak bitmiş iş sayısı
+JOBS_KEEP_LAST = 50
+# Paylaşımlı önbellekteki anlık görüntünün ömrü (saniye)
+JOB_SNAPSHOT_TTL = 3600
+# İlerleme güncellemeleri en fazla bu aralıkla paylaşımlı önbelleğe yazılır
+PUBLISH_INTERVAL_SECONDS = 0.5
+# Olay olmasa da bu aralıkla SSE yorum satırı gönderilir (proxy zaman aşımı)
+SSE_HEARTBEAT_SECONDS = 15
+
+FINISHED_STATUSES = ('done', 'error')
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+class Job:
+    """Tek bir arka plan işinin ilerleme durumu"""
+
+    def __init__(self, kind, stages, owner=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = 'queued'
+        self.stages = OrderedDict(
+            (name, {'status': 'pending', 'done': 0, 'total': None, 'started': None, 'finished': None})
+            for name in stages
+        )
+        self.current_stage = None
+        self.created_at = datetime.now().isoformat(timespec='seconds')
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.version = 0
+        self._changed = threading.Condition()
+        self._published_at = 0.0
+
+    # --- İş fonksiyonunun kullandığı API
+    def stage(self, name, total=None):
+        """Yeni aşamaya geç; önceki aşama tamamlanmış sayılır"""
+        now = time.time()
+        with self._changed:
+            if self.current_stage is not None:
+                self._finish_stage(self.current_stage, now)
+            stage = self.stages.setdefault(name, {'status': 'pending', 'done': 0, 'total': None,
+                                                  'started': None, 'finished': None})
+            stage.update(status='running', started=now, total=total)
+            self.current_stage = name
+        self._notify(force=True)
+
+    def set_total(self, total):
+        with self._changed:
+            if self.current_stage is not None:
+                self.stages[self.current_stage]['total'] = total
+        self._notify()
+
+    def advance(self, count=1):
+        with self._changed:
+            if self.current_stage is not None:
+                self.stages[self.current_stage]['done'] += count
+        self._notify()
+
+    def _finish_stage(self, name, now):
+        stage = self.stages[name]
+        stage.update(status='done', finished=now)
+
+    def _notify(self, force=False):
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+        now = time.time()
+        if force or now - self._published_at >= PUBLISH_INTERVAL_SECONDS:
+            self._published_at = now
+            _publish(self)
+
+    # --- Okuma
+    def wait(self, timeout=None):
+        """İş bitene kadar bekle; bittiyse True döner"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._changed:
+            while self.status not in FINISHED_STATUSES:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def wait_for_change(self, version, timeout):
+        with self._changed:
+            if self.version == version and self.status not in FINISHED_STATUSES:
+                self._changed.wait(timeout)
+            return self.version
+
+    def to_dict(self):
+        now = time.time()
+        with self._changed:
+            stages = []
+            for name, stage in self.stages.items():
+                item = {'name': name, 'status': stage['status'], 'done': stage['done'], 'total': stage['total']}
+                if stage['started']:
+                    item['elapsed_seconds'] = round((stage['finished'] or now) - stage['started'], 1)
+                stages.append(item)
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'stage': self.current_stage,
+                'stages': stages,
+                'eta_seconds': self._eta(now),
+                'created_at': self.created_at,
+                'elapsed_seconds': round((self.finished or now) - self.started, 1) if self.started else 0,
+                'result': self.result,
+                'error': self.error,
+                'version': self.version
+            }
+
+    def _eta(self, now):
+        """Mevcut aşamanın kalan süresi (toplam biliniyorsa)"""
+        if self.status != 'running' or self.current_stage is None:
+            return None
+        stage = self.stages[self.current_stage]
+        if not stage['total'] or not stage['done'] or not stage['started']:
+            return None
+        rate = stage['done'] / max(now - stage['started'], 1e-6)
+        return round(max(stage['total'] - stage['done'], 0) / rate, 1)
+
+    def _run(self, func):
+        self.started = time.time()
+        self.status = 'running'
+        self._notify(force=True)
+        try:
+            with metrics.timed('job_seconds', kind=self.kind):
+                result = func(self)
+            if isinstance(result, dict) and 'error' in result:
+                self.error = result['error']
+                self.status = 'error'
+            else:
+                self.status = 'done'
+            self.result = result
+        except Exception as e:
+            logging.error(f"Arka plan işi hatası ({self.kind}): {e}\n{traceback.format_exc()}")
+            self.error = str(e)
+            self.status = 'error'
+        with self._changed:
+            if self.current_stage is not None:
+                self._finish_stage(self.current_stage, time.time())
+            self.finished = time.time()
+        metrics.inc('jobs_total', kind=self.kind, status=self.status)
+        self._notify(force=True)
+
+
+class _NullJob:
+    """İş dışında çağrılan fonksiyonlar için ilerleme kaydetmeyen yer tutucu"""
+
+    def stage(self, name, total=None):
+        pass
+
+    def set_total(self, total):
+        pass
+
+    def advance(self, count=1):
+        pass
+
+
+NULL_JOB = _NullJob()
+
+
+def _publish(job):
+    try:
+        cache_backend.get_shared_cache().set(f"job:{job.id}", job.to_dict(), ttl=JOB_SNAPSHOT_TTL)
+    except Exception as e:
+        logging.warning(f"İş durumu paylaşılamadı: {e}")
+
+
+def _find_running(kind):
+    for job in _jobs.values():
+        if job.kind == kind and job.status not in FINISHED_STATUSES:
+            return job
+    return None
+
+
+def find_running(kind):
+    """Bu işlemde bu türde süren iş (yoksa None)"""
+    with _jobs_lock:
+        return _find_running(kind)
+
+
+def start(kind, func, stages, owner=None, exclusive=True):
+    """func(job)'u arka planda başlat ve Job döndür
+
+    exclusive=True ise aynı türde çalışan iş varsa yenisi başlatılmaz,
+    mevcut iş döner (func çağrılmaz).
+    """
+    with _jobs_lock:
+        running = _find_running(kind) if exclusive else None
+        if running is not None:
+            return running
+        job = Job(kind, stages, owner)
+        _jobs[job.id] = job
+        finished = [job_id for job_id, item in _jobs.items() if item.status in FINISHED_STATUSES]
+        for job_id in finished[:max(len(finished) - JOBS_KEEP_LAST, 0)]:
+            del _jobs[job_id]
+    _publish(job)
+    threading.Thread(target=job._run, args=(func,), name=f"job-{kind}", daemon=True).start()
+    return job
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def get_snapshot(job_id):
+    """İşin son durumunu döndür; başka worker'daysa paylaşımlı önbellekten"""
+    job = get_job(job_id)
+    if job is not None:
+        return job.to_dict()
+    try:
+        return cache_backend.get_shared_cache().get(f"job:{job_id}")
+    except Exception as e:
+        logging.warning(f"İş durumu okunamadı: {e}")
+        return None
+
+
+def wait_for(job_id, timeout=None):
+    """İş bitene (ya da timeout dolana) kadar bekleyip son anlık görüntüyü döndür
+
+    İş başka bir worker'daysa paylaşımlı önbellek yoklanır; iş bulunamazsa None.
+    """
+    job = get_job(job_id)
+    if job is not None:
+        job.wait(timeout)
+        return job.to_dict()
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        snapshot = get_snapshot(job_id)
+        if snapshot is None or snapshot['status'] in FINISHED_STATUSES:
+            return snapshot
+        if deadline is not None and time.time() >= deadline:
+            return snapshot
+        time.sleep(PUBLISH_INTERVAL_SECONDS)
+
+
+def list_jobs(kind=None):
+    """Bu işlemdeki işleri en yeniden eskiye döndür"""
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [job.to_dict() for job in reversed(jobs) if kind is None or job.kind == kind]
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_events(job_id):
+    """SSE gövdesi üreten generator: her değişiklikte 'progress', sonunda 'end'
+
+    Akış açık kaldığı sürece (iş bitene kadar) bir gthread worker thread'ini
+    meşgul eder; gunicorn.conf.py'deki threads sayısı buna göre seçilmiştir.
+    """
+    job = get_job(job_id)
+    last_version = None
+    last_sent = time.time()
+    while True:
+        if job is not None:
+            version = job.wait_for_change(last_version if last_version is not None else -1,
+                                          SSE_HEARTBEAT_SECONDS)
+            snapshot = job.to_dict() if version != last_version else None
+        else:
+            # İş başka bir worker'da: paylaşımlı önbellekten yokla
+            time.sleep(PUBLISH_INTERVAL_SECONDS)
+            snapshot = get_snapshot(job_id)
+            if snapshot is None:
+                yield _sse('end', {'id': job_id, 'status': 'unknown'})
+                return
+            version = snapshot['version']
+            if version == last_version:
+                snapshot = None
+
+        if snapshot is not None:
+            last_version = version
+            last_sent = time.time()
+            yield _sse('progress', snapshot)
+            if snapshot['status'] in FINISHED_STATUSES:
+                yield _sse('end', snapshot)
+                return
+        elif time.time() - last_sent >= SSE_HEARTBEAT_SECONDS:
+            last_sent = time.time()
+            yield ": heartbeat\n\n"
@@ -0,0 +1,171 @@
+"""
+Eşleştirme İndeksi Modülü
+TY barkod <-> HB SKU eşleştirmelerinin iki yönlü indeksi. Yetim (HB'de
+artık olmayan SKU'ya bağlı), çift (aynı SKU'ya bağlı birden fazla barkod)
+ve eşleşmemiş ürün kümeleri her değişiklikte artımlı güncellenir; sayılar
+ve aramalar O(1)'dir.
+"""
+
+import threading
+from types import MappingProxyType
+
+import metrics
+import storage
+
+# İndeks kümeleri ve açıklamaları (/match/index?kind=...)
+INDEX_KINDS = {
+    'orphans': 'HB kataloğunda olmayan SKU\'ya eşlenmiş TY barkodları',
+    'duplicates': 'Birden fazla TY barkoduna eşlenmiş HB SKU\'ları',
+    'stale': 'Ürün cache\'inde olmayan TY barkodlarına ait eşleştirmeler',
+    'unmatched_ty': 'Eşleştirmesi olmayan TY barkodları',
+    'unmatched_hb': 'Hiçbir TY ürününe eşlenmemiş HB SKU\'ları'
+}
+
+
+def files_signature(paths):
+    """Dosyaların (mtime_ns, boyut) imzası; bekleyen yazma varsa None"""
+    signature = []
+    for path in paths:
+        if storage.is_pending(path):
+            return None
+        signature.append(storage.file_signature(path))
+    return tuple(signature)
+
+
+class MatchIndex:
+    """İki yönlü eşleştirme indeksi ve sağlık kümeleri"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.signature = None
+        self._reset()
+
+    def _reset(self):
+        self._forward = {}
+        self._reverse = {}
+        self._ty = set()
+        self._hb = set()
+        self._sets = {kind: set() for kind in INDEX_KINDS}
+
+    @property
+    def built(self):
+        return self.signature is not None
+
+    def rebuild(self, matches, ty_barcodes, hb_skus, signature=None):
+        """Tüm indeksi eşleştirmeler, TY barkodları ve HB SKU'larından kur"""
+        with self._lock, metrics.timed('match_index_rebuild_seconds'):
+            self._reset()
+            self._ty = set(ty_barcodes)
+            self._hb = set(hb_skus)
+            self._sets['unmatched_ty'] = set(self._ty)
+            self._sets['unmatched_hb'] = set(self._hb)
+            for barcode, sku in matches.items():
+                self._link(barcode, (sku or '').strip())
+            self.signature = signature
+
+    def ensure(self, signature, loader):
+        """İmza değiştiyse loader() -> (matches, ty_barcodes, hb_skus) ile yeniden kur
+
+        signature None ise (diske yazılmamış güncelleme var) mevcut indeks
+        güncel kabul edilir.
+        """
+        with self._lock:
+            if self.built and (signature is None or signature == self.signature):
+                metrics.inc('match_index_total', result='hit')
+                return self
+            metrics.inc('match_index_total', result='rebuild')
+            matches, ty_barcodes, hb_skus = loader()
+            self.rebuild(matches, ty_barcodes, hb_skus, signature or ())
+            return self
+
+    def advance_signature(self, position, previous, current):
+        """İndeksin zaten uyguladığı bir yazmadan sonra imzanın o dosyaya ait kısmını ilerlet
+
+        İndeks dosyanın yazmadan önceki haline göre kurulmuşsa (previous
+        eşleşiyorsa) yazma yüzünden yeniden kurulmaz; arada başka bir işlem
+        dosyayı değiştirdiyse imza eşleşmez ve sonraki ensure yeniden kurar.
+        """
+        with self._lock:
+            if self.signature and position < len(self.signature) and self.signature[position] == previous:
+                signature = list(self.signature)
+                signature[position] = current
+                self.signature = tuple(signature)
+
+    def apply(self, matches):
+        """save_match ile gelen {barkod: sku} değişikliklerini artımlı uygula ('' = kaldır)"""
+        with self._lock:
+            for barcode, sku in matches.items():
+                self._unlink(barcode)
+                self._link(barcode, (sku or '').strip())
+
+    def _link(self, barcode, sku):
+        if not sku:
+            if barcode in self._ty:
+                self._sets['unmatched_ty'].add(barcode)
+            return
+        self._forward[barcode] = sku
+        barcodes = self._reverse.setdefault(sku, set())
+        barcodes.add(barcode)
+        if len(barcodes) > 1:
+            self._sets['duplicates'].add(sku)
+        self._sets['unmatched_ty'].discard(barcode)
+        self._sets['unmatched_hb'].discard(sku)
+        if sku not in self._hb:
+            self._sets['orphans'].add(barcode)
+        if barcode not in self._ty:
+            self._sets['stale'].add(barcode)
+
+    def _unlink(self, barcode):
+        sku = self._forward.pop(barcode, None)
+        self._sets['orphans'].discard(barcode)
+        self._sets['stale'].discard(barcode)
+        if barcode in self._ty:
+            self._sets['unmatched_ty'].add(barcode)
+        if sku is None:
+            return
+        barcodes = self._reverse[sku]
+        barcodes.discard(barcode)
+        if len(barcodes) <= 1:
+            self._sets['duplicates'].discard(sku)
+        if not barcodes:
+            del self._reverse[sku]
+            if sku in self._hb:
+                self._sets['unmatched_hb'].add(sku)
+
+    # --- Sorgular
+    @property
+    def matches(self):
+        """Salt okunur {TY barkod: HB SKU} görünümü"""
+        return MappingProxyType(self._forward)
+
+    def sku_for(self, barcode):
+        return self._forward.get(barcode, '')
+
+    def barcodes_for(self, sku):
+        with self._lock:
+            return sorted(self._reverse.get(sku, ()))
+
+    def count(self, kind):
+        return len(self._sets[kind])
+
+    def contains(self, kind, key):
+        return key in self._sets[kind]
+
+    def items(self, kind, limit=None):
+        """Kümenin sıralı listesi (duplicates için SKU başına barkodlarıyla)"""
+        with self._lock:
+            keys = sorted(self._sets[kind])[:limit]
+            if kind == 'duplicates':
+                return [{'hb_sku': sku, 'ty_barcodes': sorted(self._reverse[sku])} for sku in keys]
+            if kind in ('orphans', 'stale'):
+                return [{'ty_barcode': barcode, 'hb_sku': self._forward[barcode]} for barcode in keys]
+            return keys
+
+    def summary(self):
+        with self._lock:
+            counts = {kind: len(values) for kind, values in self._sets.items()}
+            counts.update(matched=len(self._forward), ty_products=len(self._ty), hb_listings=len(self._hb))
+            return counts
+
+
+match_index = MatchIndex()
@@ -0,0 +1,125 @@
+"""
+Ürün Eşleştirme Sayfaları Modülü
+Trendyol-Hepsiburada eşleştirme sayfası, eşleştirme kaydı ve eşleştirme
+indeksi sağlık/arama uçları (match blueprint'i). Paylaşılan yardımcılar app
+modülünden alınır; blueprint app.py'nin sonunda kaydedilir.
+"""
+
+import logging
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, jsonify, flash
+
+from match_index import INDEX_KINDS as MATCH_INDEX_KINDS
+import response_cache
+from app import (
+    PRODUCTS_CACHE_FILE, HB_PRODUCTS_CACHE_FILE, MATCHES_FILE,
+    login_required,
+    load_products_cache, load_hb_products_cache, slim_hb_listing,
+    refresh_hb_products_cache, refresh_hb_products_cache_async,
+    refresh_hb_snapshot_if_stale, is_hb_cache_stale,
+    get_match_index, update_matches
+)
+
+match_bp = Blueprint('match', __name__)
+
+
+@match_bp.route('/match')
+@login_required
+@response_cache.cached_response(PRODUCTS_CACHE_FILE, HB_PRODUCTS_CACHE_FILE, MATCHES_FILE,
+                                before=refresh_hb_snapshot_if_stale)
+def match():
+    cached_products, last_updated = load_products_cache()
+    
+    if not cached_products:
+        flash('Önce ana sayfadan "Verileri Yenile" butonuna tıklayarak verileri yükleyin!', 'error')
+        return render_template('match.html', 
+                             trendyol_products=[],
+                             hepsiburada_products=[],
+                             cache_empty=True,
+                             last_updated=None,
+                             hb_last_updated=None)
+    
+    logging.info(f"Cache'den {len(cached_products)} ürün yüklendi")
+    
+    # HB listeleri snapshot'tan okunur; eskiyse arka planda yenilenir
+    hepsiburada_products, hb_last_updated = load_hb_products_cache()
+    if not hepsiburada_products:
+        # Snapshot hiç yoksa bir kereye mahsus senkron çek (HB devresi açıksa boş liste)
+        try:
+            hepsiburada_products = [slim_hb_listing(p) for p in refresh_hb_products_cache()]
+        except Exception as e:
+            logging.error(f"HB listeleri alınamadı: {e}")
+            hepsiburada_products = []
+        hb_last_updated = datetime.now().isoformat() if hepsiburada_products else None
+    elif is_hb_cache_stale(hb_last_updated):
+        refresh_hb_products_cache_async()
+    
+    trendyol_products = []
+    for product in cached_products:
+        trendyol_products.append({
+            'barcode': product.get('barcode', ''),
+            'images': product.get('images', [])[:1],
+            'title': product.get('title', ''),
+        })
+    
+    logging.info(f"{len(trendyol_products)} TY, {len(hepsiburada_products)} HB ürünü hazırlandı")
+    
+    index = get_match_index()
+
+    for product in trendyol_products:
+        product['matched_hb_sku'] = index.sku_for(product['barcode'])
+    
+    return render_template('match.html', 
+                         trendyol_products=trendyol_products,
+                         hepsiburada_products=hepsiburada_products,
+                         cache_empty=False,
+                         last_updated=last_updated,
+                         hb_last_updated=hb_last_updated)
+
+@match_bp.route('/save_match', methods=['POST'])
+@login_required
+def save_match():
+    try:
+        data = request.get_json()
+        if not data or 'matches' not in data:
+            return jsonify({'error': 'Geçersiz istek verisi'}), 400
+
+        update_matches(data['matches'])
+        return jsonify({'message': 'Eşleştirme kaydedildi'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@match_bp.route('/match/health')
+@login_required
+def match_health():
+    """Eşleştirme sağlığı: küme sayıları ve her kümeden ilk kayıtlar"""
+    limit = request.args.get('limit', 20, type=int)
+    index = get_match_index()
+    return jsonify({
+        'summary': index.summary(),
+        'samples': {kind: index.items(kind, limit) for kind in MATCH_INDEX_KINDS}
+    })
+
+@match_bp.route('/match/index/<kind>')
+@login_required
+def match_index_items(kind):
+    """Tek bir indeks kümesinin tam listesi (orphans, duplicates, stale, unmatched_ty, unmatched_hb)"""
+    if kind not in MATCH_INDEX_KINDS:
+        return jsonify({'error': 'Bilinmeyen indeks türü'}), 404
+    index = get_match_index()
+    return jsonify({'kind': kind, 'description': MATCH_INDEX_KINDS[kind],
+                    'count': index.count(kind), 'items': index.items(kind)})
+
+@match_bp.route('/match/lookup')
+@login_required
+def match_lookup():
+    """?barcode= için HB SKU'su, ?hb_sku= için eşlenmiş TY barkodları"""
+    index = get_match_index()
+    barcode = request.args.get('barcode')
+    hb_sku = request.args.get('hb_sku')
+    if barcode:
+        return jsonify({'barcode': barcode, 'hb_sku': index.sku_for(barcode)})
+    if hb_sku:
+        return jsonify({'hb_sku': hb_sku, 'barcodes': index.barcodes_for(hb_sku)})
+    return jsonify({'error': 'barcode veya hb_sku parametresi gerekli'}), 400
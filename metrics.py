@@ -0,0 +1,194 @@
+"""
+Metrik Modülü
+Dış API çağrıları, dosya işlemleri ve route süreleri için sayaç/histogram
+kaydı ve Prometheus metin formatında çıktı
+"""
+
+import threading
+import time
+from functools import wraps
+
+# Saniye cinsinden histogram sınırları
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+METRIC_HELP = {
+    'marketplace_request_seconds': 'Pazaryeri API çağrı süreleri',
+    'marketplace_request_retries_total': 'Pazaryeri API tekrar deneme sayısı',
+    'http_request_seconds': 'Route bazında istek süreleri',
+    'json_io_seconds': 'JSON dosya okuma/yazma süreleri',
+    'excel_write_seconds': 'Excel yazma süreleri',
+    'refresh_stage_seconds': 'Veri yenileme aşama süreleri',
+    'refresh_products_total': 'Yenilemelerde işlenen toplam ürün',
+    'refresh_last_product_count': 'Son yenilemede işlenen ürün sayısı',
+    'refresh_runs_total': 'Veri yenileme çalıştırma sayısı',
+    'cache_requests_total': 'cached() önbellek isabet/ıska sayısı',
+    'cache_invalidations_total': 'Yazma sonrası önbellek temizleme sayısı',
+    'cache_evictions_total': 'LRU sınırı nedeniyle atılan kayıt sayısı',
+    'dashboard_summary_total': 'Pano özeti istekleri (hit, shared, build)',
+    'dashboard_summary_build_seconds': 'Pano özeti hesaplama süreleri',
+    'singleflight_calls_total': 'Tekil uçuş çağrıları (leader: çalıştırdı, follower: sonucu paylaştı)',
+}
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Sayaç artır"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    """Anlık değer (gauge) ata"""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, seconds, **labels):
+    """Histograma bir süre ölçümü ekle"""
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = {'buckets': [0] * len(DEFAULT_BUCKETS), 'sum': 0.0, 'count': 0, 'max': 0.0}
+            _histograms[key] = hist
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if seconds <= bound:
+                hist['buckets'][i] += 1
+                break
+        hist['sum'] += seconds
+        hist['count'] += 1
+        hist['max'] = max(hist['max'], seconds)
+
+
+class timed:
+    """Süre ölçer; hem `with` bloğu hem dekoratör olarak kullanılabilir"""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.name, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra) if extra else [])
+    if not items:
+        return ''
+    escaped = []
+    for k, v in items:
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{k}="{v}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _snapshot():
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: {**v, 'buckets': list(v['buckets'])} for k, v in _histograms.items()}
+    return counters, gauges, histograms
+
+
+def render_prometheus():
+    """Tüm metrikleri Prometheus metin formatında döndür"""
+    counters, gauges, histograms = _snapshot()
+    lines = []
+    seen = set()
+
+    def header(name, metric_type):
+        if name not in seen:
+            seen.add(name)
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), value in sorted(gauges.items()):
+        header(name, 'gauge')
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), hist in sorted(histograms.items()):
+        header(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(DEFAULT_BUCKETS, hist['buckets']):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def _percentile(hist, q):
+    """Histogram kovalarından yaklaşık yüzdelik değeri (üst sınır) hesapla"""
+    target = hist['count'] * q
+    cumulative = 0
+    for bound, count in zip(DEFAULT_BUCKETS, hist['buckets']):
+        cumulative += count
+        if cumulative >= target:
+            return min(bound, hist['max'])
+    return hist['max']
+
+
+def get_timing_summary():
+    """Histogramları toplam süreye göre azalan sırada özetle (dashboard için)"""
+    _, _, histograms = _snapshot()
+    summary = []
+    for (name, labels), hist in histograms.items():
+        if not hist['count']:
+            continue
+        summary.append({
+            'name': name,
+            'labels': dict(labels),
+            'count': hist['count'],
+            'total': hist['sum'],
+            'avg': hist['sum'] / hist['count'],
+            'p95': _percentile(hist, 0.95),
+            'max': hist['max']
+        })
+    summary.sort(key=lambda item: item['total'], reverse=True)
+    return summary
+
+
+def get_counters():
+    """Sayaç ve gauge değerlerini düz liste olarak döndür"""
+    counters, gauges, _ = _snapshot()
+    result = []
+    for (name, labels), value in sorted(counters.items()) + sorted(gauges.items()):
+        result.append({'name': name, 'labels': dict(labels), 'value': value})
+    return result
+
+
+def reset():
+    """Tüm metrikleri sıfırla"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
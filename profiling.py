@@ -0,0 +1,231 @@
+"""
+İstek Profilleme Modülü
+İstek bazında açılabilen cProfile + yığın örnekleyici; yavaş istekleri
+otomatik yakalar ve son N profili flamegraph uyumlu (collapsed) yığınlar
+olarak saklar. Örnekleme işlem başına tek, uzun ömürlü bir thread'de
+yapılır; profillenen istekler ona kaydolur ve bitince kaydı silinir.
+"""
+
+import collections
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request, session
+
+# Bu süreden (ms) uzun süren istekler otomatik profillenir; 0 = kapalı
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 0))
+# Hafızada tutulacak son profil sayısı
+PROFILE_KEEP_LAST = int(os.getenv("PROFILE_KEEP_LAST", 20))
+# Yığın örnekleme aralığı (ms); açıkça istenen profillerde 1 ms kullanılır
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5))
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_PARAM = '_profile'
+
+_profiles = collections.deque(maxlen=PROFILE_KEEP_LAST)
+_profiles_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+class Recording:
+    """Örnekleyiciye kayıtlı tek bir isteğin yığın sayaçları"""
+
+    def __init__(self, thread_id, interval_seconds):
+        self.thread_id = thread_id
+        self.interval = interval_seconds
+        self.next_due = time.monotonic() + interval_seconds
+        self.stacks = collections.Counter()
+        self.sample_count = 0
+
+    def add(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+            stack.append(f"{code.co_name} ({module}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def collapsed(self):
+        """flamegraph.pl / speedscope uyumlu 'a;b;c adet' satırları"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class StackSampler(threading.Thread):
+    """Kayıtlı isteklerin thread'lerini kendi aralıklarıyla örnekleyen tek thread
+
+    Kayıt yokken bekler; kayıt silindikten sonra o kayda dokunmaz, böylece
+    istek kendi sonuçlarını kilitsiz okuyabilir.
+    """
+
+    def __init__(self):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self._recordings = set()
+        self._changed = threading.Condition()
+
+    def register(self, thread_id, interval_seconds):
+        recording = Recording(thread_id, interval_seconds)
+        with self._changed:
+            self._recordings.add(recording)
+            self._changed.notify()
+        return recording
+
+    def unregister(self, recording):
+        with self._changed:
+            self._recordings.discard(recording)
+
+    def active_count(self):
+        with self._changed:
+            return len(self._recordings)
+
+    def run(self):
+        while True:
+            with self._changed:
+                if not self._recordings:
+                    self._changed.wait()
+                    continue
+                now = time.monotonic()
+                next_due = min(recording.next_due for recording in self._recordings)
+                if next_due > now:
+                    self._changed.wait(next_due - now)
+                    continue
+                frames = sys._current_frames()
+                for recording in self._recordings:
+                    if recording.next_due > now:
+                        continue
+                    recording.next_due = now + recording.interval
+                    frame = frames.get(recording.thread_id)
+                    if frame is not None:
+                        recording.add(frame)
+                del frames
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """İşlemin örnekleyici thread'i; ilk kullanımda (ya da fork sonrası) başlatılır"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = StackSampler()
+            _sampler.start()
+        return _sampler
+
+
+def _explicit_trigger():
+    """Profil açıkça istendi mi? (sadece admin oturumları için geçerli)"""
+    if session.get('role') != 'admin':
+        return None
+    if request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes'):
+        return 'header'
+    if request.args.get(PROFILE_QUERY_PARAM, '').lower() in ('1', 'true', 'yes'):
+        return 'query'
+    return None
+
+
+def _start_profiling():
+    trigger = _explicit_trigger()
+    if trigger is None and PROFILE_SLOW_MS <= 0:
+        return
+
+    profiler = None
+    if trigger:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python 3.12+: aynı anda tek cProfile etkin olabilir; yığın örnekleriyle devam et
+            logging.info(f"cProfile başlatılamadı, sadece örnekleme yapılacak: {e}")
+            profiler = None
+
+    interval = 0.001 if trigger else PROFILE_SAMPLE_INTERVAL_MS / 1000
+    sampler = get_sampler()
+    recording = sampler.register(threading.get_ident(), interval)
+
+    g.profiling = {
+        'trigger': trigger or 'auto',
+        'sampler': sampler,
+        'recording': recording,
+        'profiler': profiler,
+        'start': time.perf_counter(),
+        'started_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+
+def _finish_profiling(response):
+    state = g.pop('profiling', None)
+    if state is None:
+        return response
+
+    duration_ms = (time.perf_counter() - state['start']) * 1000
+    if state['profiler'] is not None:
+        state['profiler'].disable()
+    state['sampler'].unregister(state['recording'])
+
+    if state['trigger'] == 'auto' and duration_ms < PROFILE_SLOW_MS:
+        return response
+
+    cprofile_text = ''
+    if state['profiler'] is not None:
+        buffer = io.StringIO()
+        pstats.Stats(state['profiler'], stream=buffer).sort_stats('cumulative').print_stats(40)
+        cprofile_text = buffer.getvalue()
+
+    record = {
+        'id': next(_ids),
+        'route': request.url_rule.rule if request.url_rule else request.path,
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'status': response.status_code,
+        'duration_ms': round(duration_ms, 1),
+        'started_at': state['started_at'],
+        'trigger': state['trigger'],
+        'samples': state['recording'].sample_count,
+        'collapsed': state['recording'].collapsed(),
+        'cprofile': cprofile_text
+    }
+    with _profiles_lock:
+        _profiles.append(record)
+    logging.info(f"Profil kaydedildi #{record['id']}: {record['method']} {record['route']} {record['duration_ms']} ms ({record['trigger']})")
+    return response
+
+
+def _abort_profiling(exc):
+    """after_request çalışmadıysa (hata) isteğin kaydını sil"""
+    state = g.pop('profiling', None)
+    if state is not None:
+        if state['profiler'] is not None:
+            state['profiler'].disable()
+        state['sampler'].unregister(state['recording'])
+
+
+def init_app(app):
+    """Profil hook'larını Flask uygulamasına bağla"""
+    app.before_request(_start_profiling)
+    app.after_request(_finish_profiling)
+    app.teardown_request(_abort_profiling)
+
+
+def list_profiles():
+    """Saklanan profilleri en yeniden eskiye döndür"""
+    with _profiles_lock:
+        return list(reversed(_profiles))
+
+
+def get_profile(profile_id):
+    with _profiles_lock:
+        for record in _profiles:
+            if record['id'] == profile_id:
+                return record
+    return None
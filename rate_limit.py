@@ -0,0 +1,152 @@
+"""
+Rate Limit Modülü
+Kayan pencere sayaçlı (sliding window counter) deneme sınırlayıcı.
+Tek işlem için bellek içi (TTL + sınırlı anahtar sayısı), birden fazla
+worker işlemi için SQLite tabanlı paylaşımlı depo
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _sliding_count(window_start, current, previous, window_seconds, now):
+    """Önceki pencereyi geçen süre oranında ağırlıklandırarak tahmini sayıyı hesapla"""
+    elapsed = now - window_start
+    if elapsed >= 2 * window_seconds:
+        return 0.0
+    if elapsed >= window_seconds:
+        # Mevcut pencere bitti, önceki pencere rolüne geçti
+        weight = 1 - (elapsed - window_seconds) / window_seconds
+        return current * weight
+    weight = 1 - elapsed / window_seconds
+    return current + previous * weight
+
+
+def _roll(window_start, current, previous, window_seconds, now):
+    """Pencereyi şimdiki zamana göre kaydır: (window_start, current, previous)"""
+    if window_start is None or now - window_start >= 2 * window_seconds:
+        return now - (now % window_seconds), 0, 0
+    if now - window_start >= window_seconds:
+        return window_start + window_seconds, 0, current
+    return window_start, current, previous
+
+
+class MemoryRateLimitStore:
+    """Tek işlem içi depo; süresi dolan anahtarlar atılır, anahtar sayısı sınırlıdır"""
+
+    def __init__(self, window_seconds, max_keys=10000):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        # En eski erişilenden başla; süresi dolmamış ilk kayıtta dur
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry[0] >= 2 * self.window_seconds:
+                self._entries.popitem(last=False)
+            else:
+                break
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+    def hit(self, key, now=None):
+        """Deneme kaydet ve güncel tahmini sayıyı döndür"""
+        now = time.time() if now is None else now
+        with self._lock:
+            window_start, current, previous = self._entries.pop(key, (None, 0, 0))
+            window_start, current, previous = _roll(window_start, current, previous, self.window_seconds, now)
+            current += 1
+            self._entries[key] = (window_start, current, previous)
+            self._prune(now)
+            return _sliding_count(window_start, current, previous, self.window_seconds, now)
+
+    def count(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0.0
+            return _sliding_count(*entry, self.window_seconds, now)
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteRateLimitStore:
+    """Birden fazla worker işlemi arasında paylaşılan SQLite deposu"""
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path, window_seconds):
+        self.path = path
+        self.window_seconds = window_seconds
+        self._local = threading.local()
+        self._hits = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window_start REAL, current INTEGER, previous INTEGER)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_start, current, previous FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            window_start, current, previous = row if row else (None, 0, 0)
+            window_start, current, previous = _roll(window_start, current, previous, self.window_seconds, now)
+            current += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, window_start, current, previous) VALUES (?, ?, ?, ?)",
+                (key, window_start, current, previous)
+            )
+            self._hits += 1
+            if self._hits % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE window_start < ?", (now - 2 * self.window_seconds,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return _sliding_count(window_start, current, previous, self.window_seconds, now)
+
+    def count(self, key, now=None):
+        now = time.time() if now is None else now
+        row = self._connect().execute(
+            "SELECT window_start, current, previous FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return 0.0
+        return _sliding_count(*row, self.window_seconds, now)
+
+    def reset(self, key):
+        self._connect().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+def create_store(window_seconds, backend=None, path=None):
+    """RATE_LIMIT_BACKEND ortam değişkenine göre depo oluştur (memory | sqlite)"""
+    backend = (backend or os.getenv("RATE_LIMIT_BACKEND", "memory")).lower()
+    if backend == 'sqlite':
+        path = path or os.getenv("RATE_LIMIT_DB", "rate_limits.db")
+        try:
+            return SQLiteRateLimitStore(path, window_seconds)
+        except sqlite3.Error as e:
+            logging.error(f"SQLite rate limit deposu açılamadı, bellek içi depoya geçiliyor: {e}")
+    return MemoryRateLimitStore(window_seconds)
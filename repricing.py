@@ -0,0 +1,168 @@
+"""
+Fiyat Simülasyonu Modülü
+calculate_profit_analysis formülünün tüm katalog için vektörel hali:
+başabaş ve hedef marj fiyatları, komisyon/kargo senaryo taramaları ve
+toplu fiyat gönderimine hazır tablo
+
+Kar, satış fiyatı P'ye göre doğrusaldır:
+    kar = P * k - K
+    k = 0.8 - komisyon * 5/6 - stopaj - diğer
+    K = üretim (KDV hariç) + kargo * 5/6 + platform bedeli
+Hedef marj m için P = K / (k - m); k <= m ise hedef ulaşılamaz.
+"""
+
+import math
+
+import numpy as np
+
+VAT_RATE = 0.20
+
+
+def _number(value):
+    if value == '' or value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+class CostArrays:
+    """Ürün başına maliyet girdileri (her alan ürün sayısı uzunluğunda dizi)"""
+
+    def __init__(self, products, costs):
+        size = len(products)
+        self.barcodes = []
+        self.titles = []
+        self.prices = np.zeros(size)
+        self.production = np.zeros(size)
+        self.cargo = np.zeros(size)
+        self.commission_rate = np.zeros(size)
+        self.withholding_rate = np.zeros(size)
+        self.other_rate = np.zeros(size)
+        self.platform_fee = np.zeros(size)
+        self.has_costs = np.zeros(size, dtype=bool)
+
+        for i, product in enumerate(products):
+            barcode = product.get('barcode', '')
+            self.barcodes.append(barcode)
+            self.titles.append(product.get('title', ''))
+            self.prices[i] = _number(product.get('ty_price'))
+            record = costs.get(barcode)
+            if not record:
+                continue
+            self.has_costs[i] = True
+            # calculate_profit_analysis sadece pozitif üretim kalemlerini sayar
+            self.production[i] = sum(
+                _number(item.get('amount')) for item in record.get('production_costs') or []
+                if _number(item.get('amount')) > 0
+            )
+            self.cargo[i] = _number(record.get('cargo_cost'))
+            self.commission_rate[i] = _number(record.get('commission_rate')) / 100
+            self.withholding_rate[i] = _number(record.get('withholding_rate')) / 100
+            self.other_rate[i] = _number(record.get('other_expenses_rate')) / 100
+            self.platform_fee[i] = _number(record.get('platform_fee'))
+
+    def __len__(self):
+        return len(self.barcodes)
+
+    def coefficients(self, commission_delta=0.0, cargo_delta=0.0):
+        """(k, K) dizileri; commission_delta yüzde puan, cargo_delta TL"""
+        commission = np.clip(self.commission_rate + commission_delta / 100, 0, None)
+        cargo = np.clip(self.cargo + cargo_delta, 0, None)
+        vat_share = VAT_RATE / (1 + VAT_RATE)  # KDV dahil tutar içindeki KDV payı (1/6)
+        k = (1 - VAT_RATE) - commission * (1 - vat_share) - self.withholding_rate - self.other_rate
+        fixed = self.production + cargo * (1 - vat_share) + self.platform_fee
+        return k, fixed
+
+
+def solve(arrays, target_margin, commission_delta=0.0, cargo_delta=0.0):
+    """Tek senaryo için tüm ürünlerin başabaş/hedef fiyatı ve mevcut kârı
+
+    target_margin yüzde olarak verilir (25 = %25). Ulaşılamayan fiyatlar NaN.
+    """
+    k, fixed = arrays.coefficients(commission_delta, cargo_delta)
+    margin = target_margin / 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        break_even = np.where(k > 0, fixed / k, np.nan)
+        target_price = np.where(k - margin > 0, fixed / (k - margin), np.nan)
+        current_profit = arrays.prices * k - fixed
+        current_margin = np.where(arrays.prices > 0, current_profit / arrays.prices * 100, np.nan)
+    return {
+        'break_even': break_even,
+        'target_price': target_price,
+        'current_profit': current_profit,
+        'current_margin': current_margin
+    }
+
+
+def _summary(arrays, result):
+    mask = arrays.has_costs
+    target = result['target_price'][mask]
+    prices = arrays.prices[mask]
+    feasible = ~np.isnan(target)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(prices > 0, (target - prices) / prices * 100, np.nan)
+    change = change[feasible & ~np.isnan(change)]
+    return {
+        'products': int(mask.sum()),
+        'infeasible': int((~feasible).sum()),
+        'negative_profit_now': int((result['current_profit'][mask] < 0).sum()),
+        'needs_increase': int((target[feasible] > prices[feasible]).sum()),
+        'avg_price_change_percent': round(float(change.mean()), 2) if change.size else None
+    }
+
+
+def sweep(arrays, target_margin, commission_deltas=(0.0,), cargo_deltas=(0.0,)):
+    """Komisyon x kargo senaryolarının her biri için özet"""
+    scenarios = []
+    for commission_delta in commission_deltas:
+        for cargo_delta in cargo_deltas:
+            result = solve(arrays, target_margin, commission_delta, cargo_delta)
+            summary = _summary(arrays, result)
+            summary.update(commission_delta=commission_delta, cargo_delta=cargo_delta)
+            scenarios.append(summary)
+    return scenarios
+
+
+def _round_up(values, step):
+    """Marjın hedefin altına düşmemesi için yukarı yuvarla (NaN korunur)"""
+    return np.round(np.ceil(values / step - 1e-9) * step, 2)
+
+
+def _nullable(values):
+    """NaN'ları None'a çevirerek Python listesine dönüştür"""
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+def price_table(arrays, result, round_step=0.01, only_with_costs=True):
+    """Ürün başına satırlar: mevcut fiyat, başabaş, hedef fiyat, değişim"""
+    target = _round_up(result['target_price'], round_step)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(arrays.prices > 0, (target - arrays.prices) / arrays.prices * 100, np.nan)
+    columns = {
+        'current_price': arrays.prices.tolist(),
+        'current_profit': np.round(result['current_profit'], 2).tolist(),
+        'current_margin': _nullable(np.round(result['current_margin'], 2)),
+        'break_even_price': _nullable(_round_up(result['break_even'], round_step)),
+        'target_price': _nullable(target),
+        'price_change_percent': _nullable(np.round(change, 2))
+    }
+    rows = []
+    for i, barcode in enumerate(arrays.barcodes):
+        if only_with_costs and not arrays.has_costs[i]:
+            continue
+        row = {'barcode': barcode, 'title': arrays.titles[i]}
+        for name, values in columns.items():
+            row[name] = values[i]
+        rows.append(row)
+    return rows
+
+
+def to_price_push_items(rows):
+    """Tablodan Trendyol price-and-inventory 'items' listesi (ulaşılamayanlar hariç)"""
+    return [
+        {'barcode': row['barcode'], 'listPrice': row['target_price'], 'salePrice': row['target_price']}
+        for row in rows
+        if row['target_price']
+    ]
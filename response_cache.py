@@ -0,0 +1,186 @@
+"""
+Yanıt Önbelleği Modülü
+Veri sürümüne (ilgili dosyaların mtime/boyutu) bağlı güçlü ETag,
+If-None-Match için 304 ve önceden sıkıştırılmış (gzip/brotli) gövdeleri
+tutan LRU
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request, session
+
+import metrics
+import storage
+
+try:
+    import brotli
+except ImportError:  # brotli yoksa sadece gzip sunulur
+    brotli = None
+
+# LRU'da tutulacak toplam gövde boyutu (tüm kodlamalar dahil)
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", 64))
+# Bundan küçük gövdeler sıkıştırılmaz
+MIN_COMPRESS_BYTES = 1024
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+# Bekleyen flash mesajlarına dokunmadan render ettiği görülen view'lar
+_flash_free_views = set()
+_state = {'total_bytes': 0}
+
+
+def file_version(path):
+    """Dosyanın sürüm etiketi; bekleyen yazma varsa None (önbelleklenemez)"""
+    if storage.is_pending(path):
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return '0'
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def data_version(paths):
+    versions = []
+    for path in paths:
+        version = file_version(path)
+        if version is None:
+            return None
+        versions.append(version)
+    return tuple(versions)
+
+
+def _entry_size(entry):
+    return sum(len(body) for body in entry['bodies'].values())
+
+
+def _lookup(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+        return entry
+
+
+def _store(key, entry):
+    max_bytes = RESPONSE_CACHE_MAX_MB * 1024 * 1024
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _state['total_bytes'] -= _entry_size(old)
+        _entries[key] = entry
+        _state['total_bytes'] += _entry_size(entry)
+        while _state['total_bytes'] > max_bytes and len(_entries) > 1:
+            _, evicted = _entries.popitem(last=False)
+            _state['total_bytes'] -= _entry_size(evicted)
+        metrics.set_gauge('response_cache_bytes', _state['total_bytes'])
+
+
+def invalidate():
+    """Tüm önbelleklenmiş yanıtları at"""
+    with _lock:
+        _entries.clear()
+        _state['total_bytes'] = 0
+        metrics.set_gauge('response_cache_bytes', 0)
+
+
+def _negotiate_encoding():
+    """Accept-Encoding'e göre br > gzip > sıkıştırmasız seç"""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').lower().split(','):
+        token, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(token)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _encoded_body(entry, encoding):
+    body = entry['bodies'].get(encoding)
+    if body is not None:
+        return body
+    identity = entry['bodies'][None]
+    if encoding == 'br':
+        body = brotli.compress(identity, quality=5)
+    else:
+        body = gzip.compress(identity, compresslevel=6)
+    with _lock:
+        if encoding not in entry['bodies']:
+            entry['bodies'][encoding] = body
+            _state['total_bytes'] += len(body)
+    return body
+
+
+def _respond(entry):
+    if request.if_none_match.contains(entry['etag']):
+        response = Response(status=304)
+        response.set_etag(entry['etag'])
+        return response, 'not_modified'
+
+    encoding = None
+    if len(entry['bodies'][None]) >= MIN_COMPRESS_BYTES:
+        encoding = _negotiate_encoding()
+    response = Response(_encoded_body(entry, encoding), content_type=entry['content_type'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(entry['etag'])
+    response.headers['Vary'] = 'Accept-Encoding, Cookie'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response, None
+
+
+def cached_response(*paths, before=None):
+    """GET yanıtını verilen dosyaların sürümüne bağlı olarak önbellekle
+
+    Anahtar: view, tam yol, oturumdaki kullanıcı/rol ve veri sürümü.
+    before verilirse önbellekten dönülse bile her istekte çağrılır.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if before is not None:
+                before()
+            version = data_version(paths) if request.method == 'GET' else None
+            if version is None:
+                metrics.inc('response_cache_total', route=view.__name__, result='bypass')
+                return view(*args, **kwargs)
+
+            key = (view.__name__, request.full_path, session.get('username'), session.get('role'), version)
+            pending_flashes = session.get('_flashes')
+            # Bekleyen flash mesajı varken, mesajları göstermediği henüz görülmemiş
+            # view önbellekten sunulmaz (sayfa mesajı gösterip tüketebilir)
+            flash_sensitive = bool(pending_flashes) and view.__name__ not in _flash_free_views
+            entry = None if flash_sensitive else _lookup(key)
+            result = 'hit'
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                # Hata yanıtları ve flash mesajı gösteren/bırakan render'lar önbelleğe alınmaz
+                if (response.status_code != 200 or response.direct_passthrough
+                        or session.get('_flashes') != pending_flashes):
+                    metrics.inc('response_cache_total', route=view.__name__, result='bypass')
+                    return response
+                if pending_flashes:
+                    _flash_free_views.add(view.__name__)
+                body = response.get_data()
+                entry = {
+                    'etag': hashlib.sha256(body).hexdigest()[:32],
+                    'content_type': response.content_type,
+                    'bodies': {None: body}
+                }
+                _store(key, entry)
+                result = 'miss'
+
+            response, not_modified = _respond(entry)
+            metrics.inc('response_cache_total', route=view.__name__, result=not_modified or result)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,190 @@
+"""
+Arşiv ve Saklama Modülü
+Biten haftaların stok raporlarını sıkıştırılmış arşive (pyarrow varsa
+zstd Parquet, yoksa gzip CSV) dönüştürür ve arşivleri bir manifest ile
+izler; saklama süresi kontrolü için dosya sistemi taranmaz
+"""
+
+import csv
+import gzip
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+import storage
+
+MANIFEST_NAME = 'manifest.json'
+PARQUET_BATCH_ROWS = 50000
+
+
+_arrow = {}
+
+
+def _pyarrow():
+    """(pyarrow, pyarrow.parquet) modüllerini ilk kullanımda yükle; yoksa (None, None)"""
+    if not _arrow:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            _arrow['modules'] = (pyarrow, pyarrow.parquet)
+        except ImportError:  # pyarrow yoksa gzip CSV arşivi kullanılır
+            _arrow['modules'] = (None, None)
+    return _arrow['modules']
+
+
+def _manifest_path(archive_folder):
+    return os.path.join(archive_folder, MANIFEST_NAME)
+
+
+def load_manifest(archive_folder):
+    """{'archives': {anahtar: kayıt}} biçimindeki manifest'i oku"""
+    return storage.read_json(_manifest_path(archive_folder), lambda: {'archives': {}})
+
+
+def update_manifest(archive_folder, mutate):
+    os.makedirs(archive_folder, exist_ok=True)
+    return storage.update_json(_manifest_path(archive_folder), mutate,
+                               default=lambda: {'archives': {}})
+
+
+def _coerce(value, numeric):
+    if value is None or value == '':
+        return None
+    if numeric:
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return None
+    return str(value)
+
+
+def _write_parquet(path, columns, rows, numeric_columns):
+    pa, pq = _pyarrow()
+    schema = pa.schema([
+        (column, pa.float64() if column in numeric_columns else pa.string())
+        for column in columns
+    ])
+    numeric_flags = [column in numeric_columns for column in columns]
+    count = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        batch = [[] for _ in columns]
+        for row in rows:
+            for i, numeric in enumerate(numeric_flags):
+                batch[i].append(_coerce(row[i] if i < len(row) else None, numeric))
+            count += 1
+            if len(batch[0]) >= PARQUET_BATCH_ROWS:
+                writer.write_table(pa.Table.from_arrays([pa.array(col, type=schema.field(i).type)
+                                                         for i, col in enumerate(batch)], schema=schema))
+                batch = [[] for _ in columns]
+        if batch[0]:
+            writer.write_table(pa.Table.from_arrays([pa.array(col, type=schema.field(i).type)
+                                                     for i, col in enumerate(batch)], schema=schema))
+    return count
+
+
+def _write_csv_gz(path, columns, rows):
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_archive(archive_folder, name, columns, rows, numeric_columns=()):
+    """Satırları arşiv dosyasına akıt; (dosya adı, format, satır sayısı) döner
+
+    Dosya önce geçici adla yazılır, tamamlanınca yerine taşınır.
+    """
+    os.makedirs(archive_folder, exist_ok=True)
+    fmt = 'parquet' if _pyarrow()[1] is not None else 'csv.gz'
+    filename = f"{name}.{fmt}"
+    path = os.path.join(archive_folder, filename)
+    fd, temp_path = tempfile.mkstemp(prefix=filename + '.', suffix='.tmp', dir=archive_folder)
+    os.close(fd)
+    try:
+        if fmt == 'parquet':
+            count = _write_parquet(temp_path, columns, rows, set(numeric_columns))
+        else:
+            count = _write_csv_gz(temp_path, columns, rows)
+        with open(temp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return filename, fmt, count
+
+
+def iter_archive_rows(archive_folder, entry):
+    """Manifest kaydındaki arşivin satırlarını (başlıksız) akıt"""
+    path = os.path.join(archive_folder, entry['file'])
+    if entry['format'] == 'parquet':
+        pq = _pyarrow()[1]
+        if pq is None:
+            raise RuntimeError("Parquet arşivini okumak için pyarrow gerekli")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS):
+            columns = [column.to_pylist() for column in batch.columns]
+            yield from (list(row) for row in zip(*columns))
+        return
+
+    numeric = set(entry.get('numeric_columns', []))
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        flags = [column in numeric for column in header]
+        for row in reader:
+            yield [_coerce(value, flag) if flag else (value if value != '' else None)
+                   for value, flag in zip(row, flags)]
+
+
+def archive_expired(entry, max_age_days, now=None):
+    """Arşivin kapsadığı dönem saklama süresini aştı mı? (dosyaya bakılmaz)"""
+    now = now or datetime.now()
+    period_end = datetime.fromisoformat(entry['period_end'])
+    return (now - period_end).days > max_age_days
+
+
+def enforce_retention(archive_folder, max_age_days):
+    """Süresi dolan arşivleri sil ve manifest'ten çıkar; silinen sayısı döner"""
+    expired = [key for key, entry in load_manifest(archive_folder)['archives'].items()
+               if archive_expired(entry, max_age_days)]
+    if not expired:
+        return 0
+
+    def drop(manifest):
+        removed = []
+        for key in expired:
+            entry = manifest['archives'].pop(key, None)
+            if entry is not None:
+                removed.append(entry)
+        return removed
+
+    removed = update_manifest(archive_folder, drop)
+    for entry in removed:
+        try:
+            os.remove(os.path.join(archive_folder, entry['file']))
+            logging.info(f"Süresi dolan arşiv silindi: {entry['file']}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Arşiv silme hatası {entry['file']}: {e}")
+    return len(removed)
+
+
+def describe_archive(entry):
+    """Manifest kaydından liste görünümü (stat yapılmaz)"""
+    return {
+        'key': entry['key'],
+        'filename': entry['file'],
+        'format': entry['format'],
+        'row_count': entry['rows'],
+        'size_mb': round(entry['size'] / (1024 * 1024), 2),
+        'archived_at': entry['archived_at'],
+        'source_files': entry.get('sources', [])
+    }
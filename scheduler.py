@@ -0,0 +1,86 @@
+"""
+Zamanlayıcı Modülü
+Periyodik arka plan işlerini çalıştırır. Birden fazla worker işlemi
+varsa dosya kilidiyle lider seçilir; işleri yalnızca lider çalıştırır,
+lider ölürse kilit serbest kalır ve başka bir worker devralır.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import metrics
+import storage
+
+SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE", "scheduler_leader")
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", 5))
+
+_jobs = []
+_jobs_lock = threading.Lock()
+_state = {'thread': None, 'leader_lock': None}
+
+
+def add_job(name, interval_seconds, func, first_run_seconds=None):
+    """Periyodik iş ekle; ilk çalıştırma first_run_seconds (verilmezse interval_seconds) sonradır"""
+    first_run = interval_seconds if first_run_seconds is None else first_run_seconds
+    with _jobs_lock:
+        _jobs.append({
+            'name': name,
+            'interval': interval_seconds,
+            'func': func,
+            'next_run': time.time() + first_run,
+            'last_run': None,
+            'last_error': None
+        })
+
+
+def is_leader():
+    return _state['leader_lock'] is not None
+
+
+def _run_due_jobs():
+    now = time.time()
+    with _jobs_lock:
+        due = [job for job in _jobs if job['next_run'] <= now]
+    for job in due:
+        logging.info(f"Zamanlanmış iş başlıyor: {job['name']}")
+        try:
+            with metrics.timed('scheduler_job_seconds', job=job['name']):
+                job['func']()
+            job['last_error'] = None
+        except Exception as e:
+            job['last_error'] = str(e)
+            logging.error(f"Zamanlanmış iş hatası {job['name']}: {e}")
+        job['last_run'] = time.time()
+        job['next_run'] = job['last_run'] + job['interval']
+
+
+def _loop():
+    while True:
+        if not is_leader():
+            _state['leader_lock'] = storage.try_lock(SCHEDULER_LOCK_FILE)
+            if is_leader():
+                logging.info(f"Zamanlayıcı lideri bu işlem (pid {os.getpid()})")
+        if is_leader():
+            _run_due_jobs()
+        time.sleep(SCHEDULER_TICK_SECONDS)
+
+
+def start():
+    """Zamanlayıcı thread'ini (işlem başına bir kez) başlat"""
+    if _state['thread'] is not None:
+        return
+    thread = threading.Thread(target=_loop, name='scheduler', daemon=True)
+    _state['thread'] = thread
+    thread.start()
+
+
+def status():
+    """Lider bilgisi ve işlerin son/sonraki çalışma zamanları"""
+    with _jobs_lock:
+        jobs = [
+            {k: job[k] for k in ('name', 'interval', 'next_run', 'last_run', 'last_error')}
+            for job in _jobs
+        ]
+    return {'pid': os.getpid(), 'is_leader': is_leader(), 'jobs': jobs}
@@ -0,0 +1,81 @@
+"""
+Tekil Uçuş (Single-Flight) Modülü
+Aynı anahtarla eşzamanlı yapılan çağrılardan yalnızca ilki (lider) işi
+çalıştırır; diğerleri onun bitmesini bekleyip aynı sonucu (ya da aynı
+hatayı) alır. Sonuç saklanmaz: lider bittikten sonra gelen çağrı işi
+yeniden çalıştırır (kalıcılık için cache_backend.cached ile birlikte
+kullanılır).
+"""
+
+import threading
+from functools import wraps
+
+import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class Group:
+    """Anahtar -> uçuştaki çağrı"""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """func(*args, **kwargs)'ı key için tek sefer çalıştır; sonucu döner"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            metrics.inc('singleflight_calls_total', op=self.name, role='follower')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.inc('singleflight_calls_total', op=self.name, role='leader')
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+def single_flight(name, key=None):
+    """Fonksiyonu Group(name) üzerinden çalıştıran dekoratör
+
+    key verilmezse anahtar argümanlardır (hashable olmalı).
+    """
+    group = Group(name)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            return group.do(call_key, func, *args, **kwargs)
+
+        wrapper.group = group
+        return wrapper
+    return decorator
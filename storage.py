@@ -0,0 +1,247 @@
+"""
+Dosya Yazma Katmanı
+JSON depoları için atomik (geçici dosya + fsync + rename) yazma, dosya
+bazında kilitleme (thread + işlem arası) ve kısa pencere içinde gelen
+ardışık güncellemeleri tek yazmada birleştirme (coalescing)
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sadece thread kilidi kullanılır
+    fcntl = None
+
+# Birleştirilmiş yazmalar için bekleme penceresi (ms); 0 = her güncelleme hemen yazılır.
+# Bekleyen veri işlem içinde tutulduğu için varsayılan kapalıdır (diğer işlemler eski
+# dosyayı okuyup bekleyen güncellemeyi ezerdi); tek işlemli sunucu açılışta açar.
+STORAGE_COALESCE_MS = float(os.getenv("STORAGE_COALESCE_MS", 0))
+SINGLE_PROCESS_COALESCE_MS = 200
+
+_registry_lock = threading.Lock()
+_path_locks = {}
+_pending = {}
+_timers = {}
+
+
+def _normalize(path):
+    return os.path.abspath(path)
+
+
+def _thread_lock(path):
+    with _registry_lock:
+        lock = _path_locks.get(path)
+        if lock is None:
+            lock = threading.RLock()
+            _path_locks[path] = lock
+        return lock
+
+
+@contextmanager
+def locked(path):
+    """Dosya için thread ve (destekleniyorsa) işlem arası kilit al"""
+    path = _normalize(path)
+    with _thread_lock(path):
+        if fcntl is None:
+            yield
+            return
+        with open(path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_writer(path, encoding='utf-8'):
+    """Geçici dosyaya yazdırıp başarıda fsync + rename yapan yazıcı
+
+    Hata olursa hedef dosyaya dokunulmaz, geçici dosya silinir.
+    """
+    path = _normalize(path)
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory):
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def file_signature(path):
+    """Dosyanın (mtime_ns, boyut) imzası; dosya yoksa None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _write_now(path, data, indent, callbacks=()):
+    previous = file_signature(path) if callbacks else None
+    with atomic_writer(path) as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    if callbacks:
+        current = file_signature(path)
+        for callback in callbacks:
+            try:
+                callback(previous, current)
+            except Exception as e:
+                logging.error(f"Yazma sonrası geri çağırma hatası {path}: {e}")
+
+
+def read_json(path, default=None):
+    """JSON oku; bekleyen (henüz yazılmamış) güncelleme varsa onu döndür"""
+    path = _normalize(path)
+    with _thread_lock(path):
+        if path in _pending:
+            return copy.deepcopy(_pending[path][0])
+    if not os.path.exists(path):
+        return default() if callable(default) else default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_pending(path):
+    """Dosya için henüz diske yazılmamış birleştirilmiş güncelleme var mı?"""
+    return _normalize(path) in _pending
+
+
+def write_json(path, data, indent=2, coalesce=False):
+    """JSON'u atomik yaz; coalesce=True ise kısa pencere sonunda tek seferde yaz"""
+    path = _normalize(path)
+    with locked(path):
+        if coalesce and STORAGE_COALESCE_MS > 0:
+            # Bekleyen güncellemeler bu veriyle değiştirildi; geri çağırmaları düşer
+            _schedule(path, data, indent)
+        else:
+            _pending.pop(path, None)
+            _write_now(path, data, indent)
+
+
+def update_json(path, mutate, default=dict, indent=2, coalesce=False, on_written=None):
+    """Kilit altında oku-değiştir-yaz; mutate(data) veriyi yerinde değiştirir
+
+    mutate'in dönüş değeri çağırana iletilir. Aynı dosyaya paralel gelen
+    güncellemeler sıraya girer, biri diğerini ezmez. on_written verilirse
+    değişiklik diske yazıldığında (birleştirilmişse pencere sonunda)
+    on_written(önceki imza, yeni imza) ile kilit altında çağrılır.
+    """
+    path = _normalize(path)
+    with locked(path):
+        callbacks = []
+        if path in _pending:
+            data, _, callbacks = _pending[path]
+        elif os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            data = default() if callable(default) else default
+        result = mutate(data)
+        if on_written is not None:
+            callbacks.append(on_written)
+        if coalesce and STORAGE_COALESCE_MS > 0:
+            _schedule(path, data, indent, callbacks)
+        else:
+            _pending.pop(path, None)
+            _write_now(path, data, indent, callbacks)
+        return result
+
+
+def _schedule(path, data, indent, callbacks=None):
+    _pending[path] = (data, indent, callbacks or [])
+    if path not in _timers:
+        timer = threading.Timer(STORAGE_COALESCE_MS / 1000, _flush_path, args=(path,))
+        timer.daemon = True
+        _timers[path] = timer
+        timer.start()
+
+
+def _flush_path(path):
+    try:
+        with locked(path):
+            _timers.pop(path, None)
+            entry = _pending.pop(path, None)
+            if entry is not None:
+                _write_now(path, *entry)
+    except Exception as e:
+        logging.error(f"Birleştirilmiş yazma hatası {path}: {e}")
+
+
+def flush(path=None):
+    """Bekleyen yazmaları hemen diske yaz (path verilmezse hepsini)"""
+    paths = [_normalize(path)] if path else list(_pending)
+    for pending_path in paths:
+        timer = _timers.get(pending_path)
+        if timer is not None:
+            timer.cancel()
+        _flush_path(pending_path)
+
+
+atexit.register(flush)
+
+
+def enable_single_process_coalescing():
+    """Tek işlemli sunucu (app.run) için birleştirmeyi aç; STORAGE_COALESCE_MS verilmişse ona uyulur"""
+    global STORAGE_COALESCE_MS
+    if "STORAGE_COALESCE_MS" not in os.environ:
+        STORAGE_COALESCE_MS = SINGLE_PROCESS_COALESCE_MS
+
+
+class FileLock:
+    """try_lock ile alınmış işlem arası kilit"""
+
+    def __init__(self, handle):
+        self._handle = handle
+
+    def release(self):
+        if self._handle is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+        self._handle.close()
+        self._handle = None
+
+
+def try_lock(path):
+    """Beklemeden işlem arası kilit almayı dene; alınamazsa None döner
+
+    Kilit, release() çağrılana ya da işlem sonlanana kadar tutulur.
+    """
+    handle = open(_normalize(path) + '.lock', 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    return FileLock(handle)
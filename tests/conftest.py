@@ -0,0 +1,64 @@
+"""
+Test Ayarları
+Modüller dosya yollarını çalışma dizinine göre kullandığı için her test
+kendi geçici dizininde çalışır. app modülü bir kez import edilir; işlem
+içi önbellekler her testte sıfırlanır.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def app_module(workdir):
+    import app
+    import cache_backend
+    import dashboard_summary
+    import metrics
+    import response_cache
+
+    # Paylaşımlı önbellek ve işlem içi durum bu testin dizinine bağlansın
+    cache_backend._shared_cache = None
+    cache_backend._backends.clear()
+    response_cache.invalidate()
+    dashboard_summary._latest['summary'] = None
+    app.match_index.signature = None
+    app._users_cache.update(data=None, signature=None, checked_at=0.0)
+    app._products_memo.update(signature=None, products=None, turkey_time=None)
+    metrics.reset()
+    app.app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    """Varsayılan admin kullanıcısıyla giriş yapmış test istemcisi"""
+    test_client = app_module.app.test_client()
+    response = test_client.post('/login', data={'username': 'admin', 'password': '123456'})
+    assert response.status_code == 302
+    return test_client
+
+
+@pytest.fixture
+def counter():
+    """counter(ad, **etiketler) -> sayaç değeri (yoksa 0)"""
+    import metrics
+
+    def read(name, **labels):
+        labels = {key: str(value) for key, value in labels.items()}
+        for item in metrics.get_counters():
+            if item['name'] == name and item['labels'] == labels:
+                return item['value']
+        return 0
+    return read
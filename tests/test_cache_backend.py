@@ -0,0 +1,133 @@
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+import cache_backend
+import storage
+from cache_backend import MemoryCache, SQLiteCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """cache_backend'in gördüğü zamanı elle ilerlet"""
+    now = [1000.0]
+    fake = types.SimpleNamespace(time=lambda: now[0])
+    monkeypatch.setattr(cache_backend, 'time', fake)
+
+    def advance(seconds):
+        now[0] += seconds
+    return advance
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, workdir):
+    if request.param == 'memory':
+        return MemoryCache()
+    return SQLiteCache('cache.db')
+
+
+def test_ttl_expiry(cache, clock):
+    cache.set('a', {'value': 1}, ttl=10)
+    cache.set('b', 2)
+    clock(9)
+    assert cache.get('a') == {'value': 1}
+    clock(1)
+    assert cache.get('a') is None
+    assert cache.get('a', 'yok') == 'yok'
+    assert cache.get('b') == 2
+
+
+def test_default_ttl(workdir, clock):
+    for cache in (MemoryCache(default_ttl=5), SQLiteCache('cache.db', default_ttl=5)):
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=60)
+        clock(5)
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+        clock(-5)
+
+
+def test_delete_prefix(cache):
+    for key in ('ns:1', 'ns:2', 'nsx:1', 'other'):
+        cache.set(key, key)
+    cache.delete_prefix('ns:')
+    assert [cache.get(key) for key in ('ns:1', 'ns:2', 'nsx:1', 'other')] == [None, None, 'nsx:1', 'other']
+
+
+def test_memory_lru_eviction():
+    cache = MemoryCache(max_entries=3)
+    for key in 'abc':
+        cache.set(key, key)
+    assert cache.get('a') == 'a'  # a en son kullanılan olur
+    cache.set('d', 'd')
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['a', 'c', 'd']
+    assert len(cache) == 3
+
+
+def test_cached_decorator(app_module, counter, clock):
+    calls = []
+
+    @cache_backend.cached('test_square', 30)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9 and square(3) == 9
+    assert calls == [3]
+    assert counter('cache_requests_total', cache='test_square', result='hit') == 1
+
+    square.invalidate(3)
+    assert square(3) == 9 and calls == [3, 3]
+    clock(30)
+    square(3)
+    assert calls == [3, 3, 3]
+    square(4)
+    square.invalidate_all()
+    square(3), square(4)
+    assert calls == [3, 3, 3, 4, 3, 4]
+
+
+def test_cached_ttl_function_skips_errors(app_module):
+    results = iter([{'error': 'x'}, {'ok': True}])
+
+    @cache_backend.cached('test_status', lambda value: 0 if 'error' in value else 60, backend='sqlite')
+    def status():
+        return next(results)
+
+    assert status() == {'error': 'x'}
+    assert status() == {'ok': True}
+    assert status() == {'ok': True}
+
+
+def write_week_manifest(app_module, created, rows=10):
+    year, week = app_module.get_week_info()
+    storage.write_json(app_module.EXCEL_MANIFEST_FILE, {'weeks': {f"{year}_W{week:02d}": {
+        'shards': [{'file': 'part1.xlsx', 'part': 1, 'rows': rows, 'size': 2048,
+                    'created': created.isoformat(), 'updated': created.isoformat()}],
+        'updates': 1, 'last_batch_rows': rows}}})
+
+
+def test_excel_stats_age_is_not_cached(app_module, monkeypatch):
+    write_week_manifest(app_module, datetime.now() - timedelta(hours=2))
+    assert app_module.get_excel_stats_weekly()['age_hours'] == 2.0
+
+    later = datetime.now() + timedelta(hours=3)
+    monkeypatch.setattr(app_module, 'datetime', types.SimpleNamespace(
+        now=lambda: later, fromisoformat=datetime.fromisoformat))
+    stats = app_module.get_excel_stats_weekly()
+    assert stats['age_hours'] == 5.0
+    assert stats['row_count'] == 10
+
+
+def test_weekly_report_invalidates_stats(app_module):
+    app_module.save_products_cache([{'barcode': 'B1', 'quantity': 1}])
+    assert app_module.get_excel_stats_weekly()['exists'] is False
+
+    app_module.save_products_to_excel_weekly()
+    storage.flush()
+    stats = app_module.get_excel_stats_weekly()
+    assert stats['exists'] is True
+    assert stats['row_count'] == 1
+    assert stats['last_updated_turkey']
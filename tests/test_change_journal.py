@@ -0,0 +1,222 @@
+import types
+
+import pytest
+
+import change_journal
+import circuit_breaker
+from change_journal import ChangeJournal
+
+
+def stock(sku, quantity):
+    return {'marketplace': 'hepsiburada', 'kind': 'hb_stock', 'sku': sku,
+            'fields': {'availableStock': quantity}}
+
+
+def price(sku, **fields):
+    return {'marketplace': 'trendyol', 'kind': 'ty_inventory', 'sku': sku, 'fields': fields}
+
+
+def submit(journal, *changes):
+    results = journal.enqueue(list(changes))
+    claimed = journal.claim([item['id'] for item, _ in results])
+    return claimed, results
+
+
+def test_pending_duplicate_and_coalesce(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [(first, outcome)] = journal.enqueue([price('B1', listPrice=10, salePrice=10)])
+    assert outcome == 'queued'
+
+    [(same, outcome)] = journal.enqueue([price('B1', salePrice=10)])
+    assert outcome == 'duplicate' and same['id'] == first['id']
+
+    [(merged, outcome)] = journal.enqueue([price('B1', salePrice=9)])
+    assert outcome == 'coalesced'
+    assert merged['fields'] == {'listPrice': 10, 'salePrice': 9}
+    assert journal.get(first['id'])['state'] == 'superseded'
+    assert journal.get(first['id'])['superseded_by'] == merged['id']
+    assert [item['id'] for item in journal.open_items()] == [merged['id']]
+
+
+def test_state_machine(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [item], _ = submit(journal, stock('SKU1', 5))
+    assert item['state'] == 'sending' and item['attempts'] == 1
+
+    journal.mark_sent([item['id']], 'batch-1')
+    assert journal.get(item['id'])['batch_id'] == 'batch-1'
+    # 'sent' kalem tekrar 'sent' olamaz, bitmiş kalemin süresi dolamaz
+    assert journal.mark_sent([item['id']], 'batch-2') == []
+    journal.mark_done([item['id']])
+    assert journal.get(item['id'])['state'] == 'done'
+    assert journal.expire([item['id']]) == []
+    assert journal.open_items() == []
+
+
+def test_resubmit_while_in_flight_survives_failure(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [sent], _ = submit(journal, stock('SKU1', 5))
+    journal.mark_sent([sent['id']], 'batch-1')
+
+    claimed, [(held, outcome)] = submit(journal, stock('SKU1', 5))
+    assert claimed == [] and outcome == 'held'
+    assert held['after'] == sent['id']
+    # Aynı değerin üçüncü kez gelmesi bekleyen kalemle aynı
+    assert journal.enqueue([stock('SKU1', 5)])[0] == (held, 'duplicate')
+
+    journal.mark_failed([sent['id']], 'batch failed')
+    [retry] = journal.claim([held['id']])
+    assert retry['id'] == held['id'] and retry['fields'] == {'availableStock': 5}
+
+
+def test_resubmit_after_failure_is_sent(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [first], _ = submit(journal, stock('SKU1', 5))
+    journal.mark_failed([first['id']], 'timeout')
+
+    [again], [(_, outcome)] = submit(journal, stock('SKU1', 5))
+    assert outcome == 'queued' and again['id'] != first['id']
+
+
+def test_new_value_waits_for_in_flight_item(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [first], _ = submit(journal, stock('SKU1', 5))
+
+    claimed, [(held, outcome)] = submit(journal, stock('SKU1', 3))
+    assert claimed == [] and outcome == 'held'
+    assert journal.claim([held['id']]) == []
+
+    journal.mark_sent([first['id']], 'batch-1')
+    assert journal.claim([held['id']]) == []
+
+    journal.mark_done([first['id']])
+    [next_item] = journal.claim([held['id']])
+    assert next_item['fields'] == {'availableStock': 3}
+    # Diğer SKU'lar beklemez
+    [other], _ = submit(journal, stock('SKU2', 1))
+    assert other['sku'] == 'SKU2'
+
+
+def test_release_returns_item_to_pending(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [item], _ = submit(journal, stock('SKU1', 5))
+    [released] = journal.release([item['id']], 'circuit open')
+    assert released['state'] == 'pending' and released['error'] == 'circuit open'
+    # SKU artık yolda değil: yeni değer bekleyen kalemle birleşir ve gönderilebilir
+    claimed, [(merged, outcome)] = submit(journal, stock('SKU1', 3))
+    assert outcome == 'coalesced' and [c['id'] for c in claimed] == [merged['id']]
+
+
+def test_done_supersedes_identical_held_item(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [first], _ = submit(journal, stock('SKU1', 5))
+    _, [(held, _)] = submit(journal, stock('SKU1', 5))
+
+    assert [item['id'] for item in journal.mark_done([first['id']])] == [first['id']]
+    held = journal.get(held['id'])
+    assert held['state'] == 'superseded' and held['superseded_by'] == first['id']
+    assert journal.open_items() == []
+
+
+def test_abandoned_send_hands_over_to_newer_value(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [first], _ = submit(journal, stock('SKU1', 5))
+    _, [(held, _)] = submit(journal, stock('SKU1', 7))
+
+    ids = [item['id'] for item in journal.open_items()]
+    [claimed] = journal.claim(ids, stale_after=0)
+    assert claimed['id'] == held['id']
+    assert journal.get(first['id'])['state'] == 'superseded'
+
+
+def test_reload_from_disk(workdir):
+    journal = ChangeJournal('journal.jsonl')
+    [first], _ = submit(journal, stock('SKU1', 5))
+    _, [(held, _)] = submit(journal, stock('SKU1', 3))
+
+    restarted = ChangeJournal('journal.jsonl')
+    assert [item['id'] for item in restarted.open_items()] == [first['id'], held['id']]
+    assert restarted.claim([held['id']]) == []
+    restarted.mark_done([first['id']])
+    assert [item['id'] for item in restarted.claim([held['id']])] == [held['id']]
+
+
+def test_compaction_keeps_open_items(workdir, monkeypatch):
+    monkeypatch.setattr(change_journal, 'JOURNAL_COMPACT_EVERY', 20)
+    monkeypatch.setattr(change_journal, 'JOURNAL_KEEP_FINISHED', 3)
+    journal = ChangeJournal('journal.jsonl')
+    for i in range(10):
+        [item], _ = submit(journal, stock(f'DONE{i}', i))
+        journal.mark_done([item['id']])
+    [in_flight], _ = submit(journal, stock('OPEN', 1))
+    journal.mark_sent([in_flight['id']], 'batch-1')
+    _, [(held, _)] = submit(journal, stock('OPEN', 2))
+
+    with open('journal.jsonl', encoding='utf-8') as f:
+        lines = f.readlines()
+    assert len(lines) < 20
+
+    restarted = ChangeJournal('journal.jsonl')
+    assert [item['id'] for item in restarted.open_items()] == [in_flight['id'], held['id']]
+    assert restarted.get(in_flight['id'])['batch_id'] == 'batch-1'
+    assert restarted.summary()['states']['done'] < 10
+    assert restarted.claim([held['id']]) == []
+
+
+def test_replay_skips_open_circuit_and_isolates_marketplaces(app_module, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    monkeypatch.setattr(app_module, 'CHANGE_JOURNAL_STALE_SECONDS', 0)
+    sent = []
+
+    def send_hb(items, timeout=30):
+        sent.extend(item['sku'] for item in items)
+        app_module.change_journal.mark_done([item['id'] for item in items])
+
+    def send_ty(items, timeout=30):
+        raise circuit_breaker.CircuitOpenError('trendyol', 30)
+
+    monkeypatch.setitem(app_module.JOURNAL_SENDERS, 'ty_inventory', send_ty)
+    monkeypatch.setitem(app_module.JOURNAL_SENDERS, 'hb_stock', send_hb)
+    journal = app_module.change_journal
+    [(ty_item, _), (hb_item, _)] = journal.enqueue([price('B1', salePrice=10), stock('SKU1', 5)])
+
+    breaker = circuit_breaker.get_breaker('trendyol')
+    for _ in range(circuit_breaker.BREAKER_MIN_CALLS):
+        breaker.record_failure(RuntimeError('503'))
+    for _ in range(3):
+        app_module.replay_change_journal()
+    assert sent == ['SKU1']
+    assert journal.get(hb_item['id'])['state'] == 'done'
+    # Devre açıkken sahiplenilmez
+    assert journal.get(ty_item['id'])['state'] == 'pending'
+
+    # Devre kapalıyken gönderimde hata: diğer pazaryeri yine gönderilir
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    [(other, _)] = journal.enqueue([stock('SKU2', 1)])
+    assert app_module.replay_change_journal()['resent'] == 2
+    assert sent == ['SKU1', 'SKU2']
+    assert journal.get(other['id'])['state'] == 'done'
+
+
+@pytest.mark.parametrize('path, items', [
+    ('/update_stock', [{'barcode': 'B1', 'quantity': 3}, {'barcode': 'B2', 'quantity': 4}]),
+    ('/update_sale_price', [{'barcode': 'B1', 'salePrice': 30}, {'barcode': 'B2', 'salePrice': 40}]),
+])
+def test_partial_send_reports_held_skus(client, app_module, monkeypatch, path, items):
+    sent = []
+
+    def marketplace_request(method, url, marketplace, endpoint, json=None, **kwargs):
+        sent.extend(row['barcode'] for row in json['items'])
+        return types.SimpleNamespace(status_code=200, text='{}', json=lambda: {})
+
+    monkeypatch.setattr(app_module, 'marketplace_request', marketplace_request)
+    journal = app_module.change_journal
+    [(in_flight, _)] = journal.enqueue([price('B1', quantity=1)])
+    journal.claim([in_flight['id']])
+
+    body = client.post(path, json={'items': items}).get_json()
+    assert sent == ['B2']
+    assert body['unsent']['skus'] == ['B1'] and body['unsent']['held'] is True
+    assert 'Önceki gönderim sonuçlanınca gönderilecek: B1' in body['message']
+    [held] = [item for item in journal.open_items('pending') if item['sku'] == 'B1']
+    assert body['unsent']['change_ids'] == [held['id']]
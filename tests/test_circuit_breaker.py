@@ -0,0 +1,119 @@
+import types
+
+import pytest
+
+import cache_backend
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(workdir, monkeypatch):
+    """Devre kesicinin gördüğü zaman; paylaşımlı önbellek test dizininde"""
+    monkeypatch.setattr(cache_backend, '_shared_cache', None)
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker, 'time', types.SimpleNamespace(time=lambda: now[0]))
+
+    def advance(seconds):
+        now[0] += seconds
+    return advance
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record_failure(RuntimeError('503'))
+
+
+def test_opens_after_failure_rate_with_min_calls(clock):
+    breaker = CircuitBreaker('ty')
+    fail(breaker, circuit_breaker.BREAKER_MIN_CALLS - 1)
+    assert breaker.state == CLOSED
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()['last_failure'] == '503'
+
+
+def test_successes_keep_rate_below_threshold(clock):
+    breaker = CircuitBreaker('ty')
+    for _ in range(10):
+        breaker.record_success()
+        breaker.record_failure(RuntimeError('503'))
+        if breaker.state == OPEN:
+            break
+    # %50 eşiğinde açılır
+    assert breaker.state == OPEN
+
+    healthy = CircuitBreaker('hb')
+    for _ in range(10):
+        healthy.record_success()
+        healthy.record_success()
+        healthy.record_failure(RuntimeError('timeout'))
+    assert healthy.state == CLOSED
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker('ty')
+    fail(breaker, circuit_breaker.BREAKER_MIN_CALLS)
+    clock(circuit_breaker.BREAKER_OPEN_SECONDS)
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # deneme sürerken ikinci çağrı reddedilir
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['calls_in_window'] == 1
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker('ty')
+    fail(breaker, circuit_breaker.BREAKER_MIN_CALLS)
+    clock(circuit_breaker.BREAKER_OPEN_SECONDS)
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.retry_in() == circuit_breaker.BREAKER_OPEN_SECONDS
+
+
+def test_open_state_is_shared_with_other_workers(clock):
+    fail(CircuitBreaker('ty'), circuit_breaker.BREAKER_MIN_CALLS)
+
+    # Başka bir worker'daki aynı adlı devre
+    other = CircuitBreaker('ty')
+    assert not other.allow()
+    assert other.state == OPEN
+    clock(circuit_breaker.BREAKER_OPEN_SECONDS)
+    assert other.allow()
+    assert CircuitBreaker('hb').allow()
+
+
+def test_is_available_does_not_use_probe(clock, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    breaker = circuit_breaker.get_breaker('ty')
+    fail(breaker, circuit_breaker.BREAKER_MIN_CALLS)
+    assert not circuit_breaker.is_available('ty')
+    clock(circuit_breaker.BREAKER_OPEN_SECONDS)
+    assert circuit_breaker.is_available('ty')
+    assert breaker.allow()
+    assert circuit_breaker.status()['ty']['state'] == HALF_OPEN
+
+
+@pytest.mark.parametrize('path, payload', [
+    ('/update_stock', {'items': [{'barcode': 'B1', 'quantity': 3}]}),
+    ('/update_sale_price', {'items': [{'barcode': 'B1', 'salePrice': 99.9}]}),
+])
+def test_send_while_open_returns_503_and_keeps_change(client, app_module, monkeypatch, path, payload):
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    fail(circuit_breaker.get_breaker('trendyol'), circuit_breaker.BREAKER_MIN_CALLS)
+
+    response = client.post(path, json=payload)
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+    body = response.get_json()
+    assert body['degraded'] is True and body['marketplace'] == 'trendyol'
+    assert "Trendyol API'sine şu anda ulaşılamıyor" in body['error']
+
+    # Kalem 'sending'de takılı kalmaz, devre kapanınca yeniden oynatılır
+    [item] = app_module.change_journal.open_items()
+    assert item['state'] == 'pending' and item['sku'] == 'B1'
@@ -0,0 +1,34 @@
+PRODUCTS = [
+    {'barcode': 'B1', 'quantity': 5, 'hb_sku': 'H1', 'hb_stock': 3, 'ty_price': 100.0},
+    {'barcode': 'B2', 'quantity': 0, 'hb_sku': 'H2', 'hb_stock': 0, 'ty_price': 50.0},
+    {'barcode': 'B3', 'quantity': 2, 'hb_sku': '', 'hb_stock': None, 'ty_price': 20.0},
+]
+
+
+def test_index_renders_without_product_rows(client, app_module):
+    app_module.save_products_cache(PRODUCTS)
+
+    page = client.get('/').get_data(as_text=True)
+    assert 'id="productRowsStatus"' in page
+    assert 'data-barcode="B1"' not in page
+    assert '/dashboard/summary?sections=stock' in page
+
+    rows = client.get('/products/rows').get_data(as_text=True)
+    assert rows.count('<tr>') == len(PRODUCTS)
+    assert 'data-barcode="B1"' in rows
+
+
+def test_headline_counts_from_summary(client, app_module):
+    app_module.save_products_cache(PRODUCTS)
+
+    stock = client.get('/dashboard/summary?sections=stock').get_json()['stock']
+    assert stock['products'] == 3
+    assert (stock['ty_total'], stock['hb_total']) == (7, 3)
+    assert (stock['ty_out_of_stock'], stock['hb_out_of_stock']) == (1, 1)
+    assert stock['mismatch_count'] == 1
+
+
+def test_index_without_data(client):
+    page = client.get('/').get_data(as_text=True)
+    assert 'initialLoadBtn' in page
+    assert 'id="productsTable"' not in page
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+import jobs
+import storage
+
+
+def blocking_refresh(app_module, monkeypatch):
+    release = threading.Event()
+
+    def perform_refresh(job=None):
+        release.wait(5)
+        return {'message': 'ok'}
+    monkeypatch.setattr(app_module, 'perform_refresh', perform_refresh)
+    return release
+
+
+def lock_is_free(app_module):
+    lock = storage.try_lock(app_module.REFRESH_LOCK)
+    if lock is None:
+        return False
+    lock.release()
+    return True
+
+
+def test_refresh_is_single_flight_and_releases_lock(app_module, monkeypatch):
+    release = blocking_refresh(app_module, monkeypatch)
+    job_id = app_module.start_refresh_job(owner='admin')
+    assert app_module.start_refresh_job(owner='other') == job_id
+    assert not lock_is_free(app_module)
+
+    release.set()
+    assert jobs.wait_for(job_id, timeout=5)['status'] == 'done'
+    assert lock_is_free(app_module)
+
+
+def test_running_job_does_not_take_the_lock(app_module, monkeypatch):
+    taken = []
+    try_lock = storage.try_lock
+
+    def recording_try_lock(path):
+        lock = try_lock(path)
+        taken.append(lock)
+        return lock
+    monkeypatch.setattr(storage, 'try_lock', recording_try_lock)
+
+    release = threading.Event()
+    # Kilit olmadan başlamış bir yenileme işi
+    running = jobs.start('refresh', lambda job: release.wait(5) and {}, ('fetch_ty',))
+    try:
+        assert app_module.start_refresh_job() == running.id
+        # Alınıp sahipsiz bırakılan kilit olmamalı
+        assert all(lock is None or lock._handle is None for lock in taken)
+    finally:
+        release.set()
+        running.wait(5)
+
+
+def test_failed_start_releases_lock(app_module, monkeypatch):
+    def broken_start(*args, **kwargs):
+        raise RuntimeError('thread başlatılamadı')
+    monkeypatch.setattr(jobs, 'start', broken_start)
+    with pytest.raises(RuntimeError):
+        app_module.start_refresh_job()
+    assert lock_is_free(app_module)
+
+
+def test_job_progress_events(app_module):
+    release = threading.Event()
+
+    def work(job):
+        job.stage('fetch_ty', total=2)
+        job.advance()
+        release.wait(5)
+        job.advance()
+        return {'count': 2}
+
+    job = jobs.start('test', work, ('fetch_ty',))
+    events = jobs.stream_events(job.id)
+    first = next(events)
+    assert first.startswith('event: progress')
+    release.set()
+    rest = list(events)
+    assert rest[-1].startswith('event: end')
+    assert '"status": "done"' in rest[-1]
+    assert jobs.get_snapshot(job.id)['result'] == {'count': 2}
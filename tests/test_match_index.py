@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import storage
+from match_index import MatchIndex
+
+
+def build_index():
+    index = MatchIndex()
+    index.rebuild({'TY1': 'HB1', 'TY2': 'HB1', 'TY3': 'GONE'}, ['TY1', 'TY2', 'TY3', 'TY4'], ['HB1', 'HB2'],
+                  signature=('sig',))
+    return index
+
+
+def test_rebuild_fills_health_sets():
+    index = build_index()
+    assert index.summary() == {
+        'orphans': 1, 'duplicates': 1, 'stale': 0, 'unmatched_ty': 1, 'unmatched_hb': 1,
+        'matched': 3, 'ty_products': 4, 'hb_listings': 2
+    }
+    assert index.items('duplicates') == [{'hb_sku': 'HB1', 'ty_barcodes': ['TY1', 'TY2']}]
+    assert index.barcodes_for('HB1') == ['TY1', 'TY2']
+
+
+def test_apply_updates_sets_incrementally():
+    index = build_index()
+    index.apply({'TY2': 'HB2', 'TY3': '', 'TY9': 'HB1'})
+    assert index.sku_for('TY2') == 'HB2'
+    assert index.count('duplicates') == 1  # TY1 + TY9 -> HB1
+    assert not index.contains('orphans', 'TY3')
+    assert index.contains('unmatched_ty', 'TY3')
+    assert index.contains('stale', 'TY9')
+    assert index.count('unmatched_hb') == 0
+
+
+def test_advance_signature_only_when_index_matches_previous_state():
+    index = build_index()
+    index.signature = ('p', 'h', 'old')
+    index.advance_signature(2, 'other', 'new')
+    assert index.signature == ('p', 'h', 'old')
+    index.advance_signature(2, 'old', 'new')
+    assert index.signature == ('p', 'h', 'new')
+
+
+@pytest.mark.parametrize('coalesce_ms', [0, 50])
+def test_save_match_does_not_rebuild_index(client, app_module, counter, monkeypatch, coalesce_ms):
+    monkeypatch.setattr(storage, 'STORAGE_COALESCE_MS', coalesce_ms)
+    with open(app_module.MATCHES_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'TY1': 'HB1'}, f)
+    app_module.get_match_index()
+    assert counter('match_index_total', result='rebuild') == 1
+
+    response = client.post('/save_match', json={'matches': {'TY2': 'HB2'}})
+    assert response.status_code == 200
+    storage.flush()
+
+    index = app_module.get_match_index()
+    assert index.sku_for('TY2') == 'HB2'
+    assert counter('match_index_total', result='rebuild') == 1
+    with open(app_module.MATCHES_FILE, encoding='utf-8') as f:
+        assert json.load(f) == {'TY1': 'HB1', 'TY2': 'HB2'}
+
+
+def test_external_write_still_triggers_rebuild(client, app_module, counter):
+    app_module.get_match_index()
+    storage.write_json(app_module.MATCHES_FILE, {'TY5': 'HB5'})
+    assert app_module.get_match_index().sku_for('TY5') == 'HB5'
+    assert counter('match_index_total', result='rebuild') == 2
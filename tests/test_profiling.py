@@ -0,0 +1,93 @@
+import threading
+import time
+
+from flask import Flask
+
+import profiling
+
+
+def busy(ms):
+    deadline = time.perf_counter() + ms / 1000
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_app():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    profiling.init_app(app)
+
+    @app.route('/work')
+    def work():
+        busy(30)
+        return 'ok'
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError('boom')
+
+    return app
+
+
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['role'] = 'admin'
+    return client
+
+
+def sampler_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'profiling-sampler']
+
+
+def test_requests_share_one_sampler_thread():
+    app = make_app()
+    client = admin_client(app)
+    results = []
+
+    def request():
+        results.append(client.get('/work?_profile=1').status_code)
+
+    workers = [threading.Thread(target=request) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    client.get('/work', headers={profiling.PROFILE_HEADER: '1'})
+
+    assert results == [200] * 4
+    assert len(sampler_threads()) == 1
+    assert profiling.get_sampler().active_count() == 0
+    latest = profiling.list_profiles()[0]
+    assert latest['trigger'] == 'header'
+    assert latest['samples'] > 0
+    assert 'busy' in latest['collapsed']
+
+
+def test_unprofiled_request_does_not_register():
+    app = make_app()
+    client = app.test_client()
+    before = len(profiling.list_profiles())
+    assert client.get('/work?_profile=1').status_code == 200  # admin değil
+    assert len(profiling.list_profiles()) == before
+
+
+def test_failed_request_unregisters():
+    app = make_app()
+    client = admin_client(app)
+    assert client.get('/fail?_profile=1').status_code == 500
+    assert profiling.get_sampler().active_count() == 0
+
+
+def test_busy_cprofile_falls_back_to_sampling(monkeypatch):
+    class BusyProfile:
+        def enable(self):
+            raise ValueError('Another profiling tool is already active')
+
+    monkeypatch.setattr(profiling.cProfile, 'Profile', BusyProfile)
+    client = admin_client(make_app())
+    assert client.get('/work?_profile=1').status_code == 200
+
+    record = profiling.list_profiles()[0]
+    assert record['cprofile'] == '' and record['samples'] > 0
+    assert profiling.get_sampler().active_count() == 0
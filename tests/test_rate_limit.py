@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+import rate_limit
+
+WINDOW = 60
+START = 600.0  # Pencere sınırı
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, workdir):
+    return rate_limit.create_store(WINDOW, backend=request.param, path='limits.db')
+
+
+def test_backend_selection(workdir):
+    assert isinstance(rate_limit.create_store(WINDOW, backend='memory'), rate_limit.MemoryRateLimitStore)
+    assert isinstance(rate_limit.create_store(WINDOW, backend='sqlite', path='limits.db'),
+                      rate_limit.SQLiteRateLimitStore)
+
+
+def test_counts_within_window(store):
+    for i in range(3):
+        assert store.hit('1.2.3.4', now=START + i) == i + 1
+    assert store.count('1.2.3.4', now=START + 59) == 3
+    assert store.count('5.6.7.8', now=START) == 0
+
+
+def test_previous_window_is_weighted(store):
+    for i in range(4):
+        store.hit('ip', now=START + i)
+    # Sonraki pencerenin yarısında önceki pencere yarı ağırlıkla sayılır
+    assert store.count('ip', now=START + WINDOW + 30) == pytest.approx(2.0)
+    assert store.hit('ip', now=START + WINDOW + 30) == pytest.approx(3.0)
+    assert store.count('ip', now=START + WINDOW + 45) == pytest.approx(2.0)
+
+
+def test_expires_after_two_windows(store):
+    store.hit('ip', now=START)
+    assert store.count('ip', now=START + 2 * WINDOW) == 0
+    assert store.hit('ip', now=START + 2 * WINDOW) == 1
+
+
+def test_reset(store):
+    store.hit('ip', now=START)
+    store.reset('ip')
+    assert store.count('ip', now=START) == 0
+
+
+def test_memory_store_bounds_keys():
+    store = rate_limit.MemoryRateLimitStore(WINDOW, max_keys=2)
+    for key in ('a', 'b', 'c'):
+        store.hit(key, now=START)
+    assert store.count('a', now=START) == 0
+    assert store.count('c', now=START) == 1
+
+
+def test_memory_store_prunes_expired_keys():
+    store = rate_limit.MemoryRateLimitStore(WINDOW)
+    store.hit('old', now=START)
+    store.hit('new', now=START + 2 * WINDOW)
+    assert list(store._entries) == ['new']
+
+
+def test_sqlite_store_is_shared_between_workers(workdir):
+    workers = [rate_limit.SQLiteRateLimitStore('limits.db', WINDOW) for _ in range(2)]
+
+    def hammer(store):
+        for _ in range(25):
+            store.hit('ip', now=START)
+
+    threads = [threading.Thread(target=hammer, args=(store,)) for store in workers for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert workers[0].count('ip', now=START) == 100
+    assert workers[1].count('ip', now=START) == 100
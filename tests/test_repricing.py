@@ -0,0 +1,82 @@
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import repricing
+from cost_management import calculate_profit_analysis
+
+COSTS = {
+    'A': {'production_costs': [{'amount': 20}, {'amount': -5}], 'cargo_cost': 30, 'commission_rate': 15,
+          'withholding_rate': 1, 'other_expenses_rate': 2, 'platform_fee': 6.6},
+    'B': {'production_costs': [{'amount': 55.5}], 'cargo_cost': 42, 'commission_rate': 21.5,
+          'withholding_rate': 1, 'other_expenses_rate': 0, 'platform_fee': 10},
+    # Komisyon çok yüksek: %25 marj hiçbir fiyatta tutmaz
+    'C': {'production_costs': [{'amount': 10}], 'cargo_cost': 0, 'commission_rate': 80,
+          'withholding_rate': 0, 'other_expenses_rate': 0, 'platform_fee': 0},
+}
+PRODUCTS = [
+    {'barcode': 'A', 'title': 'A', 'ty_price': 100.0},
+    {'barcode': 'B', 'title': 'B', 'ty_price': 250.0},
+    {'barcode': 'C', 'title': 'C', 'ty_price': 40.0},
+    {'barcode': 'D', 'title': 'Maliyetsiz', 'ty_price': 80.0},
+]
+
+
+@pytest.fixture
+def arrays():
+    return repricing.CostArrays(PRODUCTS, COSTS)
+
+
+def profit(barcode, price):
+    return calculate_profit_analysis(barcode, price, COSTS[barcode])
+
+
+def test_current_profit_matches_profit_analysis(arrays):
+    result = repricing.solve(arrays, 25)
+    for i, product in enumerate(PRODUCTS[:3]):
+        analysis = profit(product['barcode'], product['ty_price'])
+        assert result['current_profit'][i] == pytest.approx(analysis['profit_amount'])
+        assert result['current_margin'][i] == pytest.approx(analysis['profit_rate'])
+
+
+@pytest.mark.parametrize('target_margin', [0, 10, 25])
+def test_target_price_hits_margin(arrays, target_margin):
+    result = repricing.solve(arrays, target_margin)
+    for i, barcode in enumerate(['A', 'B']):
+        price = result['target_price'][i]
+        assert profit(barcode, price)['profit_rate'] == pytest.approx(target_margin)
+        assert profit(barcode, result['break_even'][i])['profit_amount'] == pytest.approx(0, abs=1e-9)
+
+
+def test_unreachable_margin_is_nan(arrays):
+    result = repricing.solve(arrays, 25)
+    assert math.isnan(result['target_price'][2])
+    assert not math.isnan(result['break_even'][2])
+    summary = repricing.sweep(arrays, 25)[0]
+    assert summary['products'] == 3
+    assert summary['infeasible'] == 1
+
+
+def test_scenario_deltas(arrays):
+    base = repricing.solve(arrays, 20)
+    worse = repricing.solve(arrays, 20, commission_delta=5, cargo_delta=10)
+    assert (worse['target_price'][:2] > base['target_price'][:2]).all()
+    scenarios = repricing.sweep(arrays, 20, commission_deltas=(0, 5), cargo_deltas=(0, 10))
+    assert [(s['commission_delta'], s['cargo_delta']) for s in scenarios] == [(0, 0), (0, 10), (5, 0), (5, 10)]
+
+
+def test_price_table_rounds_up_and_skips_unreachable(arrays):
+    result = repricing.solve(arrays, 25)
+    rows = repricing.price_table(arrays, result, round_step=0.5)
+    assert [row['barcode'] for row in rows] == ['A', 'B', 'C']
+    for row, exact in zip(rows[:2], result['target_price'][:2]):
+        assert row['target_price'] >= exact
+        assert row['target_price'] - exact < 0.5
+        assert row['target_price'] * 2 == int(row['target_price'] * 2)
+    assert rows[2]['target_price'] is None
+
+    items = repricing.to_price_push_items(rows)
+    assert [item['barcode'] for item in items] == ['A', 'B']
+    assert items[0]['listPrice'] == items[0]['salePrice'] == rows[0]['target_price']
@@ -0,0 +1,68 @@
+from flask import Flask, flash, get_flashed_messages, render_template_string
+
+import metrics
+import response_cache
+
+
+def test_index_is_revalidated_with_304_after_login(client):
+    first = client.get('/')
+    assert first.status_code == 200
+    assert first.headers.get('ETag')
+
+    second = client.get('/', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    # Giriş mesajı sayfada gösterilmediği için önbellek atlanmamalı
+    assert 'response_cache_total{result="bypass",route="index"}' not in metrics.render_prometheus()
+
+
+def _flash_app(tmp_path):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    source = tmp_path / 'data.json'
+    source.write_text('{}')
+
+    @app.route('/plain')
+    @response_cache.cached_response(str(source))
+    def plain():
+        return 'plain page'
+
+    @app.route('/messages')
+    @response_cache.cached_response(str(source))
+    def messages():
+        return render_template_string("{{ get_flashed_messages() | join(',') }}|page")
+
+    @app.route('/flash')
+    def add_flash():
+        flash('merhaba')
+        return 'ok'
+
+    return app
+
+
+def test_view_ignoring_flashes_is_served_from_cache(workdir):
+    response_cache.invalidate()
+    client = _flash_app(workdir).test_client()
+    client.get('/flash')
+    etag = client.get('/plain').headers['ETag']
+    assert client.get('/plain', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_view_showing_flashes_is_not_cached(workdir):
+    response_cache.invalidate()
+    client = _flash_app(workdir).test_client()
+    client.get('/flash')
+    shown = client.get('/messages')
+    assert shown.get_data(as_text=True) == 'merhaba|page'
+    assert 'ETag' not in shown.headers
+    # Mesaj tüketildi; sonraki render önbelleğe alınabilir ve mesajı tekrar göstermez
+    assert client.get('/messages').get_data(as_text=True) == '|page'
+    assert client.get('/messages').headers.get('ETag')
+
+
+def test_cached_body_is_compressed_on_request(workdir):
+    response_cache.invalidate()
+    client = _flash_app(workdir).test_client()
+    response = client.get('/plain', headers={'Accept-Encoding': 'gzip'})
+    # MIN_COMPRESS_BYTES altındaki gövdeler sıkıştırılmaz
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data(as_text=True) == 'plain page'
@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.mark.parametrize('path', ['/', '/costs', '/match', '/users', '/metrics/dashboard',
+                                  '/admin/profiles', '/dashboard/summary', '/match/health'])
+def test_blueprint_pages_render(client, path):
+    assert client.get(path).status_code == 200
+
+
+def test_blueprint_endpoints(app_module):
+    endpoints = {rule.endpoint for rule in app_module.app.url_map.iter_rules()}
+    assert {'admin.users', 'cost.costs', 'match.match', 'index'} <= endpoints
+    assert 'costs' not in endpoints
+
+
+def test_in_process_caches_start_empty(app_module):
+    # Önceki testlerin kullanıcı dizini/ürün listesi bu testin dizinine taşınmasın
+    assert app_module._users_cache['data'] is None
+    assert app_module._products_memo['signature'] is None
+    assert 'admin' in app_module.load_users()
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import storage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Zamanlayıcıyı başlatıp lifetime saniye yaşayan bir worker işlemi
+WORKER = """
+import os, sys, time
+sys.path.insert(0, sys.argv[1])
+os.environ['SCHEDULER_TICK_SECONDS'] = '0.05'
+import scheduler
+
+def record():
+    with open('runs.log', 'a') as f:
+        f.write(f"{os.getpid()} {time.time()}\\n")
+
+scheduler.add_job('record', 0.05, record, first_run_seconds=0)
+scheduler.start()
+time.sleep(float(sys.argv[2]))
+print(scheduler.status()['is_leader'])
+"""
+
+pytestmark = pytest.mark.skipif(storage.fcntl is None, reason='fcntl yok')
+
+
+def spawn(lifetime):
+    return subprocess.Popen([sys.executable, '-c', WORKER, ROOT, str(lifetime)],
+                            stdout=subprocess.PIPE, text=True)
+
+
+def runs():
+    with open('runs.log') as f:
+        return [(int(pid), float(at)) for pid, at in (line.split() for line in f)]
+
+
+def test_only_one_worker_runs_jobs(workdir):
+    workers = [spawn(1.0) for _ in range(3)]
+    leaders = [worker.communicate(timeout=10)[0].strip() for worker in workers]
+
+    assert sorted(leaders) == ['False', 'False', 'True']
+    leader_pid = workers[leaders.index('True')].pid
+    assert {pid for pid, _ in runs()} == {leader_pid}
+    assert len(runs()) >= 5
+
+
+def test_follower_takes_over_when_leader_exits(workdir):
+    leader = spawn(0.6)
+    time.sleep(0.3)
+    follower = spawn(1.8)
+    assert leader.communicate(timeout=10)[0].strip() == 'True'
+    assert follower.communicate(timeout=10)[0].strip() == 'True'
+
+    by_pid = {}
+    for pid, at in runs():
+        by_pid.setdefault(pid, []).append(at)
+    assert set(by_pid) == {leader.pid, follower.pid}
+    # Devir sonrası: takipçinin çalıştırmaları liderin son çalıştırmasından sonra
+    assert min(by_pid[follower.pid]) > max(by_pid[leader.pid])
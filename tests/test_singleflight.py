@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+import singleflight
+
+
+def run_concurrently(count, func):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = func()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_followers(group, key, count):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        with group._lock:
+            call = group._calls.get(key)
+            if call is not None and call.followers == count:
+                return
+        time.sleep(0.001)
+    raise AssertionError('takipçiler gelmedi')
+
+
+def test_concurrent_calls_share_one_execution():
+    group = singleflight.Group('test')
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {'value': 42}
+
+    threads, results, errors = run_concurrently(5, lambda: group.do('key', slow))
+    wait_for_followers(group, 'key', 4)
+    assert group.in_flight('key')
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert errors == [None] * 5
+    assert all(result is results[0] for result in results)
+    assert not group.in_flight('key')
+    # Sonuç saklanmaz: sonraki çağrı yeniden çalıştırır
+    group.do('key', slow)
+    assert calls == [1, 1]
+
+
+def test_error_is_shared_with_followers():
+    group = singleflight.Group('test')
+    release = threading.Event()
+
+    def broken():
+        release.wait(5)
+        raise ValueError('api hatası')
+
+    threads, results, errors = run_concurrently(3, lambda: group.do('key', broken))
+    wait_for_followers(group, 'key', 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert not group.in_flight('key')
+
+
+def test_different_keys_run_independently():
+    group = singleflight.Group('test')
+    assert group.do('a', lambda: 1) == 1
+    assert group.do('b', lambda x: x * 2, 3) == 6
+
+
+def test_decorator_key_function():
+    calls = []
+
+    @singleflight.single_flight('test_decorator', key=lambda item_id, **kwargs: item_id)
+    def load(item_id, verbose=False):
+        calls.append((item_id, verbose))
+        return item_id
+
+    assert load(7, verbose=True) == 7
+    assert calls == [(7, True)]
+    assert isinstance(load.group, singleflight.Group)
+    with pytest.raises(TypeError):
+        load()
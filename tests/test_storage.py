@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import storage
+
+
+def test_atomic_writer_keeps_old_file_on_error(workdir):
+    storage.write_json('data.json', {'v': 1})
+    with pytest.raises(RuntimeError):
+        with storage.atomic_writer('data.json') as f:
+            f.write('{"v": 2')
+            raise RuntimeError('yarıda kaldı')
+    assert storage.read_json('data.json') == {'v': 1}
+    assert sorted(os.listdir(workdir)) == ['data.json', 'data.json.lock']
+
+
+def test_read_json_default(workdir):
+    assert storage.read_json('missing.json', dict) == {}
+    assert storage.read_json('missing.json', []) == []
+
+
+def test_parallel_updates_are_serialized(workdir):
+    def increment():
+        for _ in range(50):
+            storage.update_json('counter.json', lambda data: data.update(n=data.get('n', 0) + 1))
+
+    threads = [threading.Thread(target=increment) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open('counter.json', encoding='utf-8') as f:
+        assert json.load(f) == {'n': 400}
+
+
+def test_coalesced_updates_write_once(workdir, monkeypatch):
+    monkeypatch.setattr(storage, 'STORAGE_COALESCE_MS', 10_000)
+    written = []
+    for i in range(5):
+        storage.update_json('items.json', lambda data, i=i: data.setdefault('items', []).append(i),
+                            coalesce=True, on_written=lambda previous, current: written.append(current))
+
+    assert not os.path.exists('items.json')
+    assert storage.is_pending('items.json')
+    assert storage.read_json('items.json') == {'items': [0, 1, 2, 3, 4]}
+
+    storage.flush('items.json')
+    assert not storage.is_pending('items.json')
+    with open('items.json', encoding='utf-8') as f:
+        assert json.load(f) == {'items': [0, 1, 2, 3, 4]}
+    # Her güncellemenin geri çağırması, tek yazmanın imzasıyla bir kez
+    assert written == [storage.file_signature('items.json')] * 5
+
+
+def test_write_json_replaces_pending_update(workdir, monkeypatch):
+    monkeypatch.setattr(storage, 'STORAGE_COALESCE_MS', 10_000)
+    storage.update_json('data.json', lambda data: data.update(a=1), coalesce=True)
+    storage.write_json('data.json', {'b': 2})
+    assert not storage.is_pending('data.json')
+    with open('data.json', encoding='utf-8') as f:
+        assert json.load(f) == {'b': 2}
+
+
+def test_coalescing_is_opt_in(workdir, monkeypatch):
+    monkeypatch.delenv('STORAGE_COALESCE_MS', raising=False)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probe = ("import sys; sys.path.insert(0, sys.argv[1]); import storage; "
+             "print(storage.STORAGE_COALESCE_MS)")
+    output = subprocess.run([sys.executable, '-c', probe, root], capture_output=True, text=True, check=True)
+    # Çok işlemli sunucuda bekleyen güncelleme diğer işlemden görünmez
+    assert float(output.stdout) == 0
+
+    monkeypatch.setattr(storage, 'STORAGE_COALESCE_MS', 0.0)
+    storage.enable_single_process_coalescing()
+    assert storage.STORAGE_COALESCE_MS == storage.SINGLE_PROCESS_COALESCE_MS
+    monkeypatch.setenv('STORAGE_COALESCE_MS', '0')
+    monkeypatch.setattr(storage, 'STORAGE_COALESCE_MS', 0.0)
+    storage.enable_single_process_coalescing()
+    assert storage.STORAGE_COALESCE_MS == 0
+
+
+@pytest.mark.skipif(storage.fcntl is None, reason='fcntl yok')
+def test_try_lock_is_exclusive_across_processes(workdir):
+    probe = ("import sys; sys.path.insert(0, sys.argv[1]); import storage; "
+             "print(storage.try_lock('job') is None)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def other_process_blocked():
+        result = subprocess.run([sys.executable, '-c', probe, root], capture_output=True, text=True, check=True)
+        return result.stdout.strip() == 'True'
+
+    lock = storage.try_lock('job')
+    assert lock is not None
+    assert storage.try_lock('job') is None
+    assert other_process_blocked()
+
+    lock.release()
+    lock.release()  # İkinci bırakma etkisiz
+    assert not other_process_blocked()
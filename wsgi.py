@@ -0,0 +1,10 @@
+"""
+WSGI Giriş Noktası (çok işlemli üretim modu)
+Kullanım: gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+from app import app, start_background_services
+
+start_background_services()
+
+application = app